@@ -0,0 +1,197 @@
+"""Counterbalancing audit: checks that, across subjects, every image of a set
+appears equally often in each condition of a task. The schedules of many
+simulated subjects are generated headlessly, in a process pool, with
+TaskSchedule() (schedules.py) and the seeds MDTSuite uses (PairSeed() of the
+subject and set). The tasks make their schedules the same way, from a
+generator of their own (see BuildSchedule), so the audited schedules are those
+the subjects are shown. Each schedule draws from its own random.Random, so
+subjects don't share random state. Each worker tallies its subjects into an item by condition
+count matrix, and the matrices are summed with NumPy. The conditions are:
+
+    MDTO: target (lure pair A image), lure (lure pair B image), repeat, foil
+    MDTS: the move types: repeat, small, large, corner
+    MDTT: the lag bins, then primacy/recency (each image of a test pair)
+
+To audit 10000 subjects of MDTT set 1, with 4 blocks per subject:
+    python cbaudit.py <set dir> MDTT 4 10000 [set] [workers] [counts.npz]
+"""
+
+from __future__ import division
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from pairsolver import DEFAULT_LAG_BINS
+from schedules import (TASKS, ListImages, PairSeed, TaskSchedule,
+                       ImageListName)
+from stimindex import ParseName
+
+MOVE_TYPES = ("repeat", "small", "large", "corner")
+
+
+def Conditions(task, lagBins=DEFAULT_LAG_BINS):
+    """Returns the names of the audited conditions of a task.
+    """
+    if (task == "MDTO"):
+        return ["target", "lure", "repeat", "foil"]
+    elif (task == "MDTS"):
+        return list(MOVE_TYPES)
+    elif (task == "MDTT"):
+        return (["lag %d-%d" %(low, high) for (low, high) in lagBins] +
+                ["primacy/recency"])
+    raise ValueError("Unknown task: %s" %(task))
+
+
+def Assignments(task, schedule, lenVar, windowSize=(1920, 1080)):
+    """Lists the condition of each image appearance in a task schedule.
+
+    return: list of (image, condition index) tuples
+    """
+    assigned = []
+    if (task == "MDTO"):
+        (lures, singles) = schedule["lures"]
+        for (imgA, imgB) in lures:
+            assigned.append((imgA, 0))
+            assigned.append((imgB, 1))
+        for (img, singleType) in singles:
+            assigned.append((img, 2 if singleType == "sR" else 3))
+    elif (task == "MDTS"):
+        #Images are in move type order, lenVar of each
+        imageList = schedule[ImageListName(windowSize)]
+        for i, (img, posA, posB) in enumerate(imageList):
+            assigned.append((img, i // lenVar))
+    elif (task == "MDTT"):
+        for block, images in enumerate(schedule["imageBlocks"]):
+            for (index1, index2, trialType) in schedule["pairs:%d" %(block+1)]:
+                assigned.append((images[index1], trialType - 1))
+                assigned.append((images[index2], trialType - 1))
+    return assigned
+
+
+def CountChunk(args):
+    """Generates the schedules of a chunk of subjects, and tallies them (run
+    in a worker process).
+
+    args: (task, imgDir, lenVar, subjects, subset, windowSize, lagBins)
+    return: item by condition count matrix, rows in sorted image order
+    """
+    (task, imgDir, lenVar, subjects, subset, windowSize, lagBins) = args
+    images = sorted(ListImages(imgDir, task))
+    imgIdx = dict((img, i) for i, img in enumerate(images))
+    counts = np.zeros((len(images), len(Conditions(task, lagBins))),
+                      dtype=np.int64)
+    rows = []
+    cols = []
+    for subject in subjects:
+        schedule = TaskSchedule(task, imgDir, lenVar,
+                                PairSeed(subject, subset), windowSize, lagBins)
+        for (img, condition) in Assignments(task, schedule, lenVar,
+                                            windowSize):
+            rows.append(imgIdx[img])
+            cols.append(condition)
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(cols, dtype=int)),
+              1)
+    return counts
+
+
+def Audit(task, imgDir, lenVar, numSubjects, subset=1, windowSize=(1920, 1080),
+          lagBins=DEFAULT_LAG_BINS, workers=None, chunkSize=250):
+    """Tallies the conditions of every image over subjects 1..numSubjects.
+
+    lenVar: trials per condition (MDTO/MDTS), or number of blocks (MDTT)
+    workers: number of worker processes (default: one per CPU)
+    return: (images, conditions, counts) - the sorted image names, the
+            condition names, and the item by condition count matrix
+    """
+    subjects = list(range(1, numSubjects + 1))
+    jobs = [(task, imgDir, lenVar, subjects[i:i+chunkSize], subset,
+             windowSize, lagBins)
+            for i in range(0, len(subjects), chunkSize)]
+    pool = multiprocessing.Pool(workers)
+    try:
+        counts = sum(pool.imap_unordered(CountChunk, jobs))
+    finally:
+        pool.close()
+        pool.join()
+    return (sorted(ListImages(imgDir, task)), Conditions(task, lagBins),
+            counts)
+
+
+def Eligible(task, images, numConditions):
+    """Returns which images can be drawn for which conditions, as a boolean
+    item by condition matrix. MDTO targets, repeats and foils are A images
+    (e.g. 001a_2.jpg) and lures are B images; any image can be drawn for
+    any MDTS or MDTT condition.
+    """
+    eligible = np.ones((len(images), numConditions), dtype=bool)
+    if (task == "MDTO"):
+        isA = np.array([ParseName(img)["member"] == "a" for img in images],
+                       dtype=bool)
+        eligible[:, [0, 2, 3]] = isA[:, np.newaxis]
+        eligible[:, 1] = ~isA
+    return eligible
+
+
+def Balance(counts, eligible):
+    """Summarizes how evenly the images are spread over each condition, over
+    the images eligible for it.
+
+    return: dict of per condition arrays: number of eligible images, mean,
+            sd, min and max appearances per image, and chi-square of the
+            counts against a uniform spread (images - 1 degrees of freedom)
+    """
+    numConds = counts.shape[1]
+    balance = dict((key, np.zeros(numConds)) for key in
+                   ("images", "mean", "sd", "min", "max", "chiSquare"))
+    for i in range(0, numConds):
+        column = counts[eligible[:, i], i]
+        if (len(column) == 0):
+            continue
+        expected = column.mean()
+        balance["images"][i] = len(column)
+        balance["mean"][i] = expected
+        balance["sd"][i] = column.std()
+        balance["min"][i] = column.min()
+        balance["max"][i] = column.max()
+        if (expected > 0):
+            balance["chiSquare"][i] = ((column - expected) ** 2).sum() / expected
+    return balance
+
+
+def Report(task, images, conditions, counts):
+    """Prints the balance of each condition.
+    """
+    balance = Balance(counts, Eligible(task, images, len(conditions)))
+    print("{:<18}{:>8}{:>10}{:>10}{:>8}{:>8}{:>14}".format("Condition",
+          "Images", "Mean", "SD", "Min", "Max", "Chi-square"))
+    for i, condition in enumerate(conditions):
+        print("{:<18}{:>8d}{:>10.2f}{:>10.2f}{:>8d}{:>8d}{:>14.1f}".format(
+              condition, int(balance["images"][i]), balance["mean"][i],
+              balance["sd"][i], int(balance["min"][i]), int(balance["max"][i]),
+              balance["chiSquare"][i]))
+    print("Images never scheduled: %d" %(np.sum(counts.sum(axis=1) == 0)))
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 5) or (sys.argv[2] not in TASKS):
+        print("usage: python cbaudit.py <set dir> <MDTO|MDTS|MDTT> "
+              "<trials or blocks> <subjects> [set] [workers] [counts.npz]")
+        sys.exit(1)
+    imgDir = sys.argv[1]
+    task = sys.argv[2]
+    lenVar = int(sys.argv[3])
+    numSubjects = int(sys.argv[4])
+    subset = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+    workers = int(sys.argv[6]) if len(sys.argv) > 6 else None
+
+    start = time.time()
+    (images, conditions, counts) = Audit(task, imgDir, lenVar, numSubjects,
+                                         subset, workers=workers)
+    print("Audited %d %s subjects in %.1fs" %(numSubjects, task,
+                                             time.time() - start))
+    Report(task, images, conditions, counts)
+    if (len(sys.argv) > 7):
+        np.savez_compressed(sys.argv[7], images=np.array(images),
+                            conditions=np.array(conditions), counts=counts)
@@ -0,0 +1,97 @@
+"""Class DerivativeCache stores resized copies of a set's stimulus images, made
+for the size the images are actually drawn at in a given window, so that each
+trial decodes a display-sized image rather than the full resolution source.
+
+Derivatives are kept in a ".derivatives" folder within the set's image
+directory, named by the sha1 of the source image (taken from the set's
+manifest) and the size of the box the image is fit within. A changed source
+image therefore gets a new derivative, and each window size/task keeps its own.
+Source images that already fit within the box are used as they are.
+
+Running this file builds the derivatives of a set ahead of a session:
+    python include/derivcache.py <imgDir> <task: MDTO|MDTS|MDTT> <windowHeight>
+"""
+
+import os, sys, math
+from PIL import Image
+from manifest import ImageManifest
+
+#Fraction of the window height each task draws its images at
+TASK_IMAGE_SCALE = {"MDTO": 3, "MDTS": 6, "MDTT": 5.5}
+
+
+class DerivativeCache(object):
+
+    CACHE_NAME = ".derivatives"
+    JPEG_QUALITY = 95
+
+    def __init__(self, imgDir, boxSize, manifest=None):
+        """imgDir: directory of the source images
+        boxSize: size, in pixels, of the square the images are drawn within
+        manifest: the set's ImageManifest, loaded here if not given
+        """
+        self.imgDir = imgDir
+        self.boxSize = int(math.ceil(boxSize))
+        self.cacheDir = os.path.join(imgDir, self.CACHE_NAME)
+        self.manifest = manifest
+        if (self.manifest is None):
+            self.manifest = ImageManifest(imgDir)
+
+    def DerivativeName(self, image):
+        """Returns the cache filename of an image's derivative, or None if the
+        source image already fits within the box.
+        """
+        entry = self.manifest.Get(image)
+        if (entry is None):
+            return None
+        if (max(entry["width"], entry["height"]) <= self.boxSize):
+            return None
+        return "{}_{}.jpg".format(entry["sha1"], self.boxSize)
+
+    def Get(self, image):
+        """Returns the path of the image to load for an image filename: the
+        derivative (building it if it is missing), or the source image itself.
+        """
+        sourcePath = os.path.join(self.imgDir, image)
+        derivName = self.DerivativeName(image)
+        if (derivName is None):
+            return sourcePath
+        derivPath = os.path.join(self.cacheDir, derivName)
+        if (not os.path.isfile(derivPath)):
+            self.Make(sourcePath, derivPath)
+        return derivPath
+
+    def Make(self, sourcePath, derivPath):
+        """Resizes a source image to fit within the box and writes it to the
+        cache. Written to a temporary file first so a partly written image is
+        never picked up by another session or thread.
+        """
+        if (not os.path.isdir(self.cacheDir)):
+            os.makedirs(self.cacheDir)
+        im = Image.open(sourcePath).convert('RGB')
+        im.thumbnail((self.boxSize, self.boxSize), Image.LANCZOS)
+        tmpPath = "{}.{}.tmp".format(derivPath, os.getpid())
+        im.save(tmpPath, "JPEG", quality=self.JPEG_QUALITY)
+        os.replace(tmpPath, derivPath)
+
+    def Build(self, images=None):
+        """Makes any missing derivatives for the given images.
+
+        images: list of image filenames, or None for every image in the set
+        return: list of the paths to load, one per image
+        """
+        if (images is None):
+            images = sorted(self.manifest.entries.keys())
+        return [self.Get(image) for image in images]
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) != 4 or sys.argv[2] not in TASK_IMAGE_SCALE):
+        print(__doc__)
+        sys.exit(1)
+    imgDir = sys.argv[1]
+    boxSize = int(sys.argv[3]) / TASK_IMAGE_SCALE[sys.argv[2]]
+    cache = DerivativeCache(imgDir, boxSize)
+    paths = cache.Build()
+    made = len([p for p in paths if os.path.dirname(p) == cache.cacheDir])
+    print("{}: {} derivatives at {}px".format(imgDir, made, cache.boxSize))
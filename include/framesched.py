@@ -0,0 +1,202 @@
+"""Class FrameScheduler presents stimuli for a whole number of screen refreshes,
+rather than for however long a sleep happens to last. The refresh rate of the
+window is measured when its first scheduler is created (later ones, e.g. of
+the next task in a shared window, reuse it), and trial durations and ISIs are
+converted to frame counts. A stimulus is then drawn and flipped once per frame,
+so that its onset and offset both land on a frame boundary, and input is
+polled between flips, through a response input backend (see keyinput.py).
+
+The timestamp of every flip is kept, and each stimulus presented (with the ISI
+that follows it) is recorded in self.timing, a TrialTiming (see trialtiming.py).
+Tasks call StartPrep() before preparing a trial's stimulus, so the record also
+holds how long the preparation took.
+
+Usage, for a trial followed by an ISI:
+    keyPresses = scheduler.PresentTrial(stim.draw, trialDuration, ISI,
+                                        keyList, clock, selfPaced)
+"""
+
+import weakref
+
+from psychopy import logging
+
+from keyinput import EventInput
+from trialtiming import TrialTiming
+
+#Measured refresh rate of each window
+_refreshRates = weakref.WeakKeyDictionary()
+
+
+class FrameScheduler(object):
+
+    DEFAULT_REFRESH_RATE = 60.0
+
+    def __init__(self, window, keyInput=None):
+        """window: the window stimuli are flipped in
+        keyInput: response input backend, psychopy.event polling by default
+        """
+        self.window = window
+        self.keyInput = keyInput if keyInput is not None else EventInput()
+        self.refreshRate = self.MeasureRefreshRate()
+        self.frameDuration = 1.0 / self.refreshRate
+        self.timing = TrialTiming(self.frameDuration)
+        self.prepStart = None
+        self.prepLabel = ''
+        self.nextOnsetDue = None
+        self.current = None
+
+    def MeasureRefreshRate(self):
+        """Measures the actual refresh rate of the window, in Hz, unless it
+        was already measured. If a stable rate can't be measured, falls back
+        to 60Hz.
+        """
+        rate = _refreshRates.get(self.window)
+        if (rate is not None):
+            return rate
+        rate = self.window.getActualFrameRate(nIdentical=20, nMaxFrames=240,
+                                              nWarmUpFrames=20)
+        if (not rate):
+            print("Could not measure refresh rate, assuming {} Hz".format(
+                  self.DEFAULT_REFRESH_RATE))
+            rate = self.DEFAULT_REFRESH_RATE
+        _refreshRates[self.window] = rate
+        return rate
+
+    def Frames(self, duration):
+        """Returns the number of frames closest to a duration (in seconds),
+        with a minimum of one frame.
+        """
+        return max(1, int(round(duration * self.refreshRate)))
+
+    def StartPrep(self, label=''):
+        """Marks the start of preparing the next stimulus (loading its image,
+        setting it on a stimulus, ...), for the timing record.
+
+        label: what is about to be presented, e.g. the image name
+        """
+        self.prepStart = logging.defaultClock.getTime()
+        self.prepLabel = label
+
+    def Flip(self):
+        """Flips the window, keeping the timestamp for the current record.
+
+        return: the time of the flip
+        """
+        flipTime = self.window.flip()
+        if (self.current is not None):
+            self.current['flips'].append(flipTime)
+        return flipTime
+
+    def Onset(self, drawFunc, clock=None):
+        """Draws and flips the first frame of a stimulus. Pending input is
+        cleared and the clock reset on that flip, so RTs are relative to it.
+        """
+        self.Commit()
+        drawFunc()
+        requested = logging.defaultClock.getTime()
+        prepStart = self.prepStart if self.prepStart is not None else requested
+        self.keyInput.Arm(self.window, clock)
+        onset = self.window.flip()
+        #The stimulus was due at the end of the previous ISI, unless it wasn't
+        #prepared straight after it (e.g. a pause or prompt came in between)
+        intendedOnset = onset
+        if (self.nextOnsetDue is not None and
+                prepStart <= self.nextOnsetDue + self.frameDuration):
+            intendedOnset = self.nextOnsetDue
+        self.current = {'label': self.prepLabel, 'intendedOnset': intendedOnset,
+                        'onset': onset, 'intendedOffset': float('nan'),
+                        'offset': float('nan'), 'intendedISI': 0.0,
+                        'actualISI': float('nan'), 'flips': [onset],
+                        'prepTime': requested - prepStart}
+        self.prepStart = None
+        self.prepLabel = ''
+        self.nextOnsetDue = None
+        return onset
+
+    def Commit(self):
+        """Adds the record of the stimulus presented last (if any) to
+        self.timing.
+        """
+        if (self.current is None):
+            return
+        rec = self.current
+        self.current = None
+        self.timing.Add(rec['label'], rec['intendedOnset'], rec['onset'],
+                        rec['intendedOffset'], rec['offset'],
+                        rec['intendedISI'], rec['actualISI'], rec['flips'],
+                        rec['prepTime'])
+
+    def Present(self, drawFunc, duration, keyList=None, clock=None):
+        """Shows a stimulus for the number of frames closest to duration, then
+        flips to a blank screen (the stimulus offset).
+
+        drawFunc: function drawing the stimulus to the back buffer
+        duration: time (seconds) the stimulus stays on screen
+        keyList: keys to collect while the stimulus is shown (None for none)
+        clock: clock to reset at onset and timestamp keypresses with
+        return: list of [key, RT] of each keypress, in order
+        """
+        onset = self.Onset(drawFunc, clock)
+        keyPresses = []
+        for frame in range(1, self.Frames(duration)):
+            drawFunc()
+            self.Flip()
+            if (keyList is not None):
+                keyPresses.extend(self.keyInput.GetKeys(keyList, clock))
+        if (keyList is not None):
+            keyPresses.extend(self.keyInput.GetKeys(keyList, clock))
+        self.current['intendedOffset'] = (onset + self.Frames(duration) *
+                                          self.frameDuration)
+        self.current['offset'] = self.Flip()
+        return keyPresses
+
+    def PresentUntilKey(self, drawFunc, keyList, clock=None, maxDuration=None):
+        """Shows a stimulus until one of the keys is pressed (or maxDuration
+        has passed), polling input between flips, then flips to a blank screen.
+
+        return: list of [key, RT] of each keypress, empty if none was pressed
+        """
+        self.Onset(drawFunc, clock)
+        maxFrames = None
+        if (maxDuration is not None):
+            maxFrames = self.Frames(maxDuration)
+        keyPresses = []
+        frame = 1
+        while (not keyPresses) and (maxFrames is None or frame < maxFrames):
+            drawFunc()
+            self.Flip()
+            frame += 1
+            keyPresses = self.keyInput.GetKeys(keyList, clock)
+        self.current['offset'] = self.Flip()
+        return keyPresses
+
+    def Blank(self, duration):
+        """Holds the blank screen flipped at the end of Present() for the number
+        of frames closest to duration, counted from that offset flip. The next
+        stimulus onset then falls on the following frame.
+        """
+        lastFlip = None
+        for frame in range(1, self.Frames(duration)):
+            lastFlip = self.Flip()
+        if (self.current is None):
+            return
+        if (lastFlip is None):
+            lastFlip = self.current['offset']
+        self.nextOnsetDue = lastFlip + self.frameDuration
+        self.current['intendedISI'] = self.Frames(duration) * self.frameDuration
+        self.current['actualISI'] = self.nextOnsetDue - self.current['offset']
+        self.Commit()
+
+    def PresentTrial(self, drawFunc, duration, ISI, keyList, clock,
+                     selfPaced=False):
+        """Runs the display part of a trial: the stimulus for <duration>, or
+        until a key is pressed if self paced, followed by a blank ISI.
+
+        return: list of [key, RT] of each keypress, in order
+        """
+        if (selfPaced):
+            keyPresses = self.PresentUntilKey(drawFunc, keyList, clock)
+        else:
+            keyPresses = self.Present(drawFunc, duration, keyList, clock)
+        self.Blank(ISI)
+        return keyPresses
@@ -0,0 +1,287 @@
+"""Class ImageDatabase gives the per-image metadata of the image database
+spreadsheet (images/MDT_Image_Database_Set1_2.xlsx): the object each image
+shows, where it came from, and, for MDTO, its lure similarity rating (1-5).
+
+Reading the spreadsheet at runtime is slow, so it is imported once into an
+SQLite file next to it (MDT_Image_Database_Set1_2.sqlite), which is imported
+again only when the spreadsheet changes. The importer reads the .xlsx file
+directly (it is a zip of XML parts), so no spreadsheet library is needed.
+
+Each sheet ("Set1", "Set2", ...) holds one image set. Its columns are grouped
+by task: a task column ("MDT-O", "MDT-S" or "MDT-T") followed by the columns
+describing that task's images, up to the next task column. An image's name is
+in its group's "Renamed" column if there is one, otherwise the task column.
+
+Lookups are by (task, set, image name), e.g.
+    db = OpenDatabase("images")
+    db.Get("MDTO", 1, "001a_2.jpg")  -> {"object": "airplane", ...}
+    db.Select("MDTO", 2, minLure=4)  -> images rated 4 or 5
+
+To import the spreadsheet, and print a summary:
+    python imagedb.py images/MDT_Image_Database_Set1_2.xlsx
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+DATABASE_NAME = "MDT_Image_Database_Set1_2"
+TASK_COLUMNS = {"MDT-O": "MDTO", "MDT-S": "MDTS", "MDT-T": "MDTT"}
+
+#Field names of the spreadsheet's column headers; other headers are kept as
+#they are
+HEADER_FIELDS = {"Object": "object",
+                 "SourceSetFolder": "sourceFolder",
+                 "Source Folder": "sourceFolder",
+                 "Source Folder (Use Set 1 - 6)": "sourceFolder",
+                 "SourceFileName": "sourceFile",
+                 "Source File name": "sourceFile",
+                 "SourceLure (1 - 5)": "lure",
+                 "Source": "source",
+                 "Notes": "notes"}
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def CellValue(cell, sharedStrings):
+    """Returns the value of a worksheet cell: a string, an int or float for
+    numbers, or None if the cell is empty.
+    """
+    cellType = cell.get("t")
+    if (cellType == "inlineStr"):
+        return "".join(t.text or "" for t in cell.iter(MAIN_NS + "t"))
+    value = cell.find(MAIN_NS + "v")
+    if (value is None) or (value.text is None):
+        return None
+    if (cellType == "s"):
+        return sharedStrings[int(value.text)]
+    if (cellType in ("str", "e")):
+        return value.text
+    if (cellType == "b"):
+        return value.text == "1"
+    number = float(value.text)
+    return int(number) if number.is_integer() else number
+
+
+def ReadXlsx(path):
+    """Reads the cells of every sheet of an .xlsx file.
+
+    return: dict, by sheet name, of lists of rows, each a dict of cell values
+            by column letter
+    """
+    sheets = {}
+    with zipfile.ZipFile(path) as xlsx:
+        sharedStrings = []
+        if ("xl/sharedStrings.xml" in xlsx.namelist()):
+            root = ET.fromstring(xlsx.read("xl/sharedStrings.xml"))
+            for item in root.iter(MAIN_NS + "si"):
+                sharedStrings.append("".join(t.text or "" for t in
+                                             item.iter(MAIN_NS + "t")))
+
+        rels = ET.fromstring(xlsx.read("xl/_rels/workbook.xml.rels"))
+        targets = dict((rel.get("Id"), rel.get("Target"))
+                       for rel in rels.iter(PKG_REL_NS + "Relationship"))
+        workbook = ET.fromstring(xlsx.read("xl/workbook.xml"))
+        for sheet in workbook.iter(MAIN_NS + "sheet"):
+            target = targets[sheet.get(REL_NS + "id")].lstrip("/")
+            if (not target.startswith("xl/")):
+                target = "xl/" + target
+            root = ET.fromstring(xlsx.read(target))
+            rows = []
+            for row in root.iter(MAIN_NS + "row"):
+                cells = {}
+                for cell in row.iter(MAIN_NS + "c"):
+                    value = CellValue(cell, sharedStrings)
+                    if (value is not None) and (value != ""):
+                        column = re.match(r"[A-Z]+", cell.get("r")).group(0)
+                        cells[column] = value
+                rows.append(cells)
+            sheets[sheet.get("name")] = rows
+    return sheets
+
+
+def ColumnNumber(column):
+    """Returns the number of a column letter (A is 1).
+    """
+    number = 0
+    for letter in column:
+        number = number * 26 + (ord(letter) - ord("A") + 1)
+    return number
+
+
+def SheetRecords(rows):
+    """Splits the rows of a sheet into per-image records, using its header row.
+
+    return: list of (task, image, fields) tuples
+    """
+    if (not rows):
+        return []
+    header = rows[0]
+    columns = sorted(header, key=ColumnNumber)
+    groups = []
+    for column in columns:
+        task = TASK_COLUMNS.get(str(header[column]).strip())
+        if (task is not None):
+            groups.append((task, column, []))
+        elif (groups):
+            groups[-1][2].append(column)
+
+    records = []
+    for row in rows[1:]:
+        for (task, taskColumn, fieldColumns) in groups:
+            fields = {}
+            for column in fieldColumns:
+                if (column in row):
+                    name = str(header[column]).strip()
+                    fields[HEADER_FIELDS.get(name, name)] = row[column]
+            image = fields.pop("Renamed", None)
+            if (image is None):
+                image = row.get(taskColumn)
+            elif (taskColumn in row):
+                fields["original"] = row[taskColumn]
+            if (image is not None):
+                records.append((task, str(image), fields))
+    return records
+
+
+def FileHash(path):
+    """Returns the sha1 of a file.
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def Import(xlsxPath, dbPath):
+    """Imports the spreadsheet into an SQLite database, replacing its contents.
+
+    return: number of image records imported
+    """
+    records = []
+    for sheetName, rows in ReadXlsx(xlsxPath).items():
+        setMatch = re.search(r"(\d+)$", sheetName)
+        if (setMatch is None):
+            continue
+        for (task, image, fields) in SheetRecords(rows):
+            lure = fields.get("lure")
+            records.append((task, int(setMatch.group(1)), image,
+                            fields.get("object"),
+                            lure if isinstance(lure, (int, float)) else None,
+                            json.dumps(fields, sort_keys=True)))
+
+    tmpPath = dbPath + ".tmp"
+    if (os.path.exists(tmpPath)):
+        os.remove(tmpPath)
+    conn = sqlite3.connect(tmpPath)
+    try:
+        conn.execute("CREATE TABLE images (task TEXT, setNum INTEGER, "
+                     "image TEXT, object TEXT, lure REAL, fields TEXT, "
+                     "PRIMARY KEY (task, setNum, image))")
+        conn.execute("CREATE INDEX images_lure ON images (task, setNum, lure)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        #Later rows of a sheet replace earlier ones of the same image
+        conn.executemany("INSERT OR REPLACE INTO images VALUES (?,?,?,?,?,?)",
+                         records)
+        conn.execute("INSERT INTO meta VALUES ('sha1', ?)",
+                     (FileHash(xlsxPath),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmpPath, dbPath)
+    return len(records)
+
+
+def OpenDatabase(imageDir):
+    """Returns the ImageDatabase of the images directory, importing the
+    spreadsheet first if it is new or has changed since it was imported.
+    """
+    xlsxPath = os.path.join(imageDir, DATABASE_NAME + ".xlsx")
+    dbPath = os.path.join(imageDir, DATABASE_NAME + ".sqlite")
+    if (not os.path.isfile(dbPath)) or (
+        os.path.getmtime(dbPath) < os.path.getmtime(xlsxPath) and
+        ImageDatabase(dbPath).sha1 != FileHash(xlsxPath)):
+        Import(xlsxPath, dbPath)
+    return ImageDatabase(dbPath)
+
+
+class ImageDatabase(object):
+
+    def __init__(self, dbPath):
+        """Loads every record of an imported database into memory, so lookups
+        are dict lookups.
+        """
+        self.path = dbPath
+        self.records = {}
+        conn = sqlite3.connect(dbPath)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key='sha1'"
+                               ).fetchone()
+            self.sha1 = row[0] if row is not None else None
+            for (task, setNum, image, fields) in conn.execute(
+                "SELECT task, setNum, image, fields FROM images"):
+                self.records[(task, setNum, image)] = json.loads(fields)
+        finally:
+            conn.close()
+
+    def Get(self, task, setNum, image):
+        """Returns the fields (dict) of an image, or None if it isn't in the
+        database.
+        """
+        return self.records.get((task, int(setNum), image))
+
+    def Object(self, task, setNum, image):
+        """Returns the name of the object an image shows, or None.
+        """
+        fields = self.Get(task, setNum, image)
+        return fields.get("object") if fields is not None else None
+
+    def LureRating(self, task, setNum, image):
+        """Returns the lure similarity rating (1-5) of an MDTO image, or None.
+        """
+        fields = self.Get(task, setNum, image)
+        return fields.get("lure") if fields is not None else None
+
+    def Images(self, task, setNum):
+        """Returns the sorted names of a set's images in the database.
+        """
+        return sorted(image for (t, s, image) in self.records
+                      if (t == task) and (s == int(setNum)))
+
+    def Select(self, task, setNum, minLure=None, maxLure=None):
+        """Returns the sorted names of a set's images with a lure similarity
+        rating within [minLure, maxLure]; images without a rating are left out
+        if either bound is given.
+        """
+        selected = []
+        for image in self.Images(task, setNum):
+            lure = self.records[(task, int(setNum), image)].get("lure")
+            if (minLure is not None or maxLure is not None):
+                if (not isinstance(lure, (int, float))):
+                    continue
+                if (minLure is not None and lure < minLure) or (
+                    maxLure is not None and lure > maxLure):
+                    continue
+            selected.append(image)
+        return selected
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2):
+        print("usage: python imagedb.py <spreadsheet.xlsx> [database.sqlite]")
+        sys.exit(1)
+    xlsxPath = sys.argv[1]
+    dbPath = sys.argv[2] if len(sys.argv) > 2 else (
+        os.path.splitext(xlsxPath)[0] + ".sqlite")
+    count = Import(xlsxPath, dbPath)
+    db = ImageDatabase(dbPath)
+    print("Imported %d image records into %s" %(count, dbPath))
+    for key in sorted(set((task, setNum) for (task, setNum, image)
+                          in db.records)):
+        print("    %s set %d: %d images" %(key[0], key[1],
+                                          len(db.Images(key[0], key[1]))))
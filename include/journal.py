@@ -0,0 +1,222 @@
+"""Class SessionJournal keeps an append-only record of a session, so that a
+session interrupted by a crash (or a reboot of the stimulus PC) can be resumed
+rather than run again from the start. The journal is a text file with one JSON
+event per line, written next to the logfile (<sub>_<task>_journal.jsonl):
+
+    start     the session parameters, written when the session begins
+    schedule  a generated schedule (lures/singles, image positions, trial
+              orders, MDTT blocks and pairs), by name
+    log       text written to the logfile
+    record    a typed trial record (see trialdata.py)
+    mark      a completed step, e.g. a trial or an MDTT block, with the task
+              state (e.g. scores) after it
+    discard   drops the log text and records since the last mark, those of a
+              step quit with escape, which is run again on resume
+    resume    written when an interrupted session is resumed
+    end       written when the session finishes (and wasn't quit early)
+
+Events are written in the background, by a LogWriter, and synced to disk at
+every mark. When a session is resumed, its schedules are reused as they were,
+and log text and records are restored up to the last mark; anything after it
+(or before a discard or resume) belongs to an unfinished step, which is run
+again. Tasks ask Done(step) to skip
+steps already completed.
+
+A SessionJournal created without a path keeps its state in memory only, so
+tasks run on their own behave as before.
+"""
+
+import json
+import time
+
+from logwriter import LogWriter
+
+
+def ReadEvents(path):
+    """Reads the events of a journal file. A last line cut short by a crash
+    is ignored.
+
+    return: (events, length) - the list of event dicts, empty if the file
+            can't be read, and the length in bytes of the complete lines
+    """
+    events = []
+    length = 0
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return (events, length)
+    for line in data.splitlines(True):
+        if (not line.endswith(b"\n")):
+            break
+        try:
+            events.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            break
+        length += len(line)
+    return (events, length)
+
+
+class SessionJournal(object):
+
+    def __init__(self, path=None, info=None, events=None, length=None):
+        """path: journal file to append to, None to keep the journal in memory
+        info: the session parameters, which must match to resume the session
+        events: events read from the journal of the session being resumed
+        length: length of the complete lines of that journal; anything after
+                it (a line cut short by the crash) is cut off before appending
+        """
+        self.path = path
+        self.info = info if info is not None else {}
+        self.schedules = {}
+        self.marks = set()
+        self.state = {}
+        self.logText = ''
+        self.records = []
+        self.resumed = False
+
+        if (events is not None):
+            self.Replay(events)
+            self.resumed = True
+
+        self.writer = None
+        if (path is not None):
+            if (length is not None):
+                with open(path, 'r+b') as f:
+                    f.truncate(length)
+            self.writer = LogWriter(path, mode='a' if self.resumed else 'w')
+            event = "resume" if self.resumed else "start"
+            self.Append({"e": event, "info": self.info,
+                         "time": time.strftime("%m/%d/%y %H:%M:%S")})
+
+    @classmethod
+    def Resume(cls, path, info):
+        """Opens the journal of an interrupted session to resume it.
+
+        return: the SessionJournal, or None if there is no journal at path, its
+                session finished, no step was completed, or its parameters
+                don't match info
+        """
+        (events, length) = ReadEvents(path)
+        if (not events) or (events[0].get("e") != "start"):
+            return None
+        if (events[0].get("info") != info):
+            return None
+        if any(event.get("e") == "end" for event in events):
+            return None
+        if not any(event.get("e") == "mark" for event in events):
+            return None
+        return cls(path, info, events, length)
+
+    @staticmethod
+    def Completed(path, info):
+        """Returns True if the journal at path is of a finished session with
+        the parameters in info.
+        """
+        (events, length) = ReadEvents(path)
+        return (bool(events) and (events[0].get("e") == "start") and
+                (events[0].get("info") == info) and
+                any(event.get("e") == "end" for event in events))
+
+    def Replay(self, events):
+        """Restores schedules, and the log text, records, completed steps and
+        state up to the last mark, from the events of a journal.
+        """
+        pendingLog = []
+        pendingRecords = []
+        for event in events:
+            kind = event.get("e")
+            if (kind == "schedule"):
+                self.schedules[event["name"]] = event["value"]
+            elif (kind == "log"):
+                pendingLog.append(event["text"])
+            elif (kind == "record"):
+                pendingRecords.append(tuple(event["record"]))
+            elif (kind == "mark"):
+                self.marks.add(event["name"])
+                self.state.update(event.get("state", {}))
+                self.logText += ''.join(pendingLog)
+                self.records.extend(pendingRecords)
+                pendingLog = []
+                pendingRecords = []
+            elif (kind in ("discard", "resume")):
+                #Left by an unfinished step, which is run again
+                pendingLog = []
+                pendingRecords = []
+
+    def Append(self, event):
+        """Queues an event to be written to the journal file.
+        """
+        if (self.writer is not None):
+            self.writer.write(json.dumps(event) + "\n")
+
+    def Schedule(self, name, makeFunc):
+        """Returns the schedule of the given name: the journaled one if the
+        session is resumed, otherwise the one makeFunc() generates, which is
+        journaled. Schedules are stored as JSON, so tuples come back as lists.
+        """
+        if (name not in self.schedules):
+            self.schedules[name] = makeFunc()
+            self.Append({"e": "schedule", "name": name,
+                         "value": self.schedules[name]})
+        return self.schedules[name]
+
+    def Preload(self, schedule):
+        """Journals pre-generated schedules (see schedcache.py), so Schedule()
+        returns them rather than generating new ones. Schedules the journal
+        already has (those of a resumed session) are kept.
+
+        schedule: dict of schedules, by name
+        """
+        for name in sorted(schedule):
+            if (name not in self.schedules):
+                self.Schedule(name, lambda: schedule[name])
+
+    def Log(self, text):
+        """Journals text written to the logfile.
+        """
+        self.Append({"e": "log", "text": text})
+
+    def Record(self, record):
+        """Journals a typed trial record.
+        """
+        self.Append({"e": "record", "record": list(record)})
+
+    def Mark(self, step, state=None):
+        """Marks a step as completed, with the task state after it (a dict of
+        JSON values, e.g. {"scores": scoreList}), and syncs the journal.
+        """
+        self.marks.add(step)
+        if (state is not None):
+            self.state.update(json.loads(json.dumps(state)))
+        self.Append({"e": "mark", "name": step, "state": state or {}})
+        if (self.writer is not None):
+            self.writer.Sync()
+
+    def Discard(self):
+        """Drops the log text and records journaled since the last mark, those
+        of an unfinished step that is to be run again on resume.
+        """
+        self.Append({"e": "discard"})
+
+    def Done(self, step):
+        """Returns True if the step was completed.
+        """
+        return step in self.marks
+
+    def State(self, key, default=None):
+        """Returns the task state saved by the last mark that set key.
+        """
+        return self.state.get(key, default)
+
+    def Close(self, finished=True):
+        """Marks the session as finished, and closes the journal file. A
+        session that didn't finish (one quit with escape) isn't marked, so it
+        can be resumed.
+        """
+        if (finished):
+            self.Append({"e": "end",
+                         "time": time.strftime("%m/%d/%y %H:%M:%S")})
+        if (self.writer is not None):
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,67 @@
+"""Response input backends used by FrameScheduler to collect keypresses during
+trials. Both backends tie the RT clock to the stimulus onset flip, using
+window.callOnFlip(), and return keypresses as [key, RT] lists.
+
+class EventInput: polls psychopy.event, timestamping keys with the task's clock
+    when the key event is read. This is the original behaviour of the suite.
+
+class KeyboardInput: uses psychopy.hardware.keyboard, which (with the
+    psychtoolbox backend installed) timestamps keys from the OS key events, so
+    RTs do not include polling latency.
+
+MakeKeyInput(name) returns the backend named by BACKENDS.
+"""
+
+from psychopy.event import clearEvents, getKeys
+
+BACKENDS = ('event', 'keyboard')
+
+
+def MakeKeyInput(name='event'):
+    """Creates the response input backend of the given name.
+    """
+    if (name == 'keyboard'):
+        return KeyboardInput()
+    elif (name == 'event'):
+        return EventInput()
+    raise ValueError("Unknown input backend: %s" %(name))
+
+
+class EventInput(object):
+
+    def Arm(self, window, clock):
+        """Sets up input to be cleared, and the clock reset, on the next flip.
+        """
+        window.callOnFlip(clearEvents)
+        if (clock is not None):
+            window.callOnFlip(clock.reset)
+
+    def GetKeys(self, keyList, clock):
+        """Returns the keypresses since the last call as [key, RT] lists.
+        """
+        return [list(key) for key in getKeys(keyList=keyList, timeStamped=clock)]
+
+
+class KeyboardInput(object):
+
+    def __init__(self):
+
+        from psychopy.hardware.keyboard import Keyboard
+        self.keyboard = Keyboard()
+
+    def Arm(self, window, clock):
+        """Sets up input to be cleared, and the keyboard clock reset, on the
+        next flip. RTs are timed with the keyboard's own clock; the task's
+        clock is reset as well, so anything else timed with it lines up.
+        """
+        window.callOnFlip(self.keyboard.clearEvents)
+        window.callOnFlip(self.keyboard.clock.reset)
+        if (clock is not None):
+            window.callOnFlip(clock.reset)
+
+    def GetKeys(self, keyList, clock):
+        """Returns the keypresses since the last call as [key, RT] lists, with
+        RT taken from the key event's timestamp.
+        """
+        keys = self.keyboard.getKeys(keyList=keyList, waitRelease=False)
+        return [[key.name, key.rt] for key in keys]
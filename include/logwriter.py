@@ -0,0 +1,155 @@
+"""Class LogWriter is the logfile the tasks write trial records to. It stands in
+for the file object MDTSuite.MakeLog() used to return (write(), flush() and
+close() behave the same), but write() only queues the text: a background thread
+writes queued text to disk in batches, so a slow disk can't hold up the next
+trial. The text written is exactly what was passed to write(), in order.
+
+flush() blocks until everything written so far is on disk (the file is flushed
+and fsync'd). Tasks call it at phase boundaries (Begin Study, Begin Test), and
+close() does the same before closing the file, e.g. after the scores are
+written. Sync() asks for the same without waiting for it. A LogWriter left
+open is closed when the program exits.
+
+If a journal (see journal.py) is given, everything written is also passed to
+it, so a crashed session's logfile can be rebuilt.
+"""
+
+import atexit
+import os
+import threading
+
+from queue import Queue, Empty
+
+#Queued to request a flush and fsync, without waiting for it
+SYNC = object()
+
+
+class LogWriter(object):
+
+    BATCH_SIZE = 64
+
+    def __init__(self, path, batchSize=BATCH_SIZE, mode='w', journal=None):
+        """path: the logfile to create (an existing file is overwritten)
+        batchSize: the most queued writes combined into one write to disk
+        mode: 'w' to overwrite an existing file, 'a' to append to it
+        journal: optional SessionJournal everything written is passed to
+        """
+        self.path = path
+        self.file = open(path, mode)
+        self.batchSize = batchSize
+        self.journal = journal
+        self.queue = Queue()
+        self.error = None
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.Run)
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def Run(self):
+        """Writes queued text to the file until close() is called. Queued
+        threading.Events are flush requests: everything queued before one is
+        written and synced to disk before it is set. SYNC requests the same,
+        without anything waiting on it. Should anything go wrong, the error is
+        kept and flush requests are still answered, so no caller is left
+        waiting on a thread that has stopped.
+        """
+        done = False
+        while (not done):
+            items = [self.queue.get()]
+            while (len(items) < self.batchSize):
+                try:
+                    items.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                done = self.WriteBatch(items)
+            except Exception as e:
+                if (self.error is None):
+                    self.error = e
+                for item in items:
+                    if hasattr(item, 'set'):
+                        item.set()
+                done = any(item is None for item in items)
+
+    def WriteBatch(self, items):
+        """Writes a batch of queued items, answering its flush requests.
+
+        return: True if the batch ends with the request to close
+        """
+        pending = []
+        for item in items:
+            if (item is None) or (item is SYNC) or hasattr(item, 'set'):
+                self.Write(pending, sync=True)
+                pending = []
+                if (item is SYNC):
+                    continue
+                if (item is None):
+                    return True
+                item.set()
+            else:
+                pending.append(item)
+        self.Write(pending)
+        return False
+
+    def Write(self, texts, sync=False):
+        """Writes a batch of text to the file, then flushes and fsyncs it if
+        sync is set. An error is kept, and raised by the next write(), flush()
+        or close() call, on the caller's thread.
+        """
+        if (self.error is not None):
+            return
+        try:
+            if (texts):
+                self.file.write(''.join(texts))
+            if (sync):
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        except Exception as e:
+            self.error = e
+
+    def CheckError(self):
+        """Raises the error the background thread hit, if any.
+        """
+        if (self.error is not None):
+            raise self.error
+
+    def write(self, text):
+        """Queues text to be written to the logfile.
+        """
+        if (self.closed):
+            raise ValueError("I/O operation on closed log file")
+        self.CheckError()
+        self.queue.put(text)
+        if (self.journal is not None):
+            self.journal.Log(text)
+
+    def Sync(self):
+        """Requests everything written so far to be synced to disk, without
+        waiting for it.
+        """
+        if (not self.closed):
+            self.queue.put(SYNC)
+
+    def flush(self):
+        """Blocks until everything written so far is on disk.
+        """
+        if (self.closed):
+            return
+        synced = threading.Event()
+        self.queue.put(synced)
+        synced.wait()
+        self.CheckError()
+
+    def close(self):
+        """Writes out everything queued, syncs and closes the logfile.
+        """
+        if (self.closed):
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        self.CheckError()
@@ -0,0 +1,118 @@
+"""Class ImageManifest keeps a per-set record of each stimulus image's pixel
+dimensions, aspect ratio, content hash (sha1) and file modification time/size,
+stored as a "manifest.json" file within the set's image directory. Tasks use it
+to look up an image's size or hash without opening the image file.
+
+The manifest is checked against the directory each time it is loaded. Entries
+for new or modified files (differing mtime or size) are re-read, entries for
+removed files are dropped, and the file is rewritten if anything changed.
+
+Running this file builds/refreshes the manifest of each given directory:
+    python include/manifest.py images/mdto_images/Set_1 [...]
+"""
+
+import os, sys, json, hashlib
+from PIL import Image
+from stimindex import OpenIndex
+
+
+class ImageManifest(object):
+
+    MANIFEST_NAME = "manifest.json"
+    MANIFEST_VERSION = 2
+    IMAGE_TYPES = ('.jpg', '.jpeg', '.JPG', '.png')
+
+    def __init__(self, imgDir):
+
+        self.imgDir = imgDir
+        self.path = os.path.join(imgDir, self.MANIFEST_NAME)
+        self.entries = {}
+        self.Load()
+
+    def ReadEntry(self, imagePath, stat):
+        """Reads the header and hash of an image and returns its manifest entry.
+        """
+        im = Image.open(imagePath)
+        width, height = im.size
+        with open(imagePath, 'rb') as f:
+            sha1 = hashlib.sha1(f.read()).hexdigest()
+        return {"width": width, "height": height,
+                "aspect": width / float(height), "sha1": sha1,
+                "mtime": stat.st_mtime, "size": stat.st_size}
+
+    def Load(self):
+        """Reads the stored manifest, if there is one, then refreshes any
+        entries that are stale, and saves the manifest if it changed.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if (stored.get("version") == self.MANIFEST_VERSION):
+                self.entries = stored["images"]
+        except (IOError, OSError, ValueError, KeyError):
+            self.entries = {}
+
+        if self.Refresh():
+            self.Save()
+
+    def Refresh(self):
+        """Brings the entries in line with the image files in the directory.
+
+        return: True if any entry was added, updated or removed
+        """
+        changed = False
+        found = set()
+        for image in OpenIndex(self.imgDir).Names(self.IMAGE_TYPES):
+            found.add(image)
+            imagePath = os.path.join(self.imgDir, image)
+            stat = os.stat(imagePath)
+            entry = self.entries.get(image)
+            if ((entry is None) or (entry["mtime"] != stat.st_mtime) or
+                (entry["size"] != stat.st_size)):
+                self.entries[image] = self.ReadEntry(imagePath, stat)
+                changed = True
+
+        for image in list(self.entries.keys()):
+            if (image not in found):
+                del self.entries[image]
+                changed = True
+        return changed
+
+    def Save(self):
+        """Writes the manifest to disk. A read-only image directory is not an
+        error; the manifest is then simply rebuilt on the next load.
+        """
+        tmpPath = self.path + ".tmp"
+        try:
+            with open(tmpPath, 'w') as f:
+                json.dump({"version": self.MANIFEST_VERSION,
+                           "images": self.entries}, f, indent=1, sort_keys=True)
+            os.replace(tmpPath, self.path)
+        except (IOError, OSError):
+            pass
+
+    def Get(self, image):
+        """Returns the manifest entry (dict) of an image filename, or None.
+        """
+        return self.entries.get(image)
+
+    def Size(self, image):
+        """Returns the (width,height) of an image filename. Images outside the
+        manifest are read from disk and added to the in-memory entries.
+
+        image: image filename, or a full path to the image
+        """
+        name = os.path.basename(image)
+        entry = self.entries.get(name)
+        if (entry is None):
+            imagePath = image if os.path.isfile(image) else (
+                os.path.join(self.imgDir, name))
+            entry = self.ReadEntry(imagePath, os.stat(imagePath))
+            self.entries[name] = entry
+        return (entry["width"], entry["height"])
+
+
+if __name__ == "__main__":
+    for imgDir in sys.argv[1:]:
+        manifest = ImageManifest(imgDir)
+        print("{}: {} images".format(manifest.path, len(manifest.entries)))
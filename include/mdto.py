@@ -25,40 +25,98 @@ they are similar to the "targets" previously shown.
 
 from __future__ import division
 import os, sys, math, random, numpy
-from psychopy.visual import Window, ImageStim, TextStim, ShapeStim
-from psychopy.event import clearEvents, getKeys, waitKeys
-from psychopy.core import Clock, wait
-from PIL import Image
-import glob
+from psychopy.visual import ShapeStim
+from psychopy.event import clearEvents, waitKeys
+from psychopy.core import Clock
+from stimcache import StimulusCache
+from prefetch import ImagePrefetcher
+from manifest import ImageManifest
+from derivcache import DerivativeCache
+from stimpack import OpenPack
+from stimpool import StimulusPool
+from textcache import TextCache
+from framesched import FrameScheduler
+from sessionwindow import MakeWindow
+from journal import SessionJournal
+from schedules import BuildSchedule
+from stimindex import OpenIndex
+from scoring import Tally
 
 class MDTO(object):
 
     def __init__(self, logfile, imgDir, screenType, expVariant,
-                trialDuration, ISI, trialsPer, selfPaced, practiceTrials, inputButtons, pauseButton):
+                trialDuration, ISI, trialsPer, selfPaced, practiceTrials, inputButtons, pauseButton,
+                stimPool=None, keyInput=None, trialData=None, journal=None,
+                rng=None, window=None, scheduleRng=None):
 
         self.logfile = logfile
+        #Typed per-trial records (a TrialData), kept alongside the logfile
+        self.trialData = trialData
+        #Session journal: schedules are reused, and steps skipped, on resume
+        self.journal = journal if journal is not None else SessionJournal()
+        #Random number generators of this task (the random module by default):
+        #one for its schedule, the other for practice images and ITIs
+        self.rng = rng if rng is not None else random
+        self.scheduleRng = scheduleRng if scheduleRng is not None else self.rng
         self.expVariant = expVariant
         self.trialDuration = trialDuration
         self.selfPaced = selfPaced
         self.ISI = ISI
         self.trialsPer = trialsPer
         self.imgDir = imgDir
-        self.leftOvers = []
-        self.splitLures = self.SplitLures()
-        self.splitSingles = self.SplitSingles()
+        self.index = OpenIndex(self.imgDir, "MDTO")
+        self.manifest = ImageManifest(self.imgDir)
+        #Lures, singles, and the study and test lists (see schedules.py)
+        self.schedule = BuildSchedule("MDTO", self.imgDir, self.trialsPer,
+                                      self.scheduleRng, journal=self.journal)
+        (self.splitLures, self.splitSingles) = self.schedule["lures"]
         self.runPracticeTrials = practiceTrials
         self.leftButton  = inputButtons[0]
         self.rightButton = inputButtons[1]
         self.pauseButton = pauseButton
 
-        if (screenType == 'Windowed'):
-            screenSelect = False
-        elif (screenType == 'Fullscreen'):
-            screenSelect = True
-
-        self.window = Window(fullscr=screenSelect,units='pix', 
-                             color='White',allowGUI=False)
+        #Draw in the session's window if given, otherwise in one of its own
+        self.ownWindow = (window is None)
+        self.window = window if window is not None else MakeWindow(screenType)
+        self.scheduler = FrameScheduler(self.window, keyInput)
         self.imageWidth = self.window.size[1]/3
+        self.derivCache = DerivativeCache(self.imgDir, self.imageWidth,
+                                          self.manifest)
+        self.derivCache.Build()
+        self.stimPack = OpenPack(self.derivCache)
+        self.stimCache = StimulusCache(self.window, self.LoadImage)
+        self.stimPool = stimPool if stimPool is not None else StimulusPool()
+        self.stimPool.SetWindow(self.window)
+        self.stimPool.Preallocate([StimulusPool.CENTER])
+        self.prefetcher = None
+
+        #Fixed prompts, laid out once for the window by PreloadPrompts()
+        self.pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
+        self.welcomePrompt = "Thank you for participating in our study! Press '{}' to begin".format(self.pauseButton)
+        self.practicePrompt = "Let's practice. ('{}' to continue)".format(self.pauseButton)
+        self.practiceStudyPrompt = " Outdoor or Indoor? ('{}' to continue)".format(self.pauseButton)
+        self.practiceTestPrompt = " Old or new? ('{}' to continue)".format(self.pauseButton)
+        self.studyPrompt = ("Let's do the real test. \n\n Are the following objects indoor or outdoor? \n\n Press 'p' to continue"
+                           )
+        self.testPrompt = ("In this phase, another sequence of images will be shown"
+                          "\n\nAre the objects old or new?\n\n Press 'p' to continue."
+                          )
+        self.exitPrompt = ("This concludes the session. Thank you for "
+                           "participating!\n\nPress Esc to quit")
+        #ECog variant: the response keys are '1' and '2'
+        self.studyPromptE = ("In the following phase, a sequence of images "
+                             "will be shown.\n\n-Press '1' if the image is of "
+                             "an indoor object.\n\n-Press '2' if the image is "
+                             "of an outdoor object.\n\n\nPress '{}' to "
+                             "begin".format(self.pauseButton))
+        self.testPromptE = ("In this phase, another sequence of images will be "
+                            "shown.\n\n-Press '1' if the image presented was "
+                            "also shown in the previous phase. (Old Image)"
+                            "\n\n-Press '2' if the image presented was not "
+                            "shown in the previous phase. (New Image)\n\n\n"
+                            "Press '{}' to begin".format(self.pauseButton))
+        self.textCache = TextCache(self.window)
+        self.PreloadPrompts()
 
         #Define the black box that appears in the lower left, to signal EEG
         rW = 110    #Width 
@@ -77,121 +135,49 @@ class MDTO(object):
         for i in range(0,4):
             self.scoreList.append([0,0,0])
 
-    def GrabFileType(self, fileList, exts):
-        """Takes an inputted list, as well as extension, and returns a list with
-        the elements in the original list that have the desired extension.
-
-        fileList: The list of files to search through
-        ext: string containing the extension type, e.g. ".jpg", ".png"
-
-        return: a new list, containing files only of ext type
-        """
-        fileListofType = []
-
-        for aFile in fileList:
-            for ext in exts:
-                ftLen = len(ext)
-                if (aFile[-ftLen:] == ext):
-                    fileListofType.append(aFile)
-                    break
-
-        return fileListofType
-
+        #Phases quit with escape; a session with any is left to be resumed
+        self.escapes = 0
 
-    def SplitLures(self):
-        """Creates and returns a list of image lures. Lures are taken from
-        both the lure high and lure low directory, and an equal amount of 
-        each are put into the list. Each element in the returned list has 2
-        elements: [imgA,imgB] and a number, pertaining to the difficulty of
-        the lure, i.e. the  degree of apparent difference between the two images.
 
-        Return: a list, each element being: [[imgA,imgB], lureNum]
+    def PreloadPrompts(self):
+        """Lays out all of the task's fixed prompts in the text cache, so that
+        each is shown without delay the first time it is needed.
         """
-        dirFiles = os.listdir(self.imgDir)
-        imgTypes = ['.jpg', '.jpeg', '.JPG']
-        allImgs = self.GrabFileType(dirFiles, imgTypes)
-        allImgs = [img for img in allImgs if "PR" not in img]
-        lureLowImgs = []
-        lureHighImgs = []
-        for img in allImgs:
-            if (img[5] == "1"):
-                lureHighImgs.append(img)
-            elif (img[5] == "2"):
-                lureLowImgs.append(img)
-
-        #Sort images by name
-        lureHighImgs.sort()
-        lureLowImgs.sort()
-
-        #Return a list of lures as a list w/: [[imgA,imgB],lureType]
-        def LureListGroup(imgList):
-            lureList = []
-            for i in range(0, int(len(imgList)/2)):
-                imgA = imgList[i*2]
-                imgB = imgList[(i*2)+1]
-                highSet = [imgA,imgB]
-                lureList.append(highSet)
-            return lureList
-
-        #Create list of lures with embedded structure, then shuffle
-        lureHighList = LureListGroup(lureHighImgs)
-        lureLowList = LureListGroup(lureLowImgs)
-        random.shuffle(lureHighList)
-        random.shuffle(lureLowList)
-
-        #Put number (num of trials) of list items from both lists into list
-        selectedList = []
-        for i in range(0, self.trialsPer):
-            selectedList.append(lureHighList[i])
-            selectedList.append(lureLowList[i])
-
-        #Unused "leftover" A images will be used as singles
-        #Probably want to use other method while seeded rand unimplemented
-        #OK for now
-        for i in range(self.trialsPer+1, len(lureHighList)):
-            try:
-                self.leftOvers.append(lureHighList[i][0])
-            except IndexError:
-                pass
-            try:
-                self.leftOvers.append(lureLowList[i][0])
-            except IndexError:
-                pass
-
-        random.shuffle(selectedList)
-        return selectedList
-        
-    def SplitSingles(self):
-        """Creates and returns a list of image "singles". Each item in the
-        list is an image, followed by either "sF" (single Foil) or "sR"
-        (single repeat), indicating if it is to be shown once or twice.
-
-        return: list composed of [imageFileName, type]
-                type: "sR" or "sF"
-        """
-        singles = self.leftOvers
-        targetsFoils = []
-        for i in range(0, self.trialsPer*2):
-            if (i % 2 == 0):
-                targetsFoils.append([singles[i],"sR"])
-            else:
-                targetsFoils.append([singles[i],"sF"])
-
-        random.shuffle(targetsFoils)
-        return targetsFoils
+        prompts = [(self.pauseMsg, {'color': 'Black', 'height': 40})]
+        for prompt in [self.welcomePrompt, self.practicePrompt,
+                       self.practiceStudyPrompt, self.practiceTestPrompt,
+                       self.studyPrompt, self.testPrompt, self.exitPrompt]:
+            prompts.append((prompt, {'color': 'Black'}))
+        if (self.expVariant == "ECog"):
+            for prompt in [self.studyPromptE, self.testPromptE]:
+                prompts.append((prompt, {'color': 'Black'}))
+            posLeftText = (-(self.window.size[0]/8), 0)
+            posRightText = ((self.window.size[0]/8), 0)
+            for msg, pos in [("Indoor\n\n    1", posLeftText),
+                             ("Outdoor\n\n     2", posRightText),
+                             ("Old\n\n  1", posLeftText),
+                             ("New\n\n  2", posRightText)]:
+                prompts.append((msg, {'pos': pos, 'color': 'Black',
+                                      'height': 50}))
+        self.textCache.Preload(prompts)
 
     def Pause(self):
         """Pauses the task, and displays a message waiting for a spacebar
         input from the user before continuing to proceed.
         """
-        pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
-        pauseText = TextStim(self.window, text=pauseMsg, color='Black', height=40)
+        pauseText = self.textCache.Get(self.pauseMsg, color='Black', height=40)
         pauseText.draw(self.window)
         self.window.flip()
         waitKeys(keyList=[self.pauseButton])
         clearEvents()
 
 
+    def ImagePath(self, image):
+        """Returns the path to load for an image filename: its display sized
+        derivative, or the original image if that is already small enough.
+        """
+        return self.derivCache.Get(image)
+
     def ScaleImage(self, image, maxSize = 350):
         """Scales the size of the image to fit as largely as it can within the 
         window of the defined maxSize, while preserving its aspect ratio.
@@ -200,14 +186,63 @@ class MDTO(object):
         maxSize: maximum size, in pixels of image
         return: maximum scaling of image
         """
-        im = Image.open(image)
-        larger = im.size[0]
-        if (im.size[0] < im.size[1]):
-            larger = im.size[1]
+        imSize = self.manifest.Size(image)
+        larger = imSize[0]
+        if (imSize[0] < imSize[1]):
+            larger = imSize[1]
         scale = larger / maxSize
-        scaledSize = (im.size[0]/scale, im.size[1]/scale)
+        scaledSize = (imSize[0]/scale, imSize[1]/scale)
         return scaledSize
 
+    def PreloadStimuli(self):
+        """Loads every study and test image (all lure pairs and singles) into
+        the stimulus cache, so that the decode and texture upload of each
+        image happens once, before the study phase, rather than in a trial.
+        """
+        images = []
+        for pair in self.splitLures:
+            images.extend(pair)
+        for img in self.splitSingles:
+            images.append(img[0])
+        self.stimCache.Preload(images,
+            lambda image: self.ScaleImage(image, self.imageWidth))
+
+    def LoadImage(self, image):
+        """Returns what ImageStim.setImage() should be given for an image
+        filename: its pixels from the stimulus pack, if one was built for this
+        window size, otherwise the (prefetched) display sized image.
+        """
+        if ((self.stimPack is not None) and (image in self.stimPack)):
+            return self.stimPack.GetImage(image)
+        return self.FetchImage(self.ImagePath(image))
+
+    def StartPrefetch(self, images):
+        """Starts decoding the given images on a background thread, in the
+        order they will be shown, so trials can take them via FetchImage().
+
+        images: list of image filenames, in trial order
+        """
+        self.StopPrefetch()
+        if (self.stimPack is not None):
+            images = [img for img in images if img not in self.stimPack]
+        imagePaths = [self.ImagePath(img) for img in images]
+        self.prefetcher = ImagePrefetcher(imagePaths)
+
+    def StopPrefetch(self):
+        """Stops the background decoding started by StartPrefetch(), if any.
+        """
+        if (self.prefetcher is not None):
+            self.prefetcher.Stop()
+            self.prefetcher = None
+
+    def FetchImage(self, imagePath):
+        """Returns the decoded image from the prefetcher if one is running,
+        otherwise the path itself, for ImageStim to load from disk.
+        """
+        if (self.prefetcher is None):
+            return imagePath
+        return self.prefetcher.Get(imagePath)
+
     def RunTrialECog(self, image, phase):
         """Runs a particular trial for an ECog (Electrocorticography) based 
         task. An ECog trial runs as follows: display the image along with
@@ -215,23 +250,20 @@ class MDTO(object):
         for <ISI> amount of time, then asking for and getting subject input
         for <ITI> amount of time.
 
-        image: the stimuli to display on screen
+        image: the image (filename) to display
         phase: 0 (Study Phase) - prompts user "Indoor / Outdoor"
                1 (Test Phase) - prompts user "Old / New"
         return: [keyPress, reactionTime]
         """
-        theImage = ImageStim(self.window)
-        #Set the full path of the image, based on the image's lure type
-        if (image[0][5] == "3"):
-            image = (self.imgSnglDir + '%s' %(image[0]))
-        elif ((image[0][5] == "1") or (image[0][5] == "2")):
-            image = (self.lureHighDir + '%s' %(image[0]))
-        elif ((image[0][5] == "4") or (image[0][5] == "5")):
-            image = (self.lureLowDir + '%s' %(image[0]))
-
-        theImage.setImage(image)
-        imageSize = self.ScaleImage(image, self.imageWidth)
-        theImage.setSize(imageSize)
+        self.scheduler.StartPrep(image)
+        #Use the preloaded stimulus if there is one, otherwise load it as
+        #RunTrial() does
+        theImage = self.stimCache.Get(image)
+        if (theImage is None):
+            imageSize = self.ScaleImage(image, self.imageWidth)
+            theImage = self.stimPool.Acquire(StimulusPool.CENTER,
+                                             imageSize, (0,0))
+            theImage.setImage(self.LoadImage(image))
 
         ecogISI = 0.5
         posLeftText = (-(self.window.size[0]/8), 0)
@@ -245,26 +277,27 @@ class MDTO(object):
             leftMsg = "Old\n\n  1"
             rightMsg = "New\n\n  2"
 
-        theImage.draw(self.window)
-        self.blackBox.draw(self.window)
-        self.window.flip()
-        wait(ecogTrialDur,ecogTrialDur)
-        self.window.flip()
-        wait(ecogISI, ecogISI)
-        textLeft = TextStim(self.window, text=leftMsg, pos=posLeftText, 
-                            color='Black', height=50)
-        textRight = TextStim(self.window, text=rightMsg, pos=posRightText,
-                             color='Black', height=50)
-        textLeft.draw(self.window)
-        textRight.draw(self.window)
-        self.window.flip()
-        clearEvents()
-        self.clock.reset()
-        keyPresses = waitKeys(keyList=['1','2','space','escape'],
-                              timeStamped=self.clock, maxWait=1.5)
-        self.window.flip()
-        random.shuffle(self.rangeITI)
-        wait(self.rangeITI[0],self.rangeITI[0])
+        textLeft = self.textCache.Get(leftMsg, pos=posLeftText,
+                                      color='Black', height=50)
+        textRight = self.textCache.Get(rightMsg, pos=posRightText,
+                                       color='Black', height=50)
+
+        def DrawImage():
+            theImage.draw(self.window)
+            self.blackBox.draw(self.window)
+
+        def DrawText():
+            textLeft.draw(self.window)
+            textRight.draw(self.window)
+
+        #Image, ISI, response prompt and ITI are all counted in frames
+        self.scheduler.Present(DrawImage, ecogTrialDur)
+        self.scheduler.Blank(ecogISI)
+        self.scheduler.StartPrep(leftMsg.split()[0] + "/" + rightMsg.split()[0])
+        keyPresses = self.scheduler.PresentUntilKey(DrawText,
+            ['1','2','space','escape'], self.clock, maxDuration=1.5)
+        self.rng.shuffle(self.rangeITI)
+        self.scheduler.Blank(self.rangeITI[0])
 
         if (not keyPresses):
             return '',0
@@ -277,26 +310,18 @@ class MDTO(object):
         image: the image (filename) to display
         returns: [keyPress, reaction time]
         """
-        theImage = ImageStim(self.window)
-        imagePath = os.path.normpath(self.imgDir + "/%s" %(image))
-
-        theImage.setImage(imagePath)
-        imageSize = self.ScaleImage(imagePath, self.imageWidth)
-        theImage.setSize(imageSize)
-        theImage.draw(self.window)
-        self.window.flip()
-        clearEvents()
-        self.clock.reset()
-        keyPresses = []
-        if (self.selfPaced == False):
-            wait(self.trialDuration,self.trialDuration)
-            keyPresses = getKeys(keyList=[self.leftButton, self.rightButton,self.pauseButton,'escape'],
-                                 timeStamped=self.clock)
-        elif (self.selfPaced == True):
-            keyPresses = waitKeys(keyList=[self.leftButton, self.rightButton,self.pauseButton,'escape'],
-                                timeStamped=self.clock)
-        self.window.flip()
-        wait(self.ISI)
+        self.scheduler.StartPrep(image)
+        #Use the preloaded stimulus if there is one, otherwise load from disk
+        theImage = self.stimCache.Get(image)
+        if (theImage is None):
+            imageSize = self.ScaleImage(image, self.imageWidth)
+            theImage = self.stimPool.Acquire(StimulusPool.CENTER,
+                                             imageSize, (0,0))
+            theImage.setImage(self.LoadImage(image))
+        keyPresses = self.scheduler.PresentTrial(theImage.draw,
+            self.trialDuration, self.ISI,
+            [self.leftButton, self.rightButton,self.pauseButton,'escape'],
+            self.clock, self.selfPaced)
         if (not keyPresses):
             return '',0
         return keyPresses[0][0],keyPresses[0][1]
@@ -308,50 +333,42 @@ class MDTO(object):
         reaction times are recorded during this period, and no "right or
         wrong" answers are graded.
         """
+        if (self.journal.Done("study")):
+            return 1
         ecog = False if self.expVariant != "ECog" else True
-        studyPromptN = ("Let's do the real test. \n\n Are the following objects indoor or outdoor? \n\n Press 'p' to continue"
-                       )
-        '''
-        studyPromptE = ("In the following phase, a sequence of images will be "
-                        "shown.\n\n-Press '1' if the image is of an indoor "
-                        "object.\n\n-Press '2' if the image is of an outdoor "
-                        "object.\n\n\nPress space to begin"
-                       )
-        ''' 
-        studyText = TextStim(self.window,studyPromptN,color='Black')
+        studyText = self.textCache.Get(self.studyPrompt,color='Black')
         if ecog:
-            studyText = TextStim(self.window,studyPromptE,color='Black')
+            studyText = self.textCache.Get(self.studyPromptE,color='Black')
         studyText.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=[self.pauseButton,'escape'])
         if (continueKey[0] == 'escape'):
             self.logfile.write("\n\n\nStudy Not Run\n\n")
+            self.escapes += 1
             return 0
 
-        self.logfile.write("\nBegin Study\n\n")
-        logStudyFormat = '{:<7}{:<12s} {:<10s} {:<10s} {:<4s}\n'.format(
-                         'Trial','Image','ImageType','Response','RT')
-        self.logfile.write(logStudyFormat)
+        if (not self.journal.Done("study:begin")):
+            self.logfile.write("\nBegin Study\n\n")
+            self.logfile.flush()
+            logStudyFormat = '{:<7}{:<12s} {:<10s} {:<10s} {:<4s}\n'.format(
+                             'Trial','Image','ImageType','Response','RT')
+            self.logfile.write(logStudyFormat)
+            self.journal.Mark("study:begin")
         
         #Create list for study: "A" pairs (targets), and repeat singles
-        studyImgList = []
-        for pair in self.splitLures:
-            studyImgList.append([pair[0],pair[0][5]])
-        for img in self.splitSingles:
-            if (img[1] == "sR"):
-                studyImgList.append(img)
-
-        #Shuffle study list
-        random.shuffle(studyImgList)
+        studyImgList = self.schedule["studyList"]
 
-        #Run trial for each study image
+        #Run trial for each study image, skipping those already run
         for i in range(0, len(studyImgList)):
+            if (self.journal.Done("study:%d" %(i+1))):
+                continue
             if not ecog:
                 (response, RT) = self.RunTrial(studyImgList[i][0])
             else:
                 (response, RT) = self.RunTrialECog(studyImgList[i][0], 0)
             if (response == "escape"):
                 self.logfile.write("\n\nStudy terminated early\n\n")
+                self.escapes += 1
                 return 0
             elif (response == self.pauseButton):
                 self.Pause()
@@ -359,7 +376,12 @@ class MDTO(object):
             trialFormat = '{:<7}{:<17s}{:<10s}{:<6s}{:<4.3f}\n'.format(
                     i+1, studyImgList[i][0],studyImgList[i][1],response,RT)
             self.logfile.write(trialFormat)
+            if (self.trialData is not None):
+                self.trialData.Add("study", 1, i+1, studyImgList[i][0],
+                    trialType=studyImgList[i][1], response=response, rt=RT)
+            self.journal.Mark("study:%d" %(i+1))
         
+        self.journal.Mark("study")
         return 1
         
     def RunTest(self):
@@ -372,45 +394,37 @@ class MDTO(object):
         this period. Additionally, a tally is kept of whether the subjects
         answer was wrong or right, with a separate score for "pair" answers.
         """
+        if (self.journal.Done("test")):
+            return 1
         ecog = False if self.expVariant != "ECog" else True
-        testPromptN = ("In this phase, another sequence of images will be shown"
-                      "\n\nAre the objects old or new?\n\n Press 'p' to continue."
-                      )
-        '''testPromptE = ("In this phase, another sequence of images will be shown."
-                      "\n\n-Press '1' if the image presented was also shown "
-                      "in the previous phase. (Old Image)\n\n-Press '2' if the" 
-                      "image presented was not shown in the previous phase."
-                      " (New Image)\n\n\nPress space to begin"
-                      )
-        '''
-        testText = TextStim(self.window,text=testPromptN,color='Black')
+        testText = self.textCache.Get(self.testPrompt,color='Black')
         if ecog:
-            testText = TextStim(self.window,text=testPromptE,color='Black')
+            testText = self.textCache.Get(self.testPromptE,color='Black')
         
         testText.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=[self.pauseButton,'escape'])
         if (continueKey[0] == 'escape'):
             self.logfile.write("\n\n\nTest Not Run\n\n")
+            self.escapes += 1
             return 0
 
-        self.logfile.write("\nBegin Test\n\n")
-        logTestFormat = '{:<7}{:<12}{:<11}{:<9}{:<10}{:<4}\n'.format(
-            'Trial','Image','ImageType','CorResp','Response','RT')
-        self.logfile.write(logTestFormat)
+        if (not self.journal.Done("test:begin")):
+            self.logfile.write("\nBegin Test\n\n")
+            self.logfile.flush()
+            logTestFormat = '{:<7}{:<12}{:<11}{:<9}{:<10}{:<4}\n'.format(
+                'Trial','Image','ImageType','CorResp','Response','RT')
+            self.logfile.write(logTestFormat)
+            self.journal.Mark("test:begin")
 
         #Create trial list for test: B and C lures, and all singles
-        testImgList = []
-        for pair in self.splitLures:
-            testImgList.append([pair[1],pair[1][5]])
-        for img in self.splitSingles:
-            testImgList.append(img)
+        testImgList = self.schedule["testList"]
 
-        #Shuffle trial list
-        random.shuffle(testImgList)
-
-        #Run trial for each image in list, get responses
+        #Run trial for each image in list, get responses, skipping those
+        #already run
         for i in range(0, len(testImgList)):
+            if (self.journal.Done("test:%d" %(i+1))):
+                continue
 
             correct = self.rightButton
             trialType = testImgList[i][1]
@@ -422,6 +436,7 @@ class MDTO(object):
                 (response, RT) = self.RunTrialECog(testImgList[i][0], 1)
             if (response == "escape"):
                 self.logfile.write("\n\nTest terminated early\n\n")
+                self.escapes += 1
                 break
             elif (response == self.pauseButton):
                 self.Pause()
@@ -429,34 +444,17 @@ class MDTO(object):
             trialFormat = '{:<7}{:<15}{:<11}{:<9}{:<6}{:<4.3f}\n'.format(
                 i+1,testImgList[i][0],testImgList[i][1],correct,response,RT)
             self.logfile.write(trialFormat)
+            if (self.trialData is not None):
+                self.trialData.Add("test", 1, i+1, testImgList[i][0],
+                    trialType=trialType, correctKey=correct,
+                    response=response, rt=RT)
 
             #Tally scores of correct/responses
-            if (response):
-                if (trialType == "sR"):
-                    self.scoreList[0][2] += 1
-                    if (response == correct):
-                        self.scoreList[0][0] += 1
-                    else:
-                        self.scoreList[0][1] += 1
-                elif (trialType == "1"):
-                    self.scoreList[1][2] += 1
-                    if (response == correct):
-                        self.scoreList[1][0] += 1
-                    else:
-                        self.scoreList[1][1] += 1
-                elif (trialType == "2"):
-                    self.scoreList[2][2] += 1
-                    if (response == correct):
-                        self.scoreList[2][0] += 1
-                    else:
-                        self.scoreList[2][1] += 1
-                elif (trialType == "sF"):
-                    self.scoreList[3][2] += 1
-                    if (response == correct):
-                        self.scoreList[3][0] += 1
-                    else:
-                        self.scoreList[3][1] += 1
-
+            Tally(self.scoreList, "MDTO", trialType, response, correct)
+            self.journal.Mark("test:%d" %(i+1), {"scores": self.scoreList})
+        else:
+            #Only a test run through is done; one quit early is resumed
+            self.journal.Mark("test")
         return 1
     
 
@@ -466,7 +464,7 @@ class MDTO(object):
         returns the key pressed
         '''
         keylist = [self.pauseButton, 'escape']
-        text = TextStim(self.window,prompt,color='Black')
+        text = self.textCache.Get(prompt,color='Black')
         text.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=keylist)
@@ -485,27 +483,24 @@ class MDTO(object):
         Return:
            float: ratio correct
         '''
+        #Trial type of each practice pair, by its practice type
+        practiceTypes = {"foil": "sF", "target": "sR", "high": "2", "low": "1"}
         imgPairs = []
         for i in range(0, len(images)-1, 2):
-            if "foil" in images[i]:
-                t = "sF"
-            elif "target" in images[i]:
-                t = "sR"
-            elif "high" in images[i]:
-                t = "2"
-            elif "low" in images[i]:
-                t = "1"
+            t = practiceTypes.get(self.index.Get(images[i])["practiceType"])
             imgPairs.append([images[i],images[i+1], t])
 
         ### Encoding
-        self.ShowPromptAndWaitForSpace(" Outdoor or Indoor? ('{}' to continue)".format(self.pauseButton))
-        random.shuffle(imgPairs)
+        self.ShowPromptAndWaitForSpace(self.practiceStudyPrompt)
+        self.rng.shuffle(imgPairs)
         
         self.logfile.write("\nBegin Practice Encoding {}\n\n".format(practiceBlock))
         logPracticeFormat = '{:<7}{:<17}{:<11}{:<9}{:<10}{:<4}\n'.format(
             'Trial','Image','ImageType','CorResp','Response','RT')
         self.logfile.write(logPracticeFormat)
         
+        self.StartPrefetch([trial[0] for trial in imgPairs if trial[2] != 'sF'])
+
         # Run the trial for each encoding trial
         for i, trial in enumerate(imgPairs):
             imgA, imgB, trialType = trial
@@ -525,12 +520,15 @@ class MDTO(object):
 
 
         ### Test
-        self.ShowPromptAndWaitForSpace(" Old or new? ('{}' to continue)".format(self.pauseButton))
-        random.shuffle(imgPairs)
+        self.ShowPromptAndWaitForSpace(self.practiceTestPrompt)
+        self.rng.shuffle(imgPairs)
 
         self.logfile.write("\nBegin Practice Test {}\n\n".format(practiceBlock))
         self.logfile.write(logPracticeFormat)
 
+        self.StartPrefetch([trial[0] if trial[2] in ('sR','sF') else trial[1]
+                            for trial in imgPairs])
+
         # Keep track of the total number they got correct
         totalCorrect = 0
         for i, trial in enumerate(imgPairs):
@@ -545,6 +543,7 @@ class MDTO(object):
                 totalCorrect += 1
             if (response == "escape"):
                 self.logfile.write("\n\nPractice terminated early\n\n")
+                self.StopPrefetch()
                 return -1
             elif (response == self.pauseButton):
                 self.Pause()
@@ -553,6 +552,8 @@ class MDTO(object):
                 i+1,imgA,trialType,correct,response,RT)
             self.logfile.write(trialFormat)
             
+        self.StopPrefetch()
+
         # Return the percentage correct
         return totalCorrect / len(imgPairs)
 
@@ -562,15 +563,11 @@ class MDTO(object):
         If the participant gets a certain amount correct, they move on to the real test.
         '''
         
-        dirFiles = os.listdir(self.imgDir)
-        practiceImages = [img for img in dirFiles if "PR" in img]
-        
         # Run each practice session
         for i in range(3):
-            practicePrompt = "Let's practice. ('{}' to continue)".format(self.pauseButton)
-            self.ShowPromptAndWaitForSpace(practicePrompt)
+            self.ShowPromptAndWaitForSpace(self.practicePrompt)
             
-            imagesThisPracticeSession = sorted([img for img in practiceImages if "Set_{}".format(i+1) in img])
+            imagesThisPracticeSession = self.index.PracticeImages(i+1)
             results = self.RunSinglePractice(i+1, imagesThisPracticeSession)
             
             # If they get a certain percentage correct, then stop the practice
@@ -592,25 +589,31 @@ class MDTO(object):
 
         #Print task ending message to the screen, and wait escape to be prssed
         def EndExp():
-            exitPrompt = ("This concludes the session. Thank you for "
-                          "participating!\n\nPress Esc to quit")
-            exitText = TextStim(self.window, exitPrompt, color='Black')
+            exitText = self.textCache.Get(self.exitPrompt, color='Black')
             exitText.draw(self.window)
             self.window.flip()
             waitKeys(keyList=['escape'])
-            self.window.close()
+            self.stimPool.Release()
+            if (self.ownWindow):
+                self.window.close()
 
         # Show main welcome window
-        welcomePrompt = "Thank you for participating in our study! Press '{}' to begin".format(self.pauseButton)
-        self.ShowPromptAndWaitForSpace(welcomePrompt)
+        self.ShowPromptAndWaitForSpace(self.welcomePrompt)
         
-        # If run practice trials, then RunPractice
-        if self.runPracticeTrials:
+        # If run practice trials, then RunPractice (not again on resume)
+        if (self.runPracticeTrials and not self.journal.resumed):
             self.RunPractice()
+
+        #Scores tallied before the session was interrupted, if resumed
+        self.scoreList = self.journal.State("scores", self.scoreList)
         
+        #Decode and upload all study/test images before the timed phases
+        self.PreloadStimuli()
+
         #Run study, terminate if user exits early
         studyFinished = self.RunStudy()
         testFinished = self.RunTest()
+        self.stimCache.Release()
 
         if (not studyFinished):
             EndExp()
@@ -16,40 +16,89 @@ at the completion of the task.
 
 from __future__ import division
 import os,sys,math,random
-from psychopy.visual import Window, ImageStim, TextStim, Circle, ShapeStim
-from psychopy.event import clearEvents, getKeys, waitKeys
-from psychopy.core import Clock, wait
+from psychopy.visual import Circle, ShapeStim
+from psychopy.event import clearEvents, waitKeys
+from psychopy.core import Clock
 import numpy as np
+from prefetch import ImagePrefetcher
+from derivcache import DerivativeCache
+from stimpack import OpenPack
+from stimpool import StimulusPool
+from textcache import TextCache
+from framesched import FrameScheduler
+from sessionwindow import MakeWindow
+from journal import SessionJournal
+from possampler import PositionSampler
+from schedules import BuildSchedule, ImageListName
+from stimindex import OpenIndex
+from scoring import Tally
 
 class MDTS(object):
 
     def __init__(self, logfile, imgDir, screenType, 
-                 trialDuration, ISI, trialsPer, selfPaced, practiceTrials, inputButtons, pauseButton):
+                 trialDuration, ISI, trialsPer, selfPaced, practiceTrials, inputButtons, pauseButton,
+                 stimPool=None, keyInput=None, trialData=None, journal=None,
+                 rng=None, window=None, scheduleRng=None):
 
         self.logfile = logfile
+        #Typed per-trial records (a TrialData), kept alongside the logfile
+        self.trialData = trialData
+        #Session journal: schedules are reused, and steps skipped, on resume
+        self.journal = journal if journal is not None else SessionJournal()
+        #Random number generators of this task (the random module by default):
+        #one for its schedule, the other for practice images and positions
+        self.rng = rng if rng is not None else random
+        self.scheduleRng = scheduleRng if scheduleRng is not None else self.rng
         self.trialDuration = trialDuration
         self.selfPaced = selfPaced
         self.ISI = ISI
         self.trialsPer = trialsPer
         self.numTrials = (self.trialsPer * 4)  #Trials/phase = 4x trials/cond
         self.imgDir = imgDir
-        self.imgIdx = 0
         self.runPracticeTrials = practiceTrials
         self.leftButton  = inputButtons[0]
         self.rightButton = inputButtons[1]
         self.pauseButton = pauseButton
 
 
-        if (screenType == 'Windowed'):
-            screenSelect = False
-        elif (screenType == 'Fullscreen'):
-            screenSelect = True
-        self.window = Window(fullscr=screenSelect,units='pix', 
-                             color='White',allowGUI=False)
+        #Draw in the session's window if given, otherwise in one of its own
+        self.ownWindow = (window is None)
+        self.window = window if window is not None else MakeWindow(screenType)
+        self.scheduler = FrameScheduler(self.window, keyInput)
         self.imageWidth = self.window.size[1]/6
+        #Positions of practice trials (those of the task are in its schedule)
+        self.posSampler = PositionSampler(self.window.size, self.imageWidth,
+            np.random.default_rng(self.rng.getrandbits(32)))
+        self.derivCache = DerivativeCache(self.imgDir, self.imageWidth)
+        self.derivCache.Build()
+        self.stimPack = OpenPack(self.derivCache)
+        self.stimPool = stimPool if stimPool is not None else StimulusPool()
+        self.stimPool.SetWindow(self.window)
+        self.stimPool.Preallocate([StimulusPool.CENTER])
+        self.prefetcher = None
+
+        #Fixed prompts, laid out once for the window by PreloadPrompts()
+        self.pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
+        self.welcomePrompt = "Thank you for participating in our study! Press '{}' to begin".format(self.pauseButton)
+        self.practicePrompt = "Let's practice.\n\n('{}' to continue)".format(self.pauseButton)
+        self.practiceStudyPrompt = " Outdoor or Indoor? ('{}' to continue)".format(self.pauseButton)
+        self.practiceTestPrompt = "Is the object location same or new? ('{}' to continue)".format(self.pauseButton)
+        self.studyPrompt = ("Let's do the real test. \n\n Are the following objects indoor or outdoor?\n\n('{}' to continue)".format(self.pauseButton))
+        self.testPrompt = ("In this phase, you will see the same series of objects one at a time.\n\nAre the object locations same or new? \n\n('{}' to continue)".format(self.pauseButton))
+        self.exitPrompt = ("This concludes the session. Thank you for "
+                           "participating!\n\nPress Escape to quit")
+        self.textCache = TextCache(self.window)
+        self.PreloadPrompts()
 
         #Window must be set up before imgs, as img position based on window size
-        self.imageList = self.SegmentImages()
+        #(so the size is part of the schedule's name). Positions are journaled
+        #as lists, so are made tuples again
+        self.schedule = BuildSchedule("MDTS", self.imgDir, self.trialsPer,
+                                      self.scheduleRng, self.window.size,
+                                      journal=self.journal)
+        imageList = self.schedule[ImageListName(self.window.size)]
+        self.imageList = [[img, tuple(posA), tuple(posB)]
+                          for img, posA, posB in imageList]
         self.clock = Clock()
 
         #Initialize scorelist for 4 categories;; [correct,inc,resp]
@@ -57,17 +106,72 @@ class MDTS(object):
         for i in range(0,4):
             self.scoreList.append([0,0,0])
 
+        #Phases quit with escape; a session with any is left to be resumed
+        self.escapes = 0
+
+    def PreloadPrompts(self):
+        """Lays out all of the task's fixed prompts in the text cache, so that
+        each is shown without delay the first time it is needed.
+        """
+        prompts = [(self.pauseMsg, {'color': 'Black', 'height': 40})]
+        for prompt in [self.welcomePrompt, self.practicePrompt,
+                       self.practiceStudyPrompt, self.practiceTestPrompt,
+                       self.studyPrompt, self.testPrompt, self.exitPrompt]:
+            prompts.append((prompt, {'color': 'Black'}))
+        self.textCache.Preload(prompts)
+
     def Pause(self):
         """Pauses the task, and displays a message waiting for a spacebar
         input from the user before continuing to proceed.
         """
-        pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
-        pauseText = TextStim(self.window, text=pauseMsg, color='Black', height=40)
+        pauseText = self.textCache.Get(self.pauseMsg, color='Black', height=40)
         pauseText.draw(self.window)
         self.window.flip()
         waitKeys(keyList=[self.pauseButton])
         clearEvents()
         
+    def ImagePath(self, image):
+        """Returns the path to load for an image filename: its display sized
+        derivative, or the original image if that is already small enough.
+        """
+        return self.derivCache.Get(image)
+
+    def LoadImage(self, image):
+        """Returns what ImageStim.setImage() should be given for an image
+        filename: its pixels from the stimulus pack, if one was built for this
+        window size, otherwise the (prefetched) display sized image.
+        """
+        if ((self.stimPack is not None) and (image in self.stimPack)):
+            return self.stimPack.GetImage(image)
+        return self.FetchImage(self.ImagePath(image))
+
+    def StartPrefetch(self, images):
+        """Starts decoding the given images on a background thread, in the
+        order they will be shown, so trials can take them via FetchImage().
+
+        images: list of image filenames, in trial order
+        """
+        self.StopPrefetch()
+        if (self.stimPack is not None):
+            images = [img for img in images if img not in self.stimPack]
+        imagePaths = [self.ImagePath(img) for img in images]
+        self.prefetcher = ImagePrefetcher(imagePaths)
+
+    def StopPrefetch(self):
+        """Stops the background decoding started by StartPrefetch(), if any.
+        """
+        if (self.prefetcher is not None):
+            self.prefetcher.Stop()
+            self.prefetcher = None
+
+    def FetchImage(self, imagePath):
+        """Returns the decoded image from the prefetcher if one is running,
+        otherwise the path itself, for ImageStim to load from disk.
+        """
+        if (self.prefetcher is None):
+            return imagePath
+        return self.prefetcher.Get(imagePath)
+
     def CreatePosPair(self, moveType):
         """Generates two (x,y) coordinates to be associated with a particular
         image - the first being the study phase position, and second being the
@@ -82,134 +186,8 @@ class MDTS(object):
         return: a tuple of two coordinate pairs ((xA,yA),(xB,yB))
                 (start position of img, end position of img) 
         """
+        return self.posSampler.Sample(moveType, 1)[0]
 
-        #Map a bottom left oriented coordinate system to a center oriented one
-        def CoordMap(x,y):
-            xM = int(x - winL/2)
-            yM = int(y - winH/2)
-            return (xM,yM)
-
-        #Checks whether (x,y) coordinate is near corner
-        def IsNearCorner(xTest,yTest):
-            if ((xTest <= (x1+imgDis) and yTest <= (y1+imgDis)) or
-                (xTest <= (x1+imgDis) and yTest >= (y2-imgDis)) or
-                (xTest >= (x2-imgDis) and yTest <= (y1+imgDis)) or
-                (xTest >= (x2-imgDis) and yTest >= (y2-imgDis))):
-                return True
-            else:
-                return False
-
-        #Generates a random point on a circle about (xA,yA) with a given radius
-        def GenCoordMove(xA,yA,radius):
-            deg = random.randint(0,359)
-            rad = math.radians(deg)
-            vecX = math.cos(rad)
-            vecY = math.sin(rad)
-            xR = int(radius * vecX)
-            yR = int(radius * vecY)
-            xB = xA + xR
-            yB = yA + yR
-            return (xB,yB)
-
-        #Standard distance formula - use for diagnostics
-        def Dist(x1,y1,x2,y2):
-            return (math.sqrt(math.pow(x2-x1,2) + math.pow(y2-y1,2)))
-
-        #Calculate the length, in pixels, of the small/large moves
-        winL = self.window.size[0]
-        winH = self.window.size[1]
-        midDis = self.imageWidth / 2
-        imgDis = self.imageWidth
-        x2 = math.ceil(winL - midDis)
-        x1 = math.floor(0 + midDis)
-        y2 = math.ceil(winH - midDis)
-        y1 = math.floor(0 + midDis)
-        maxDis = math.sqrt(math.pow(x2-x1,2) + math.pow(y2-y1,2))
-        distSmall = math.floor(maxDis / 4)
-        distLarge = math.floor((maxDis*2) / 4)
-
-        #Opposite corner condition: randomly choose 1 of 4 corner moves
-        if (moveType == 3):
-            corner = random.randint(0,3)
-            if (corner == 0):   return (CoordMap(x2,y2),CoordMap(x1,y1))
-            elif (corner == 1): return (CoordMap(x1,y2),CoordMap(x2,y1))
-            elif (corner == 2): return (CoordMap(x1,y1),CoordMap(x2,y2))
-            elif (corner == 3): return (CoordMap(x2,y1),CoordMap(x1,y2))
-
-        #If not corner, generate random starting position and create
-        #ending position based on 
-        else:
-            while(1):
-                xT = random.randint(x1,x2)
-                yT = random.randint(y1,y2)
-
-                #Check that starting coorindates are not near corner
-                if (IsNearCorner(xT,yT)): 
-                    continue
-                else: 
-                    (xA,yA) = (xT,yT)
-                
-                if (moveType == 0):      #moveType (0): maintain same position
-                    (xB,yB) = (xA,yA)
-                elif (moveType == 1):    #moveType (1): small move (1/3 max dist)
-                    (xB,yB) = GenCoordMove(xA,yA,distSmall)
-                elif (moveType == 2):    #moveType (2): large move (2/3 max dist)
-                    (xB,yB) = GenCoordMove(xA,yA,distLarge)
-
-                #Redo random generation if ending coordinates are near corner
-                if (IsNearCorner(xB,yB)): 
-                    continue
-                #Redo random generation if ending coordinates are out of bounds
-                if ((xB<x1) or (xB>x2) or (yB<y1) or (yB>y2)): 
-                    continue
-                else:
-                    return (CoordMap(xA,yA),CoordMap(xB,yB))
-
-
-    def SegmentImages(self):
-        """Shuffles images in a folder into a list, then successively adds
-        two coordinate pairs to each image. The image list is divided into 4
-        sections, one for each type of trial (repeat, move small, move big, and
-        opposite corners). For each section of images, the images are given a
-        corresponding type of coordinate pair as governed by createPosPair()
-
-        return: createdList, each element as: [image,<study(x,y)>,<test(x,y)>]
-        """    
-
-        #Nested function - populates each division of the image list
-        def SegmentFill(imageList, addingList, moveType):
-
-            order = list(range(0,self.trialsPer))
-            random.shuffle(order)
-            for i in order:
-                pospair = self.CreatePosPair(moveType)
-                addingList.append([imageListSec[self.imgIdx],
-                                   pospair[0],pospair[1]])
-                self.imgIdx += 1
-            return addingList
-
-        imageListFull = []
-        imageListSec = []
-    
-        #First put all available images into list and shuffle
-        for i in os.listdir(self.imgDir):
-            if i.lower().find('.jpg') != -1 and i.lower().find('PR_') == -1:
-                imageListFull.append(i)
-        random.shuffle(imageListFull)
-
-        #Fill another list with the number of images per phase using prev list
-        for j in range(0, self.numTrials):
-            imageListSec.append(imageListFull[j])
-
-        #Successively add each group of trials to madeImgList
-        madeImgList = []
-        addRepeatList = SegmentFill(imageListSec, madeImgList, 0)
-        addLureSmall = SegmentFill(imageListSec, addRepeatList, 1)
-        addLureLarge = SegmentFill(imageListSec, addLureSmall, 2)
-        addCorners = SegmentFill(imageListSec, addLureLarge, 3)
-        createdList = addCorners
-        
-        return createdList
 
     def ImageDiagnostic(self):
         """Draws colored dots onto the window. The dots' positions represent
@@ -263,22 +241,14 @@ class MDTS(object):
         pos: Coordinates (on 6x4 grid) where image will be displayed
         return: tuple of first keypress info: (keyPress, reactionTime)
         """
-        ShownImage = ImageStim(self.window)
-        ShownImage.setPos(pos)
-        ShownImage.setSize((self.imageWidth,self.imageWidth))
-        ShownImage.setImage(self.imgDir + '/%s' %(image))
-        ShownImage.draw(self.window)
-        self.window.flip()
-        clearEvents()
-        self.clock.reset()
-        keypresses = []
-        if (self.selfPaced == False):
-            wait(self.trialDuration,self.trialDuration)
-            keypresses = getKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        elif (self.selfPaced == True):
-            keypresses = waitKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        self.window.flip()
-        wait(self.ISI)
+        self.scheduler.StartPrep(image)
+        ShownImage = self.stimPool.Acquire(StimulusPool.CENTER,
+                                           (self.imageWidth,self.imageWidth), pos)
+        ShownImage.setImage(self.LoadImage(image))
+        keypresses = self.scheduler.PresentTrial(ShownImage.draw,
+            self.trialDuration, self.ISI,
+            [self.leftButton,self.rightButton,self.pauseButton,"escape"],
+            self.clock, self.selfPaced)
         if len(keypresses) <1:
             return '',0
         return keypresses[0][0],keypresses[0][1]
@@ -289,7 +259,7 @@ class MDTS(object):
         returns the key pressed
         '''
         keylist = [self.pauseButton, 'escape']
-        text = TextStim(self.window,prompt,color='Black')
+        text = self.textCache.Get(prompt,color='Black')
         text.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=keylist)
@@ -311,35 +281,50 @@ class MDTS(object):
                 1 -> task ran to completion 
         """
 
-        studyPrompt = ("Let's do the real test. \n\n Are the following objects indoor or outdoor?\n\n('{}' to continue)".format(self.pauseButton))
-        testPrompt = ("In this phase, you will see the same series of objects one at a time.\n\nAre the object locations same or new? \n\n('{}' to continue)".format(self.pauseButton))
-        studyText = TextStim(self.window,studyPrompt,color='Black')
-        testText = TextStim(self.window,testPrompt,color='Black')
+        #On resume, a phase already run is skipped, as is the log header of
+        #one that was started
+        phase = ("study","test")[phaseType]
+        if (self.journal.Done(phase)):
+            return 1
+        begun = self.journal.Done(phase + ":begin")
+
+        studyText = self.textCache.Get(self.studyPrompt,color='Black')
+        testText = self.textCache.Get(self.testPrompt,color='Black')
 
         if (phaseType == 0):
             studyText.draw(self.window)  #phaseType = 0 -> Study Phase
             self.window.flip()
-            self.logfile.write("\nBegin Study\n")
+            if (not begun):
+                self.logfile.write("\nBegin Study\n")
+                self.logfile.flush()
         elif (phaseType == 1):
             testText.draw(self.window)   #phaseType = 1 -> Test Phase
             self.window.flip()
-            self.logfile.write("\nBegin Test\n")
+            if (not begun):
+                self.logfile.write("\nBegin Test\n")
+                self.logfile.flush()
 
         log = self.logfile
-        log.write("{a} | {b} | {c} | {d} | {e} | {f} |{g}\n".format(
-            a='Image',b='Type',c='Start',d='End',e='Correct',f='Resp',g='RT'))
+        if (not begun):
+            log.write("{a} | {b} | {c} | {d} | {e} | {f} |{g}\n".format(
+                a='Image',b='Type',c='Start',d='End',e='Correct',f='Resp',g='RT'))
+            self.journal.Mark(phase + ":begin")
             
         continueKey = waitKeys(keyList=[self.pauseButton,'escape'])
         if (continueKey[0] == 'escape'):
             self.logfile.write("\n\n\nPhase Not Run\n\n\n")
+            self.escapes += 1
             return 0
             
         imgs = self.imageList
-        trialOrder = list(range(0,len(imgs)))
-        random.shuffle(trialOrder)
+        trialOrder = self.schedule[phase + "Order"]
+        self.StartPrefetch([imgs[trialOrder[i]][0] for i in range(len(trialOrder))
+                            if not self.journal.Done("%s:%d" %(phase, i+1))])
 
-        #Run through each trial
+        #Run through each trial, skipping those already run
         for i in range(0, len(trialOrder)):
+            if (self.journal.Done("%s:%d" %(phase, i+1))):
+                continue
 
             imgIdx = trialOrder[i]
             correct = ""
@@ -371,6 +356,7 @@ class MDTS(object):
 
             if (response == "escape"):
                 self.logfile.write("\n\nPhase terminated early\n\n")
+                self.escapes += 1
                 break
             elif (response == self.pauseButton):
                 self.Pause()
@@ -379,34 +365,21 @@ class MDTS(object):
             log.write("{} | {} | {} | {} | {} | {} |{}\n".format(
                 imgs[imgIdx][0],trialType,imgs[imgIdx][1],imgs[imgIdx][2],
                 correct,response, RT))
+            if (self.trialData is not None):
+                self.trialData.Add(("study","test")[phaseType], 1, i+1,
+                    imgs[imgIdx][0], trialType=trialType,
+                    pos1=imgs[imgIdx][1], pos2=imgs[imgIdx][2],
+                    correctKey=correct, response=response, rt=RT)
           
             #If in test phase, tally responses, correct + incorrect answers
             if (phaseType == 1):
-                if (response):
-                    if (trialType == 'Same'):
-                        self.scoreList[0][2] += 1
-                        if (response == correct):
-                            self.scoreList[0][0] += 1
-                        else:
-                            self.scoreList[0][1] += 1
-                    elif (trialType == 'Small'):
-                        self.scoreList[1][2] += 1
-                        if (response == correct):
-                            self.scoreList[1][0] += 1
-                        else:
-                            self.scoreList[1][1] += 1
-                    elif (trialType == 'Large'):
-                        self.scoreList[2][2] += 1
-                        if (response == correct):
-                            self.scoreList[2][0] += 1
-                        else:
-                            self.scoreList[2][1] += 1
-                    elif (trialType == 'Crnr'):
-                        self.scoreList[3][2] += 1
-                        if (response == correct):
-                            self.scoreList[3][0] += 1
-                        else:
-                            self.scoreList[3][1] += 1
+                Tally(self.scoreList, "MDTS", trialType, response, correct)
+            self.journal.Mark("%s:%d" %(phase, i+1), {"scores": self.scoreList})
+        else:
+            #Only a phase run through is done; one quit early is resumed
+            self.journal.Mark(phase)
+
+        self.StopPrefetch()
 
         #Implies test phase ran through to completion
         return 1
@@ -443,13 +416,15 @@ class MDTS(object):
         # imgs = [[img, trialType, Study(x,y), Test(x,y)]]
         imgs = self.SegmentPracticeImages(images)
         
-        self.ShowPromptAndWaitForSpace(" Outdoor or Indoor? ('{}' to continue)".format(self.pauseButton))
-        random.shuffle(imgs)
+        self.ShowPromptAndWaitForSpace(self.practiceStudyPrompt)
+        self.rng.shuffle(imgs)
         
         self.logfile.write("\nBegin Practice Encoding {}\n\n".format(practiceBlock))
         self.logfile.write("{a} | {b} | {c} | {d} | {e} | {f} |{g}\n".format(
             a='Image',b='Type',c='Start',d='End',e='Correct',f='Resp',g='RT'))
         
+        self.StartPrefetch([trial[0] for trial in imgs])
+
         # Run the trial for each encoding trial
         for i, trial in enumerate(imgs):
             img, trialType, studyCoord, testCoord = trial
@@ -471,13 +446,15 @@ class MDTS(object):
                 img,trialTypeStr,studyCoord,testCoord,correct,response, RT))
         
         ### Test
-        self.ShowPromptAndWaitForSpace("Is the object location same or new? ('{}' to continue)".format(self.pauseButton))
-        random.shuffle(imgs)
+        self.ShowPromptAndWaitForSpace(self.practiceTestPrompt)
+        self.rng.shuffle(imgs)
 
         self.logfile.write("\nBegin Practice Test {}\n\n".format(practiceBlock))
         self.logfile.write("{a} | {b} | {c} | {d} | {e} | {f} |{g}\n".format(
             a='Image',b='Type',c='Start',d='End',e='Correct',f='Resp',g='RT'))
         
+        self.StartPrefetch([trial[0] for trial in imgs])
+
         # Keep track of the total number they got correct
         totalCorrect = 0
         for i, trial in enumerate(imgs):
@@ -499,6 +476,8 @@ class MDTS(object):
                 img,trialTypeStr,studyCoord,testCoord,correct,response, RT))
             if correct == response:
                 totalCorrect += 1
+
+        self.StopPrefetch()
             
         # Return the percentage correct
         return totalCorrect / len(imgs)
@@ -509,17 +488,15 @@ class MDTS(object):
         If the participant gets a certain amount correct, they move on to the real test.
         '''
         
-        dirFiles = os.listdir(self.imgDir)
-        practiceImages = [img for img in dirFiles if "PR_" in img]
-        random.shuffle(practiceImages)
+        practiceImages = OpenIndex(self.imgDir, "MDTS").Images(practice=True)
+        self.rng.shuffle(practiceImages)
         
         # Split the practice images into three sets
         practiceImages = np.array_split(practiceImages, 3)
 
         # Run each practice session
         for i in range(3):
-            practicePrompt = "Let's practice.\n\n('{}' to continue)".format(self.pauseButton)
-            self.ShowPromptAndWaitForSpace(practicePrompt)
+            self.ShowPromptAndWaitForSpace(self.practicePrompt)
             
             results = self.RunSinglePractice(i+1, [img for img in practiceImages[i]])
             
@@ -540,21 +517,23 @@ class MDTS(object):
         """
 
         def EndExp():
-            exitPrompt = ("This concludes the session. Thank you for "
-                          "participating!\n\nPress Escape to quit")
-            exitText = TextStim(self.window, exitPrompt, color='Black')
+            exitText = self.textCache.Get(self.exitPrompt, color='Black')
             exitText.draw(self.window)
             self.window.flip()
             waitKeys(keyList=['escape'])
-            self.window.close()
+            self.stimPool.Release()
+            if (self.ownWindow):
+                self.window.close()
 
         # Show main welcome window
-        welcomePrompt = "Thank you for participating in our study! Press '{}' to begin".format(self.pauseButton)
-        self.ShowPromptAndWaitForSpace(welcomePrompt)
+        self.ShowPromptAndWaitForSpace(self.welcomePrompt)
         
-        # If run practice trials, then RunPractice
-        if self.runPracticeTrials:
+        # If run practice trials, then RunPractice (not again on resume)
+        if (self.runPracticeTrials and not self.journal.resumed):
             self.RunPractice()
+
+        #Scores tallied before the session was interrupted, if resumed
+        self.scoreList = self.journal.State("scores", self.scoreList)
         
         self.RunPhase(0)
         testFinished = self.RunPhase(1)
@@ -13,19 +13,43 @@ it with all relevant task information, before actually running the task.
 
 After the task is run, a list of scores is passed back to this class, and it will
 append a list of scores/ratios to the logfile before closing it
+
+RunSession() runs several tasks back to back in one window, in an order
+counterbalanced across subjects. Every task is prepared (image index, image
+derivatives and schedule) up front, in parallel, and each still gets its own
+logfile.
 """
 
-import os,sys,time, random
+import os,sys,time, random, itertools
+from concurrent.futures import ThreadPoolExecutor
 import mdto, mdts, mdtt
-from psychopy.visual import Window, TextStim, Circle
+from stimpool import StimulusPool
+from keyinput import MakeKeyInput
+from logwriter import LogWriter
+from trialdata import TrialData
+from scoring import Score, ScoreList
+from journal import SessionJournal
+from schedules import PairSeed, TaskSchedule, InTaskSeed
+from schedcache import ScheduleCache
+from stimindex import OpenIndex
+from derivcache import DerivativeCache, TASK_IMAGE_SCALE
+from psychopy.visual import TextStim, Circle
+from sessionwindow import MakeWindow, WarmUp
 from psychopy.event import clearEvents, getKeys, waitKeys
 
 
+#The tasks a session can run, in their default order, and their short names
+SESSION_TASKS = ("Object", "Spatial", "Temporal")
+TASK_NAMES = {"Object": "MDTO", "Spatial": "MDTS", "Temporal": "MDTT"}
+
+
 class MDTSuite(object):
 
     def __init__(self, expType, subID, subset, trialDur, ISI, expLenVar, 
                  selfPaced, curDir, logDir, expVariant='Normal',
-                 screenType='Fullscreen', practiceTrials=True, buttonDiagnostic=True, inputButtons=['z','m'], pauseButton='p'):
+                 screenType='Fullscreen', practiceTrials=True, buttonDiagnostic=True, inputButtons=['z','m'], pauseButton='p',
+                 inputBackend='event', timingFile=True, trialFormats=('csv',),
+                 resume=False):
 
         self.expType = expType
         self.expTypeNum = 0
@@ -43,10 +67,18 @@ class MDTSuite(object):
         self.buttonDiagnostic = buttonDiagnostic
         self.inputButtons = inputButtons
         self.pauseButton = pauseButton
+        self.inputBackend = inputBackend
+        self.timingFile = timingFile
+        self.trialFormats = trialFormats
+        self.resume = resume
 
 
         randomSeed = self.PairRandom(subID, subset)
         random.seed(randomSeed)
+        #The task draws its schedule from its own generator, with the same
+        #seed, and its other random draws from a second one
+        self.scheduleRng = random.Random(randomSeed)
+        self.rng = random.Random(InTaskSeed(randomSeed))
 
         #Set non-parametrized experiment variables
         #Use os.path.join to cover Unix/Windows use
@@ -60,36 +92,51 @@ class MDTSuite(object):
         self.MDTT_IMG_DIR = os.path.join(self.IMAGE_DIR, self.MDTT_IMG_LOC, "Set_{}".format(subset))
         self.MDTT_NUM_STIM  = 32
 
+        #Image stimuli shared by the tasks, reused from trial to trial
+        self.stimPool = StimulusPool()
+        #Response input used in trials: 'event' or 'keyboard' (low latency)
+        self.keyInput = MakeKeyInput(self.inputBackend)
+
+    def SetTask(self, expType):
+        """Sets the task to run next, and the logfile path it logs to.
+        """
+        self.expType = expType
+        self.expTypeNum = SESSION_TASKS.index(expType)
+        self.taskName = TASK_NAMES[expType]
+        logfileLoc = (self.logDir + "/%d_%s_log.txt" %(int(self.subID),
+                                                       self.taskName))
+        self.logPath = os.path.normpath(logfileLoc)
+
     def MakeLog(self):
         """Creates and returns logfile based on exp type and the subject 
         number. If a logfile already exists with the same name, it will
         rename the old log file with a timestamp to differentiate them.
         Additionally, writes parametrized info to the log file.
 
-        return: initialized log file, open for writing
+        return: initialized log file (a LogWriter), open for writing
         """
         sub = int(self.subID)
         subset = self.subset
-        
-        if (self.expType == "Object"):
-            eType = "MDTO"
-            self.expTypeNum = 0
-        elif (self.expType == "Spatial"):
-            eType = "MDTS"
-            self.expTypeNum = 1
-        elif (self.expType == "Temporal"):
-            eType = "MDTT"
-            self.expTypeNum = 2    
 
         #Create the logfile, and rename existing one if it exists
-        logfileLoc = (self.logDir + "/%d_%s_log.txt" %(sub, eType))
-        logfileDir = os.path.normpath(logfileLoc)
+        self.SetTask(self.expType)
+        eType = self.taskName
+        logfileDir = self.logPath
+        self.journal = self.OpenJournal()
         if (os.path.isfile(logfileDir)):
             fileTime = time.strftime("%m%d%y_%H%M%S", time.localtime())
             rename = self.logDir + "/%d_%s_old_%s.txt" %(sub, eType, fileTime)
             logfileOld = os.path.normpath(rename)
             os.rename(logfileDir, logfileOld)
-        log = open(logfileDir, 'w')
+        log = LogWriter(logfileDir)
+
+        #On resume, the logfile is rebuilt from the journal, up to the last
+        #completed step, and carries on from there
+        if (self.journal.resumed):
+            log.write(self.journal.logText)
+            log.journal = self.journal
+            return log
+        log.journal = self.journal
 
         logTime = time.strftime("%H:%M on %m/%d/%y", time.localtime())
 
@@ -107,10 +154,12 @@ class MDTSuite(object):
         log.write(lnT %(self.expLenVar))
         log.write("\nTask Variant: %s\n" %(self.expVariant))
         log.write("Input buttons: {}\n".format(self.inputButtons))
+        log.write("Input backend: {}\n".format(self.inputBackend))
+        self.journal.Mark("header")
 
         return log
 
-    def WriteScores(self, logfile, scoreList):
+    def WriteScores(self, logfile, scoreList, trials=None):
         """Writes scores to log file. This includes the correct, incorrect,
         and response scores for each of the four categories (easy, lure high,
         lure low, hard). For each of the tasks respectively, this is:
@@ -120,10 +169,23 @@ class MDTSuite(object):
         Temporal: [Adjacent, Eightish, Sixteenish, Primacy/Recency]
 
         Additionally, calculate the 8 score ratios, then close the logfile.
+
+        trials: the task's trial records (a TRIAL_DTYPE array); if given, the
+                scores are those scoring.py computes from them, as a re-scored
+                session gets, followed by their signal detection metrics. If
+                they differ from the task's tally, the tally is written to the
+                log too
         """
 
         log = logfile
         scores = scoreList
+        sessionScores = Score(trials) if trials is not None else []
+        if (len(sessionScores)):
+            scores = ScoreList(sessionScores)
+            if (scores != scoreList):
+                log.write("\n\nWarning: the scores below are those of the "
+                          "trial records, which differ from the task's "
+                          "tally {}".format(scoreList))
 
         textList = (["Repeat","Lure High","Lure Low","Foil"],
                     ["Repeat","Small","Large","Corners"],
@@ -150,7 +212,20 @@ class MDTSuite(object):
                 text = scoreText[j] + " | " + textList[self.expTypeNum][i]
                 log.write("\n{:<25}{:>2.2f}".format(text,ratioVar))
 
-        #Close the logfile
+        #Write to log the signal detection metrics of each score type
+        if (len(sessionScores)):
+            log.write("\n\nSignal Detection:\n")
+            log.write("\n{:<12}{:>7}{:>7}{:>7}{:>7}{:>7}{:>8}{:>8}{:>8}".format(
+                "", "Hit", "FA", "d'", "c", "LDI", "RT Mean", "RT Med",
+                "RT SD"))
+            for row in sessionScores:
+                log.write("\n{:<12}{:>7.2f}{:>7.2f}{:>7.2f}{:>7.2f}{:>7.2f}"
+                          "{:>8.3f}{:>8.3f}{:>8.3f}".format(row['condition'],
+                          row['hitRate'], row['faRate'], row['dPrime'],
+                          row['bias'], row['ldi'], row['rtMean'],
+                          row['rtMedian'], row['rtSD']))
+
+        #Close the logfile, once the scores are synced to disk
         log.close()
 
     def PairRandom(self, subjectNum, subsetNum):
@@ -163,22 +238,15 @@ class MDTSuite(object):
         Returns:
             seedNum: seed for the random number generator
         """
-        numSum = int(subjectNum) + int(subsetNum)
-        return ((numSum*(numSum+1))/2) + subsetNum
+        return PairSeed(subjectNum, subsetNum)
 
     def RunButtonDiagnostic(self):
         '''
         Run a test to make sure that the buttons are being recorded correctly
-        Creates a temporary window and accepts keypresses
+        Accepts keypresses in the session's window
         Shows the buttonpresses with a highlighting circle
         '''
-        if (self.screenType == 'Windowed'):
-            screenSelect = False
-        elif (self.screenType == 'Fullscreen'):
-            screenSelect = True
-
-        window = Window(fullscr=screenSelect,units='pix', 
-                             color='White',allowGUI=False)
+        window = self.window
                             
         indRadius = 100
         tHeight = 2*indRadius/5
@@ -228,18 +296,105 @@ class MDTSuite(object):
             window.flip()
                 
         window.flip()
-        window.close()
 
 
-    def RunSuite(self, VERS):
-        """Run through one of the three tasks. Each task will return a logfile,
-        as well a scorelist. Following running a task, call the WriteScores()
-        method within this class.
+    def OpenJournal(self):
+        """Opens the session journal (<sub>_<task>_journal.jsonl, next to the
+        logfile). If resuming was asked for and the subject has an unfinished
+        session of this task with the same parameters, that session's journal
+        is resumed; otherwise a new journal is started.
+
+        return: the SessionJournal
         """
-        self._version = VERS
-        logfile = self.MakeLog()
-        log = -1
-        scores = -1
+        info = self.JournalInfo()
+        if (self.resume):
+            journalDir = self.JournalPath()
+            journal = SessionJournal.Resume(journalDir, info)
+            if (journal is not None):
+                print("Resuming the interrupted session in %s" %(journalDir))
+                return journal
+            print("No interrupted session to resume, starting a new session")
+        return SessionJournal(self.SidecarPath("_journal", ".jsonl"), info)
+
+    def JournalInfo(self):
+        """Returns the session parameters journaled for the current task,
+        which must match for its session to be resumed.
+        """
+        return {"subject": int(self.subID), "set": int(self.subset),
+                "task": self.taskName, "variant": self.expVariant,
+                "length": self.expLenVar}
+
+    def JournalPath(self):
+        """Returns the path of the current task's journal.
+        """
+        return self.logPath[:-len("_log.txt")] + "_journal.jsonl"
+
+    def ImageDir(self, taskName):
+        """Returns the image set directory of a task (MDTO, MDTS or MDTT).
+        """
+        imgDirs = {"MDTO": self.MDTO_IMG_DIR, "MDTS": self.MDTS_IMG_DIR,
+                   "MDTT": self.MDTT_IMG_DIR}
+        return imgDirs[taskName]
+
+    def PreloadSchedule(self, schedule=None):
+        """Journals the subject's pre-generated schedule, if the task's image
+        set has an up to date schedule cache for them (see schedcache.py), so
+        the task uses it rather than generating one. A resumed session keeps
+        the schedules it was started with.
+
+        schedule: schedule prepared ahead of the task (see PrepareSession), used
+                  instead of the cache's
+        """
+        if (schedule is None):
+            cache = ScheduleCache(self.ImageDir(self.taskName), self.taskName)
+            schedule = cache.Load(self.subID, self.expLenVar,
+                                  self.window.size)
+            if (schedule is not None):
+                print("Using the pre-generated schedule in %s" %(cache.path))
+        if (schedule is not None):
+            self.journal.Preload(schedule)
+
+    def SidecarPath(self, suffix, ext):
+        """Returns the path of a file written next to the logfile, named
+        <sub>_<task><suffix><ext>. An existing file is renamed with a
+        timestamp, as logfiles are.
+        """
+        sidecarBase = self.logPath[:-len("_log.txt")] + suffix
+        sidecarDir = sidecarBase + ext
+        if (os.path.isfile(sidecarDir)):
+            fileTime = time.strftime("%m%d%y_%H%M%S", time.localtime())
+            os.rename(sidecarDir, sidecarBase + "_old_%s%s" %(fileTime, ext))
+        return sidecarDir
+
+    def WriteTrialData(self, trialData):
+        """Writes the typed per-trial records of the task, in each format of
+        self.trialFormats ('csv', 'npz'), to <sub>_<task>_trials.<format>.
+        """
+        for fmt in self.trialFormats:
+            trialData.Write(self.SidecarPath("_trials", "." + fmt), fmt)
+
+    def WriteTiming(self, timing):
+        """Writes the timing record of every presented trial to a sidecar file
+        next to the logfile (<sub>_<task>_timing.txt), and prints the summary.
+
+        timing: the TrialTiming of the task's FrameScheduler
+        """
+        timing.WriteSidecar(self.SidecarPath("_timing", ".txt"))
+
+        summary = timing.Summary()
+        print("Trial timing ({} trials): onset jitter max {:.4f}s, "
+              "duration jitter max {:.4f}s, dropped frames {}".format(
+              summary["trials"], summary.get("onsetJitterMax", 0.0),
+              summary.get("durationJitterMax", 0.0),
+              summary.get("droppedFrames", 0)))
+
+    def OpenWindow(self):
+        """Opens the window the session is run in, warms it up, and runs the
+        button diagnostic if it is checked.
+        """
+        #One window for the whole session, set up before anything is shown
+        self.window = MakeWindow(self.screenType)
+        WarmUp(self.window)
 
         # Run button diagnostic tool if it is checked
         if self.buttonDiagnostic:
@@ -248,33 +403,174 @@ class MDTSuite(object):
         
         # Make sure there are practice images 
         if self.practiceTrials:
-            assert len([img for img in os.listdir(self.MDTO_IMG_DIR) if "PR_" in img]) != 0
-            assert len([img for img in os.listdir(self.MDTS_IMG_DIR) if "PR_" in img]) != 0
-            assert len([img for img in os.listdir(self.MDTT_IMG_DIR) if "PR_" in img]) != 0
+            assert len(OpenIndex(self.MDTO_IMG_DIR, "MDTO").Images(practice=True)) != 0
+            assert len(OpenIndex(self.MDTS_IMG_DIR, "MDTS").Images(practice=True)) != 0
+            assert len(OpenIndex(self.MDTT_IMG_DIR, "MDTT").Images(practice=True)) != 0
+
+    def RunTask(self, schedule=None):
+        """Runs the current task in the session's window, with its own logfile
+        and journal, then writes its scores, trial data and timing.
+
+        schedule: schedule prepared ahead of the task (see PrepareSession)
+        return: True if the task ran to the end, False if it was exited early
+        """
+        #Each task draws from a generator seeded as if it ran on its own
+        randomSeed = self.PairRandom(self.subID, self.subset)
+        random.seed(randomSeed)
+        self.scheduleRng = random.Random(randomSeed)
+        self.rng = random.Random(InTaskSeed(randomSeed))
+
+        logfile = self.MakeLog()
+        log = -1
+        scores = -1
+        task = None
+        trialData = TrialData(self.subID, self.subset, self.taskName,
+                              self.journal)
+        trialData.records = list(self.journal.records)
+        self.PreloadSchedule(schedule)
            
         #Run Object Task
         if (self.expType == "Object"):
             expMDTO = mdto.MDTO(logfile, self.MDTO_IMG_DIR, self.screenType,
                                 self.expVariant, self.trialDur, self.ISI, 
-                                self.expLenVar, self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton)
+                                self.expLenVar, self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton,
+                                stimPool=self.stimPool, keyInput=self.keyInput,
+                                trialData=trialData, journal=self.journal,
+                                rng=self.rng, window=self.window,
+                                scheduleRng=self.scheduleRng)
+            task = expMDTO
             (log, scores) = expMDTO.RunExp()
 
         #Run Spatial Task   
         elif(self.expType == "Spatial"):
             expMDTS = mdts.MDTS(logfile, self.MDTS_IMG_DIR, self.screenType,
                                 self.trialDur, self.ISI, self.expLenVar, 
-                                self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton)
+                                self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton,
+                                stimPool=self.stimPool, keyInput=self.keyInput,
+                                trialData=trialData, journal=self.journal,
+                                rng=self.rng, window=self.window,
+                                scheduleRng=self.scheduleRng)
             #expMDTS.ImageDiagnostic()
+            task = expMDTS
             (log, scores) = expMDTS.RunExp()
             
         #Run Temporal Task
         elif(self.expType == "Temporal"):
             expMDTT = mdtt.MDTT(logfile, self.MDTT_IMG_DIR, self.subID,
                 self.screenType, self.MDTT_NUM_STIM, self.expLenVar, 
-                self.trialDur, self.ISI, self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton)
+                self.trialDur, self.ISI, self.selfPaced, self.practiceTrials, self.inputButtons, self.pauseButton,
+                stimPool=self.stimPool, keyInput=self.keyInput,
+                trialData=trialData, journal=self.journal, rng=self.rng,
+                window=self.window, scheduleRng=self.scheduleRng)
+            task = expMDTT
             (log, scores) = expMDTT.RunExp()
 
         
         #Return value of -1 implies early exit condition, so dont write scores
-        if ((log != -1) and (scores != -1)):
-            self.WriteScores(log,scores)
\ No newline at end of file
+        completed = ((log != -1) and (scores != -1))
+        if (completed):
+            self.WriteScores(log,scores,trialData.Array())
+
+        #Write the typed trial records, and how each trial was actually
+        #presented, next to the logfile
+        if (self.trialFormats):
+            self.WriteTrialData(trialData)
+        if (self.timingFile and (task is not None)):
+            self.WriteTiming(task.scheduler.timing)
+        #A task with a phase quit with escape didn't run to the end; its
+        #journal is left open, to be resumed
+        finished = completed and (task.escapes == 0)
+        self.journal.Close(finished)
+        return finished
+
+    def RunSuite(self, VERS):
+        """Run through one of the three tasks. Each task will return a logfile,
+        as well a scorelist. Following running a task, call the WriteScores()
+        method within this class.
+        """
+        self._version = VERS
+        self.OpenWindow()
+        self.RunTask()
+        self.window.close()
+
+    def TaskOrder(self, expTypes):
+        """Returns the order the subject runs a session's tasks in. Orders are
+        counterbalanced across subjects: consecutive subject numbers cycle
+        through every permutation of the tasks.
+        """
+        orders = list(itertools.permutations(expTypes))
+        return list(orders[(int(self.subID) - 1) % len(orders)])
+
+    def PrepareTask(self, expType, lenVar):
+        """Prepares a task of a session before it is run: indexes its image
+        set, builds the derivatives of its images for the session's window,
+        and loads (or generates) the subject's schedule.
+
+        return: the task's schedule (a dict, as the schedule cache stores it)
+        """
+        taskName = TASK_NAMES[expType]
+        imgDir = self.ImageDir(taskName)
+        OpenIndex(imgDir, taskName)
+        DerivativeCache(imgDir, self.window.size[1]/TASK_IMAGE_SCALE[taskName]
+                        ).Build()
+        schedule = ScheduleCache(imgDir, taskName).Load(self.subID, lenVar,
+                                                        self.window.size)
+        if (schedule is None):
+            schedule = TaskSchedule(taskName, imgDir, lenVar,
+                                    self.PairRandom(self.subID, self.subset),
+                                    self.window.size)
+        return schedule
+
+    def PrepareSession(self, expTypes, lenVars):
+        """Prepares every task of a session up front, each in its own thread,
+        so the tasks then run back to back without setup between them.
+
+        return: dict of each task's schedule, by expType
+        """
+        with ThreadPoolExecutor(max_workers=len(expTypes)) as executor:
+            futures = dict((expType, executor.submit(self.PrepareTask, expType,
+                                                     lenVars[expType]))
+                           for expType in expTypes)
+            return dict((expType, future.result())
+                        for expType, future in futures.items())
+
+    def RunSession(self, VERS, expTypes=SESSION_TASKS, lenVars=None,
+                   counterbalance=True):
+        """Runs several tasks back to back, in one window: all of them are
+        prepared first, then run one after another. Each task has its own
+        logfile, journal and sidecar files, as if it was run on its own. When
+        resuming, tasks the subject already finished are skipped, and the
+        interrupted one is resumed.
+
+        expTypes: the tasks to run ("Object", "Spatial", "Temporal")
+        lenVars: dict of trials per condition (Object/Spatial) or number of
+                 blocks (Temporal), by expType; tasks not in it use expLenVar
+        counterbalance: run the tasks in the subject's order (see TaskOrder)
+                        rather than in the order given
+        return: True if every task ran to the end
+        """
+        self._version = VERS
+        expTypes = list(expTypes)
+        if (counterbalance):
+            expTypes = self.TaskOrder(expTypes)
+        lenVars = dict((expType, (lenVars or {}).get(expType, self.expLenVar))
+                       for expType in expTypes)
+        print("Session task order: %s" %(", ".join(expTypes)))
+
+        self.OpenWindow()
+        schedules = self.PrepareSession(expTypes, lenVars)
+        completed = True
+        for expType in expTypes:
+            self.SetTask(expType)
+            self.expLenVar = lenVars[expType]
+            if (self.resume and SessionJournal.Completed(self.JournalPath(),
+                                                         self.JournalInfo())):
+                print("Skipping the finished %s task" %(self.taskName))
+                continue
+            clearEvents()
+            if (not self.RunTask(schedules[expType])):
+                #Exiting a task early ends the session
+                completed = False
+                break
+        self.window.close()
+        return completed
@@ -18,17 +18,45 @@ scores to a logfile at the completion of the task.
 
 from __future__ import division
 import os,sys,math,random
-from psychopy.visual import Window, ImageStim, TextStim
-from psychopy.event import clearEvents, getKeys, waitKeys
-from psychopy.core import Clock, wait
+from psychopy.event import clearEvents, waitKeys
+from psychopy.core import Clock
 import numpy as np
+from prefetch import ImagePrefetcher
+from derivcache import DerivativeCache
+from stimpack import OpenPack
+from stimpool import StimulusPool
+from textcache import TextCache
+from framesched import FrameScheduler
+from sessionwindow import MakeWindow
+from journal import SessionJournal
+from pairsolver import DEFAULT_LAG_BINS
+from schedules import BuildSchedule
+from stimindex import OpenIndex
+from scoring import Tally, CONDITIONS
 
 class MDTT(object):
 
     def __init__(self, logfile, imgDir, subjectNum, screenType, numStim, 
-                 numBlocks, trialDuration, ISI, selfPaced, runPractice, inputButtons, pauseButton):
+                 numBlocks, trialDuration, ISI, selfPaced, runPractice, inputButtons, pauseButton,
+                 stimPool=None, keyInput=None, trialData=None, journal=None,
+                 lagBins=DEFAULT_LAG_BINS, rng=None, window=None,
+                 scheduleRng=None):
+
+        #The logfile's and scoring.py's conditions (Adjacent, Eight, Sixteen,
+        #Primacy/Recency) are those of the default lag bins
+        if (tuple(tuple(lagBin) for lagBin in lagBins) != DEFAULT_LAG_BINS):
+            raise ValueError("MDTT is scored by the lag bins %s only, not %s"
+                             %(list(DEFAULT_LAG_BINS), list(lagBins)))
 
         self.logfile = logfile
+        #Typed per-trial records (a TrialData), kept alongside the logfile
+        self.trialData = trialData
+        #Session journal: schedules are reused, and blocks skipped, on resume
+        self.journal = journal if journal is not None else SessionJournal()
+        #Random number generators of this task (the random module by default):
+        #one for its schedule, the other for practice images and side orders
+        self.rng = rng if rng is not None else random
+        self.scheduleRng = scheduleRng if scheduleRng is not None else self.rng
         self.imgDir = imgDir
         self.subjectNum = subjectNum
         self.numStim = numStim
@@ -36,7 +64,8 @@ class MDTT(object):
         self.trialDuration = trialDuration
         self.selfPaced = selfPaced
         self.ISI = ISI
-        self.numCats = 4
+        self.lagBins = lagBins
+        self.numCats = len(CONDITIONS["MDTT"])
         self.trialsPer = int((self.numStim / self.numCats) / 2)
         self.runPractice = runPractice
         self.leftButton  = inputButtons[0]
@@ -45,136 +74,91 @@ class MDTT(object):
 
         #Set up window, center, left and right image sizes + positions
 
-        if (screenType == 'Windowed'):
-            screenSelect = False
-        elif (screenType == 'Fullscreen'):
-            screenSelect = True
-
-        self.window = Window(fullscr=screenSelect,units='pix', 
-                             color='White',allowGUI=False)
+        #Draw in the session's window if given, otherwise in one of its own
+        self.ownWindow = (window is None)
+        self.window = window if window is not None else MakeWindow(screenType)
+        self.scheduler = FrameScheduler(self.window, keyInput)
         self.imageWidth = self.window.size[1]/5.5
-        self.centerImage = ImageStim(self.window)
-        self.centerImage.setSize((self.imageWidth,self.imageWidth))
-        self.leftImage = ImageStim(self.window)
-        self.leftImage.setPos((-1.5 * self.imageWidth,0))
-        self.leftImage.setSize((self.imageWidth,self.imageWidth))
-        self.rightImage = ImageStim(self.window)
-        self.rightImage.setPos((1.5 * self.imageWidth,0))
-        self.rightImage.setSize((self.imageWidth,self.imageWidth))
+        self.derivCache = DerivativeCache(self.imgDir, self.imageWidth)
+        self.derivCache.Build()
+        self.stimPack = OpenPack(self.derivCache)
+        self.imageSize = (self.imageWidth,self.imageWidth)
+        self.centerPos = (0,0)
+        self.leftPos = (-1.5 * self.imageWidth,0)
+        self.rightPos = (1.5 * self.imageWidth,0)
+
+        #Center, left and right image stimuli are shared through the pool
+        self.stimPool = stimPool if stimPool is not None else StimulusPool()
+        self.stimPool.SetWindow(self.window)
+        self.stimPool.Preallocate([StimulusPool.CENTER, StimulusPool.LEFT,
+                                   StimulusPool.RIGHT])
         self.clock = Clock()
-
-        #Init score list for 4 categories: [correct,incorrect,response]
+        self.prefetcher = None
+
+        #Fixed prompts, laid out once for the window by PreloadPrompts()
+        #The study prompt is formatted with the session (block) number
+        self.pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
+        self.practicePrompt = "Let's practice\n\n('{}' to continue)".format(self.pauseButton)
+        self.practiceStudyPrompt = " Indoor or Outdoor?\n\n('{}' to continue)".format(self.pauseButton)
+        self.practiceTestPrompt = " Which came first? Left or right? ('{}' to continue)".format(self.pauseButton)
+        self.studyPrompt = "Test Session {}/{}: Are the following objects indoor or outdoor?\n\n('{}' to continue)"
+        self.testPrompt = ("In this phase, the same series of objects will be shown\n\nWhich came first: Left or Right?\n\n('{}' to continue)".format(self.pauseButton))
+        self.exitPrompt = ("This concludes the session. Thank you for "
+                           "participating!\n\nPress Escape to quit")
+        self.textCache = TextCache(self.window)
+        self.PreloadPrompts()
+
+        #Init score list for each category (4 by default): [correct,incorrect,response]
         self.scoreList = []
-        for i in range(0,4):
+        for i in range(0,self.numCats):
             self.scoreList.append([0,0,0])
 
-    def SplitRange(self, rangeMin, rangeMax, start=0):
-        """Creates a pair of indexes separated by a value. The value itself
-        can be between a min-max range. Neither index can be an index that is
-        in a list of already used indexes.
+        #Phases quit with escape; a session with any is left to be resumed
+        self.escapes = 0
 
-        rangeMin: minimum amount that indexes can be separated by
-        rangeMax: maximum amount that indexes can be separated by
-        start: start index of used list 
-        return: a pair of indexes (index1,index2)
-                (-1,-1) if range split failed
+
+    def ImagePath(self, image):
+        """Returns the path to load for an image filename: its display sized
+        derivative, or the original image if that is already small enough.
         """
+        return self.derivCache.Get(image)
 
-        #Search through list of used indexes to ensure no duplicates
-        #Ignore start/end of list, as it's already used by primacy/recency
-        for i in range(0, self.numStim):
-            if (i in self.usedList):
-                continue
-            added = random.randint(rangeMin, rangeMax)
-            startPt = added
-            searchedRange = False
-            #Loop through the min to max range of added values
-            while not searchedRange:
-                if ((i+added<self.numStim) and (i+added not in self.usedList)):
-                    self.usedList.append(i)
-                    self.usedList.append(i+added)
-                    return (i, i+added)    
-                if (added > rangeMin):
-                    added -= 1
-                else:
-                    added = rangeMax
-                if (added == startPt):
-                    searchedRange = True
-        return (-1,-1)    
-
-
-    def CreatePairsSpaced(self):
-        """Creates a list, each element containing two indexes as well as a
-        trial type. The trial type is based upon the spacing of the indexes as
-        follows:
-
-        adjacent (1): numbers next to eachother e.g. (3,4) or (8,9)
-        eightish (2): numbers separated by between 7-9 e.g. (5,12) or (14,23)
-        sixteenish (3): numbers separated by between 15-17 e.g. (3,18) or (8,25)
-        primacy/recency: (4): start and end of list numbers e.g. (1,30) or (0,31)
-
-        Occassionally, the list will fail to successfully split into index pairs.
-        (SplitRange() returns (-1,-1) when this happens). The function will retry 
-        the index splitting until all indexes are used
-
-        return: list containing elements each with: (index1,index2,trialType)
+    def LoadImage(self, image):
+        """Returns what ImageStim.setImage() should be given for an image
+        filename: its pixels from the stimulus pack, if one was built for this
+        window size, otherwise the (prefetched) display sized image.
         """
+        if ((self.stimPack is not None) and (image in self.stimPack)):
+            return self.stimPack.GetImage(image)
+        return self.FetchImage(self.ImagePath(image))
 
-        startList = list(range(0,self.trialsPer))
-        endList = list(range(self.numStim - self.trialsPer,self.numStim))
-        trialOrder = list(range(0,(self.trialsPer * 3))) #3 categories besides P/R
-        random.shuffle(startList)
-        random.shuffle(endList)
-
-        #Attempt to split 0-31 range into 4 index categories
-        #Split fails if any one of the index pairs is (-1,-1) at end
-        def AttemptSplit():
-
-            # 3 categories besides P/R
-            trialOrder = list(range(0,(self.trialsPer * 3)))
-            random.shuffle(trialOrder)
-            self.usedList = []    
-            attemptList = []
-            finalList = []
-
-            #Add edge index pairs (primacy/recency) 
-            for i in range(0, self.trialsPer):
-                finalList.append((startList[i],endList[i],4))
-                self.usedList.append(startList[i])
-                self.usedList.append(endList[i])        
-
-            #Add spaced (separated) pairs of indexes to list 
-            for trial in trialOrder:
-                if (trial % 3 == 0):                            #Adjacent
-                    (idxOne, idxTwo) = self.SplitRange(1,1)
-                    attemptList.append((idxOne, idxTwo, 1))        
-                elif (trial % 3 == 1):                            #Eightish
-                    (idxOne, idxTwo) = self.SplitRange(7,9)
-                    attemptList.append((idxOne, idxTwo, 2))
-                elif (trial % 3 == 2):                            #Sixteenish
-                    (idxOne, idxTwo) = self.SplitRange(15,17)
-                    attemptList.append((idxOne, idxTwo, 3))
-
-            #Ensures PR trials (type 4) occur first. Randomize successive trials
-            random.shuffle(attemptList)
-            finalList.extend(attemptList)
-            return finalList
-
-        #Try AttemptSplit() until index split is successful
-        splitSuccess = False
-        while (not splitSuccess):
-            splitList = AttemptSplit()
-            foundError = False
-            for pair in splitList:
-                if ((pair[0] == -1) or (pair[1] == -1)):
-                    foundError = True
-            if (foundError == True):
-                continue
-            else:
-                splitSuccess = True
+    def StartPrefetch(self, images):
+        """Starts decoding the given images on a background thread, in the
+        order they will be shown, so trials can take them via FetchImage().
 
-        return splitList
+        images: list of image filenames, in trial order (left before right
+                for dual image trials)
+        """
+        self.StopPrefetch()
+        if (self.stimPack is not None):
+            images = [img for img in images if img not in self.stimPack]
+        imagePaths = [self.ImagePath(img) for img in images]
+        self.prefetcher = ImagePrefetcher(imagePaths)
+
+    def StopPrefetch(self):
+        """Stops the background decoding started by StartPrefetch(), if any.
+        """
+        if (self.prefetcher is not None):
+            self.prefetcher.Stop()
+            self.prefetcher = None
 
+    def FetchImage(self, imagePath):
+        """Returns the decoded image from the prefetcher if one is running,
+        otherwise the path itself, for ImageStim to load from disk.
+        """
+        if (self.prefetcher is None):
+            return imagePath
+        return self.prefetcher.Get(imagePath)
 
     def RunTrialSingle(self, img):
         """Displays a single image at the center of the screen for a period of
@@ -183,19 +167,14 @@ class MDTT(object):
         img: the image to Displays
         return: a list of keypresses and respective reaction times
         """
-        self.centerImage.setImage(self.imgDir + "/%s" %(img))
-        self.centerImage.draw(self.window)
-        clearEvents()
-        self.window.flip()
-        self.clock.reset()
-        keyPresses = []
-        if (self.selfPaced == False):
-            wait(self.trialDuration,self.trialDuration)
-            keyPresses = getKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        elif (self.selfPaced == True):
-            keyPresses = waitKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        self.window.flip()
-        wait(self.ISI)
+        self.scheduler.StartPrep(img)
+        centerImage = self.stimPool.Acquire(StimulusPool.CENTER,
+                                            self.imageSize, self.centerPos)
+        centerImage.setImage(self.LoadImage(img))
+        keyPresses = self.scheduler.PresentTrial(centerImage.draw,
+            self.trialDuration, self.ISI,
+            [self.leftButton,self.rightButton,self.pauseButton,"escape"],
+            self.clock, self.selfPaced)
         return keyPresses
 
 
@@ -207,20 +186,22 @@ class MDTT(object):
         rightimg: the image to display on the right
         return: a list of keypresses and respective reaction times
         """
-        self.leftImage.setImage(self.imgDir + "/%s" %(leftImg))
-        self.rightImage.setImage(self.imgDir + "/%s" %(rightImg))
-        self.leftImage.draw(self.window)
-        self.rightImage.draw(self.window)
-        clearEvents()
-        self.window.flip()
-        self.clock.reset()
-        if (self.selfPaced == False):
-            wait(self.trialDuration,self.trialDuration)
-            keyPresses = getKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        elif (self.selfPaced == True):
-            keyPresses = waitKeys(keyList=[self.leftButton,self.rightButton,self.pauseButton,"escape"],timeStamped=self.clock)
-        self.window.flip()
-        wait(self.ISI)
+        self.scheduler.StartPrep(leftImg + "|" + rightImg)
+        leftImage = self.stimPool.Acquire(StimulusPool.LEFT,
+                                          self.imageSize, self.leftPos)
+        rightImage = self.stimPool.Acquire(StimulusPool.RIGHT,
+                                           self.imageSize, self.rightPos)
+        leftImage.setImage(self.LoadImage(leftImg))
+        rightImage.setImage(self.LoadImage(rightImg))
+
+        def DrawPair():
+            leftImage.draw(self.window)
+            rightImage.draw(self.window)
+
+        keyPresses = self.scheduler.PresentTrial(DrawPair,
+            self.trialDuration, self.ISI,
+            [self.leftButton,self.rightButton,self.pauseButton,"escape"],
+            self.clock, self.selfPaced)
         return keyPresses
 
 
@@ -231,20 +212,24 @@ class MDTT(object):
         imageBlock: List of images to display during the study
         session: the number of the session (block number) that is running
         """
-        studyPrompt = ("Test Session {}/{}: Are the following objects indoor or outdoor?\n\n('{}' to continue)".format(session, 10, self.pauseButton))
-        studyText = TextStim(self.window,studyPrompt,color='Black')
+        studyPrompt = self.studyPrompt.format(session, 10, self.pauseButton)
+        studyText = self.textCache.Get(studyPrompt,color='Black')
         studyText.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=[self.pauseButton,'escape'])
 
         if (continueKey[0] == 'escape'):
             self.logfile.write("\n\n\nStudy Not Run Early\n\n\n")
+            self.escapes += 1
             return 
 
         self.logfile.write("\nBegin Study %d\n" %(session))
+        self.logfile.flush()
         self.logfile.write("{h1:<6}{h2:<23}{h3:<10}{h4}\n".format(
             h1="Trial",h2="Image",h3="Response",h4="RT"))
         
+        self.StartPrefetch(imageBlock)
+
         #Run trial for each image in the image block
         for i in range(0, len(imageBlock)):
             keyPresses = self.RunTrialSingle(imageBlock[i])
@@ -256,13 +241,18 @@ class MDTT(object):
                 respRT = keyPresses[0][1]
             if (respKey == "escape"):
                 self.logfile.write("\n\n\nStudy block terminated early\n\n\n")
+                self.escapes += 1
                 break
             elif (respKey == self.pauseButton):
                 self.Pause()
                 
             self.logfile.write("{:^5}{:<23}{:^11}{:<1.3f}\n".format(
                 i+1,imageBlock[i],respKey,respRT))
+            if (self.trialData is not None):
+                self.trialData.Add("study", session, i+1, imageBlock[i],
+                                   response=respKey, rt=respRT)
 
+        self.StopPrefetch()
         return
 
 
@@ -274,17 +264,18 @@ class MDTT(object):
         pairList: List of paired image indexes w/ trial type
         session: the number of the session (block number) that is running
         """
-        testPrompt = ("In this phase, the same series of objects will be shown\n\nWhich came first: Left or Right?\n\n('{}' to continue)".format(self.pauseButton))
-        testText = TextStim(self.window,testPrompt,color='Black')
+        testText = self.textCache.Get(self.testPrompt,color='Black')
         testText.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=[self.pauseButton,'escape'])
 
         if (continueKey[0] == 'escape'):
             self.logfile.write("\n\n\nTest Not Run\n\n\n")
+            self.escapes += 1
             return 0
 
         self.logfile.write("\nBegin Test %d\n" %(session))
+        self.logfile.flush()
         lghead = "{a:<7}{b:<7}{c:<23}{d:<23}{e:<7}{f:<7}{g:<10}{h:<7}{i}\n".format(
             a="Trial",b="TType",c="LeftImage",d="RightImage",e="LNum",
             f="RNum",g="CorResp",h="Resp",i="RT")
@@ -292,10 +283,21 @@ class MDTT(object):
 
         #Randomize if pair is shown: (bef > aft) or (aft > bef) order
         sideOrder = list(range(0,len(pairList)))
-        random.shuffle(sideOrder)
+        self.rng.shuffle(sideOrder)
         correct = ''
         keyPresses = []
 
+        #Decode both images of each pair ahead, in left/right display order
+        shownImgs = []
+        for i in range(0,len(pairList)):
+            firstImg = imageBlock[pairList[i][0]]
+            secondImg = imageBlock[pairList[i][1]]
+            if (sideOrder[i] % 2 == 0):
+                shownImgs.extend([firstImg, secondImg])
+            else:
+                shownImgs.extend([secondImg, firstImg])
+        self.StartPrefetch(shownImgs)
+
         #Run dual image trial for each pair in the pairlist
         for i in range(0,len(pairList)):
             trialNum = i + 1
@@ -332,32 +334,47 @@ class MDTT(object):
             #Break out of image block with escape, break out of program with f5
             if (respKey == 'escape'):
                 self.logfile.write("\n\nTest block terminated early\n\n")
+                self.escapes += 1
                 break     
             elif (respKey == self.pauseButton):
                 self.Pause()
                 
             #Keep track of score
-            if (respKey):
-                self.scoreList[pairList[i][2]-1][2] += 1
-                if (respKey == correct):
-                    self.scoreList[pairList[i][2]-1][0] += 1
-                else:
-                    self.scoreList[pairList[i][2]-1][1] += 1
+            Tally(self.scoreList, "MDTT", trialType, respKey, correct)
 
             #Write info to logfile
             lgspace = "{:^5}{:^9}{:<23}{:<23}{:<7}{:<10}{:<8}{:<6}{:<1.3f}\n"
             lgform = (lgspace.format(trialNum,trialType,leftImg,rightImg,
                                      leftIdx,rightIdx,correct,respKey,respRT))
             self.logfile.write(lgform)
+            if (self.trialData is not None):
+                self.trialData.Add("test", session, trialNum, leftImg,
+                    image2=rightImg, trialType=trialType, pos1=leftIdx,
+                    pos2=rightIdx, correctKey=correct, response=respKey,
+                    rt=respRT)
 
+        self.StopPrefetch()
         return 1
 
+    def PreloadPrompts(self):
+        """Lays out all of the task's fixed prompts in the text cache, so that
+        each is shown without delay the first time it is needed.
+        """
+        prompts = [(self.pauseMsg, {'color': 'Black', 'height': 40})]
+        for prompt in [self.practicePrompt, self.practiceStudyPrompt,
+                       self.practiceTestPrompt, self.testPrompt,
+                       self.exitPrompt]:
+            prompts.append((prompt, {'color': 'Black'}))
+        for session in range(1, self.numBlocks+1):
+            studyPrompt = self.studyPrompt.format(session, 10, self.pauseButton)
+            prompts.append((studyPrompt, {'color': 'Black'}))
+        self.textCache.Preload(prompts)
+
     def Pause(self):
         """Pauses the task, and displays a message waiting for a spacebar
         input from the user before continuing to proceed.
         """
-        pauseMsg = "Experiment Paused\n\nPress '{}' to continue".format(self.pauseButton)
-        pauseText = TextStim(self.window, text=pauseMsg, color='Black', height=40)
+        pauseText = self.textCache.Get(self.pauseMsg, color='Black', height=40)
         pauseText.draw(self.window)
         self.window.flip()
         waitKeys(keyList=[self.pauseButton])
@@ -376,15 +393,15 @@ class MDTT(object):
             sys.exit()
         
         # Trial type of 4 means long distance
-        large_dist = (0,3,4) if random.random() > .5 else (3,0,4)
-        mid_dist_1 = (0,2,2) if random.random() > .5 else (2,0,2)
-        mid_dist_2 = (1,3,2) if random.random() > .5 else (3,1,2)
-        adjacent   = (0,1,1) if random.random() > .5 else (1,0,1)
-        adjacent_2 = (1,2,1) if random.random() > .5 else (2,1,1)
-        adjacent   = adjacent if random.random() > .5 else adjacent_2
+        large_dist = (0,3,4) if self.rng.random() > .5 else (3,0,4)
+        mid_dist_1 = (0,2,2) if self.rng.random() > .5 else (2,0,2)
+        mid_dist_2 = (1,3,2) if self.rng.random() > .5 else (3,1,2)
+        adjacent   = (0,1,1) if self.rng.random() > .5 else (1,0,1)
+        adjacent_2 = (1,2,1) if self.rng.random() > .5 else (2,1,1)
+        adjacent   = adjacent if self.rng.random() > .5 else adjacent_2
         
         all = [large_dist, mid_dist_1, mid_dist_2, adjacent]
-        random.shuffle(all)
+        self.rng.shuffle(all)
         
         return all
         
@@ -394,7 +411,7 @@ class MDTT(object):
         returns the key pressed
         '''
         keylist = [self.pauseButton, 'escape']
-        text = TextStim(self.window,prompt,color='Black')
+        text = self.textCache.Get(prompt,color='Black')
         text.draw(self.window)
         self.window.flip()
         continueKey = waitKeys(keyList=keylist)
@@ -412,18 +429,20 @@ class MDTT(object):
         Return:
            float: ratio correct
         '''
-        random.shuffle(imgs)
+        self.rng.shuffle(imgs)
 
         ### Encoding
         # imgs = [[img, trialType, Study(x,y), Test(x,y)]]
         testIdxs = self.SegmentPracticeImages(imgs)
         
-        self.ShowPromptAndWaitForSpace(" Indoor or Outdoor?\n\n('{}' to continue)".format(self.pauseButton))
+        self.ShowPromptAndWaitForSpace(self.practiceStudyPrompt)
         
         self.logfile.write("\nBegin Practice Study {}\n".format(practiceBlock))
         self.logfile.write("{h1:<6}{h2:<23}{h3:<10}{h4}\n".format(
             h1="Trial",h2="Image",h3="Response",h4="RT"))
         
+        self.StartPrefetch(imgs)
+
         # Run the trial for each encoding trial
         for i in range(0, len(imgs)):
             keyPresses = self.RunTrialSingle(imgs[i])
@@ -444,7 +463,7 @@ class MDTT(object):
                 
                 
         ### Test
-        self.ShowPromptAndWaitForSpace(" Which came first? Left or right? ('{}' to continue)".format(self.pauseButton))
+        self.ShowPromptAndWaitForSpace(self.practiceTestPrompt)
         
         self.logfile.write("\nBegin Practice Test {}\n".format(practiceBlock))
         self.logfile.write("{a:<7}{b:<7}{c:<23}{d:<23}{e:<7}{f:<7}{g:<10}{h:<7}{i}\n".format(
@@ -453,6 +472,11 @@ class MDTT(object):
         
         # Keep track of the total number they got correct
         totalCorrect = 0
+        shownImgs = []
+        for idxes in testIdxs:
+            shownImgs.extend([imgs[idxes[0]], imgs[idxes[1]]])
+        self.StartPrefetch(shownImgs)
+
         for trialNum, idxes in enumerate(testIdxs):
             leftImgIdx, rightImgIdx, trialType = idxes
             
@@ -484,6 +508,8 @@ class MDTT(object):
             if respKey == correct:
                 totalCorrect += 1
             
+        self.StopPrefetch()
+
         # Return the percentage correct
         return totalCorrect / len(imgs)
 
@@ -493,22 +519,20 @@ class MDTT(object):
         If the participant gets a certain amount correct, they move on to the real test.
         '''
         
-        dirFiles = os.listdir(self.imgDir)
-        practiceImages = [img for img in dirFiles if "PR_" in img]
+        practiceImages = OpenIndex(self.imgDir, "MDTT").Images(practice=True)
         if len(practiceImages) == 0:
             print("No practice images found")
             self.window.close()
             sys.exit()
             
-        random.shuffle(practiceImages)
+        self.rng.shuffle(practiceImages)
         
         # Split the practice images into three sets
         practiceImages = np.array_split(practiceImages, 3)
 
         # Run each practice session
         for i in range(3):
-            practicePrompt = "Let's practice\n\n('{}' to continue)".format(self.pauseButton)
-            self.ShowPromptAndWaitForSpace(practicePrompt)
+            self.ShowPromptAndWaitForSpace(self.practicePrompt)
             
             results = self.RunSinglePractice(i+1, [img for img in practiceImages[i]])
             
@@ -525,45 +549,59 @@ class MDTT(object):
 
         #Print task ending message to the screen; wait for user to press escape
         def EndExp():
-            exitPrompt = ("This concludes the session. Thank you for "
-                          "participating!\n\nPress Escape to quit")
-            exitText = TextStim(self.window,exitPrompt,color='Black')
+            exitText = self.textCache.Get(self.exitPrompt,color='Black')
             exitText.draw(self.window)
             self.window.flip()
             waitKeys(keyList=['escape'])
-            self.window.close()
+            self.stimPool.Release()
+            if (self.ownWindow):
+                self.window.close()
 
-        # Run practice
-        if self.runPractice:
+        # Run practice (not again on resume)
+        if (self.runPractice and not self.journal.resumed):
             self.RunPractice()
 
-        #Put image files from folder into list
-        imageList = []
-        for img in os.listdir(self.imgDir):
-            if ( img[-4:] == ".jpg" and "PR_" not in img): # Make sure that PR (practice image) is not included for study/tests
-                imageList.append(img)
-        random.shuffle(imageList)
-
-        #Divide imagelist into <numBlocks> # of lists, put into one list
-        #Each sublist contains <numStim> # of stimuli
-        imageBlockList = []
-        for i in range(0,self.numBlocks):
-            block = []
-            for j in range(i*self.numStim, self.numStim + (i*self.numStim)):
-                block.append(imageList[j])
-            imageBlockList.append(block)
-
-        #Run through each study/test block
+        #The image files divided into <numBlocks> lists of <numStim> stimuli,
+        #and the spaced index pairs of each block (see schedules.py). Every
+        #index is used by exactly one pair; the trial type of a pair is based
+        #upon the spacing of its indexes (with the default lag bins):
+        #adjacent (1), 7-9 apart (2), 15-17 apart (3), primacy/recency (4)
+        schedule = BuildSchedule("MDTT", self.imgDir, self.numBlocks,
+                                 self.scheduleRng, lagBins=self.lagBins,
+                                 numStim=self.numStim, journal=self.journal)
+        imageBlockList = schedule["imageBlocks"]
+
+        #Scores tallied before the session was interrupted, if resumed
+        self.scoreList = self.journal.State("scores", self.scoreList)
+        writeScores = self.journal.State("writeScores", True)
+
+        #Run through each study/test block. On resume, blocks already run are
+        #skipped, and a block that was interrupted is run again from its study
         blockOrder = list(range(0, self.numBlocks))
-        random.shuffle(blockOrder)
-        writeScores = True
+        self.rng.shuffle(blockOrder)
         for i in range(0,len(blockOrder)):
-            pairList = self.CreatePairsSpaced()
+            if (self.journal.Done("block:%d" %(i+1))):
+                continue
+            pairList = schedule["pairs:%d" %(i+1)]
+            escapes = self.escapes
+            blockScores = [list(score) for score in self.scoreList]
+            blockRecords = (len(self.trialData.records)
+                            if self.trialData is not None else 0)
             self.RunStudy(imageBlockList[i], i+1)
             testFinished = self.RunTest(imageBlockList[i], pairList, i+1)
             if not testFinished:
                 writeScores = False
-                continue
+            #Only a block run through is done. One quit early is run again
+            #from its study on resume, so its tallies and records are dropped
+            if (self.escapes == escapes):
+                self.journal.Mark("block:%d" %(i+1),
+                                  {"scores": self.scoreList,
+                                   "writeScores": writeScores})
+            else:
+                self.scoreList = blockScores
+                if (self.trialData is not None):
+                    del self.trialData.records[blockRecords:]
+                self.journal.Discard()
 
         EndExp()
         #Return logfile and scorelist if all study/test blocks gone through
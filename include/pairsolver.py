@@ -0,0 +1,141 @@
+"""SpacedPairs() builds the test pairs of an MDTT block: every index of a block of
+numStim images is used by exactly one pair, and each pair is of a trial type
+set by the distance (lag) between its two indexes:
+
+    1..n   a pair whose lag falls in lag bin 1..n, trialsPer pairs per bin
+           (by default: adjacent 1, eightish 7-9, sixteenish 15-17)
+    n+1    primacy/recency: one of the first trialsPer indexes with one of the
+           last trialsPer indexes
+
+The primacy/recency pairs take the first and last trialsPer indexes, and the
+binned pairs must then exactly cover the indexes in between. These are found
+by a randomized backtracking search: the lowest unused index is always paired
+next (any pair covering it must start there), with a partner drawn at random
+from the bins that still need pairs, weighted by how many they need. Used
+indexes are kept in an integer bitmask, so membership tests, and finding the
+lowest unused index, are constant time bit operations.
+
+Runtime is bounded: each attempt visits at most nodesPerPair * (number of
+pairs) search nodes before it is abandoned and the search restarts, with at
+most maxAttempts attempts, each node trying at most (sum of bin widths)
+partners. If no cover is found within that (or none exists, e.g. for lags too
+long for the block), ValueError is raised rather than looping forever.
+
+Run as a script to benchmark generation time against numStim:
+    python pairsolver.py [numStim ...]
+"""
+
+import random
+import sys
+import time
+
+DEFAULT_LAG_BINS = ((1, 1), (7, 9), (15, 17))
+NODES_PER_PAIR = 50
+MAX_ATTEMPTS = 200
+
+
+def SpacedPairs(numStim, trialsPer, lagBins=DEFAULT_LAG_BINS, rng=random,
+                nodesPerPair=NODES_PER_PAIR, maxAttempts=MAX_ATTEMPTS):
+    """Creates the spaced index pairs of a block.
+
+    numStim: number of images (indexes) in the block
+    trialsPer: number of pairs of each trial type
+    lagBins: (minLag, maxLag) of each binned trial type, in type order
+    rng: random number generator (anything with random() and shuffle())
+    return: list of (index1, index2, trialType) tuples, the primacy/recency
+            pairs first, then the binned pairs in random order
+    """
+    numBins = len(lagBins)
+    middle = numStim - 2 * trialsPer
+    if (middle != 2 * numBins * trialsPer):
+        raise ValueError("%d images can't be split into %d pairs of each of "
+                         "%d trial types" %(numStim, trialsPer, numBins + 1))
+
+    #Primacy/recency: the first trialsPer indexes with the last trialsPer
+    startList = list(range(0, trialsPer))
+    endList = list(range(numStim - trialsPer, numStim))
+    rng.shuffle(startList)
+    rng.shuffle(endList)
+    finalList = [(startList[i], endList[i], numBins + 1)
+                 for i in range(0, trialsPer)]
+
+    for attempt in range(0, maxAttempts):
+        binned = CoverMiddle(middle, trialsPer, lagBins, rng,
+                             nodesPerPair * middle // 2)
+        if (binned is not None):
+            binned = [(trialsPer + a, trialsPer + b, trialType)
+                      for (a, b, trialType) in binned]
+            rng.shuffle(binned)
+            return finalList + binned
+    raise ValueError("No spaced pairs found for %d images with lag bins %s"
+                     %(numStim, list(lagBins)))
+
+
+def CoverMiddle(size, trialsPer, lagBins, rng, maxNodes):
+    """One attempt at covering indexes 0..size-1 with trialsPer pairs of each
+    lag bin.
+
+    return: list of (index1, index2, trialType), or None if the attempt ran
+            out of nodes or no cover exists
+    """
+    full = (1 << size) - 1
+    counts = [trialsPer] * len(lagBins)
+    pairs = []
+    nodes = [0]
+
+    def Solve(used):
+        if (used == full):
+            return True
+        nodes[0] += 1
+        if (nodes[0] > maxNodes):
+            return False
+        #Lowest unused index: lowest zero bit of used
+        i = ((~used) & (used + 1)).bit_length() - 1
+
+        #Candidate partners, bins weighted by the pairs they still need
+        candidates = []
+        for b in range(0, len(lagBins)):
+            if (counts[b] == 0):
+                continue
+            for lag in range(lagBins[b][0], lagBins[b][1] + 1):
+                j = i + lag
+                if (j < size) and not (used >> j) & 1:
+                    candidates.append((rng.random() ** (1.0 / counts[b]), b, j))
+        candidates.sort(reverse=True)
+
+        for (key, b, j) in candidates:
+            counts[b] -= 1
+            pairs.append((i, j, b + 1))
+            if Solve(used | (1 << i) | (1 << j)):
+                return True
+            pairs.pop()
+            counts[b] += 1
+            if (nodes[0] > maxNodes):
+                return False
+        return False
+
+    if (Solve(0)):
+        return pairs
+    return None
+
+
+def Benchmark(sizes, repeats=20):
+    """Prints the mean and max time taken to generate a block's pairs for each
+    numStim, with 4 trial types as in MDTT.
+    """
+    print("{:>8}{:>10}{:>12}{:>12}".format("numStim", "trialsPer",
+                                          "mean (ms)", "max (ms)"))
+    for numStim in sizes:
+        trialsPer = numStim // 8
+        times = []
+        for r in range(0, repeats):
+            start = time.perf_counter()
+            SpacedPairs(numStim, trialsPer, rng=random.Random(r))
+            times.append((time.perf_counter() - start) * 1000)
+        print("{:>8}{:>10}{:>12.2f}{:>12.2f}".format(numStim, trialsPer,
+              sum(times) / len(times), max(times)))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [32, 64, 128, 256]
+    Benchmark(sizes)
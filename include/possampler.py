@@ -0,0 +1,126 @@
+"""Class PositionSampler generates the study/test position pairs of MDTS images
+with NumPy. The window geometry (the area images can be placed in, the corner
+zones, and the small/large move distances) is worked out once per window, and
+the positions of all the trials of a move type are drawn together: candidate
+start points and move directions are generated in batches, and those with a
+start or end point near a corner, or an end point off screen, are rejected as
+a whole array. Positions follow the same rules as before:
+
+    0: Non move (xA,yA) = (xB,yB)
+    1: Small move: a quarter of the diagonal of the placeable area
+    2: Large move: half of the diagonal of the placeable area
+    3: Opposite Corners: one of the 4 corner to corner moves
+
+A window too small for these constraints raises ValueError, rather than
+sampling forever: at most MAX_ROUNDS batches are drawn per call.
+"""
+
+from __future__ import division
+import math
+import random
+
+import numpy as np
+
+
+class PositionSampler(object):
+
+    MAX_ROUNDS = 100
+    MIN_BATCH = 256
+
+    def __init__(self, windowSize, imageWidth, rng=None):
+        """windowSize: (width, height) of the window, in pixels
+        imageWidth: width of the (square) images, in pixels
+        rng: NumPy Generator; by default one seeded from the random module,
+             so positions follow the task's seed
+        """
+        if (rng is None):
+            rng = np.random.default_rng(random.getrandbits(32))
+        self.rng = rng
+
+        #Bounds of image centers, in bottom left oriented coordinates
+        self.winL = windowSize[0]
+        self.winH = windowSize[1]
+        midDis = imageWidth / 2
+        self.imgDis = imageWidth
+        self.x2 = math.ceil(self.winL - midDis)
+        self.x1 = math.floor(0 + midDis)
+        self.y2 = math.ceil(self.winH - midDis)
+        self.y1 = math.floor(0 + midDis)
+        if (self.x2 <= self.x1) or (self.y2 <= self.y1):
+            raise ValueError("Window of %dx%d is too small for images %d "
+                "pixels wide" %(self.winL, self.winH, imageWidth))
+
+        #Length, in pixels, of each move type
+        maxDis = math.sqrt(math.pow(self.x2-self.x1,2) +
+                           math.pow(self.y2-self.y1,2))
+        self.radii = {0: 0, 1: math.floor(maxDis / 4),
+                      2: math.floor((maxDis*2) / 4)}
+
+        #The 4 opposite corner moves
+        (x1, x2, y1, y2) = (self.x1, self.x2, self.y1, self.y2)
+        self.cornerPairs = [(self.CoordMap(x2,y2), self.CoordMap(x1,y1)),
+                            (self.CoordMap(x1,y2), self.CoordMap(x2,y1)),
+                            (self.CoordMap(x1,y1), self.CoordMap(x2,y2)),
+                            (self.CoordMap(x2,y1), self.CoordMap(x1,y2))]
+
+    def CoordMap(self, x, y):
+        """Maps a bottom left oriented coordinate to a center oriented one.
+        """
+        return (int(x - self.winL/2), int(y - self.winH/2))
+
+    def IsNearCorner(self, x, y):
+        """Returns a boolean array, True where (x,y) is near a corner.
+        """
+        (x1, x2, y1, y2, d) = (self.x1, self.x2, self.y1, self.y2, self.imgDis)
+        left = (x <= (x1+d))
+        right = (x >= (x2-d))
+        bottom = (y <= (y1+d))
+        top = (y >= (y2-d))
+        return (left & bottom) | (left & top) | (right & bottom) | (right & top)
+
+    def Sample(self, moveType, count):
+        """Generates the position pairs of count trials of a move type.
+
+        return: list of count ((xA,yA),(xB,yB)) pairs, the start (study) and
+                end (test) position of each image, in center oriented pixels
+        """
+        if (moveType == 3):
+            corners = self.rng.integers(0, 4, count)
+            return [self.cornerPairs[corner] for corner in corners]
+
+        radius = self.radii[moveType]
+        xA = np.empty(0, dtype=int)
+        yA = np.empty(0, dtype=int)
+        xB = np.empty(0, dtype=int)
+        yB = np.empty(0, dtype=int)
+        for attempt in range(0, self.MAX_ROUNDS):
+            needed = count - len(xA)
+            if (needed <= 0):
+                break
+            batch = max(self.MIN_BATCH, 16 * needed)
+            xT = self.rng.integers(self.x1, self.x2 + 1, batch)
+            yT = self.rng.integers(self.y1, self.y2 + 1, batch)
+            rad = np.radians(self.rng.integers(0, 360, batch))
+            #Moves are truncated to whole pixels, as int() does
+            xE = xT + np.trunc(radius * np.cos(rad)).astype(int)
+            yE = yT + np.trunc(radius * np.sin(rad)).astype(int)
+
+            keep = ~self.IsNearCorner(xT, yT) & ~self.IsNearCorner(xE, yE)
+            keep &= ((xE >= self.x1) & (xE <= self.x2) &
+                     (yE >= self.y1) & (yE <= self.y2))
+            xA = np.concatenate([xA, xT[keep][:needed]])
+            yA = np.concatenate([yA, yT[keep][:needed]])
+            xB = np.concatenate([xB, xE[keep][:needed]])
+            yB = np.concatenate([yB, yE[keep][:needed]])
+
+        if (len(xA) < count):
+            raise ValueError("Window of %dx%d is too small to place move type "
+                "%d images away from its corners" %(self.winL, self.winH,
+                                                    moveType))
+
+        #Map to center oriented coordinates, as Python ints
+        xA = np.trunc(xA - self.winL/2).astype(int).tolist()
+        yA = np.trunc(yA - self.winH/2).astype(int).tolist()
+        xB = np.trunc(xB - self.winL/2).astype(int).tolist()
+        yB = np.trunc(yB - self.winH/2).astype(int).tolist()
+        return [((xA[i],yA[i]), (xB[i],yB[i])) for i in range(0, count)]
@@ -0,0 +1,105 @@
+"""Class ImagePrefetcher decodes upcoming stimuli on a background thread, while
+the current trial and ISI are running. It is given the order in which images
+will be shown, and keeps a bounded number of decoded images ready ahead of
+the trial that needs them. The task (render) thread then only has to hand the
+decoded pixels to an ImageStim, which uploads them as a texture.
+
+Example, for a phase showing imageList in order:
+    prefetcher = ImagePrefetcher([imgDir + "/" + img for img in imageList])
+    for img in imageList:
+        stim.setImage(prefetcher.Get(imgDir + "/" + img))
+        ...
+    prefetcher.Stop()
+"""
+
+import threading
+from PIL import Image
+from queue import Queue, Empty, Full
+
+
+def DecodeImage(imagePath):
+    """Opens and fully decodes an image file into an RGB pixel buffer.
+
+    imagePath: full path of the image to decode
+    return: the decoded PIL image
+    """
+    im = Image.open(imagePath)
+    return im.convert('RGB')
+
+
+class ImagePrefetcher(object):
+
+    def __init__(self, imagePaths, depth=4, loadFunc=DecodeImage):
+        """imagePaths: full image paths, in the order they will be requested
+        depth: max number of decoded images held ahead of the current trial
+        loadFunc: function decoding an image path into a pixel buffer
+        """
+        self.order = list(imagePaths)
+        self.depth = depth
+        self.loadFunc = loadFunc
+        self.queue = Queue(maxsize=depth)
+        #Decoded images taken from the queue ahead of being requested
+        self.ready = {}
+        #Position in order of the next image to be taken from the queue
+        self.next = 0
+        self.stopEvent = threading.Event()
+        self.thread = threading.Thread(target=self.Work)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def Work(self):
+        """Worker thread: decodes each image in order, blocking whenever the
+        queue already holds <depth> decoded images. Every image is queued, as
+        (imagePath, pixels), or (imagePath, None) if it couldn't be decoded.
+        """
+        for imagePath in self.order:
+            try:
+                item = (imagePath, self.loadFunc(imagePath))
+            except Exception:
+                #Leave unreadable files to the render thread to report
+                item = (imagePath, None)
+            while not self.stopEvent.is_set():
+                try:
+                    self.queue.put(item, timeout=0.05)
+                    break
+                except Full:
+                    pass
+            if self.stopEvent.is_set():
+                return
+
+    def Get(self, imagePath):
+        """Returns the decoded pixels for an image, waiting on the worker if it
+        has not been decoded yet. Images the worker is no more than <depth>
+        images away from are taken from it; any other image (one requested
+        far out of order, or never given to the prefetcher), and any the
+        worker couldn't decode, is decoded synchronously, so a decoding error
+        is raised here.
+
+        imagePath: full path of the image, as given in imagePaths
+        return: decoded image, ready to be passed to ImageStim.setImage()
+        """
+        pixels = self.ready.pop(imagePath, None)
+        if ((pixels is None) and
+            (imagePath in self.order[self.next:self.next + self.depth])):
+            #Take the queued images up to it, keeping those before it
+            path = None
+            while (path != imagePath):
+                (path, decoded) = self.queue.get()
+                self.next += 1
+                self.ready[path] = decoded
+            pixels = self.ready.pop(imagePath)
+        if (pixels is None):
+            return self.loadFunc(imagePath)
+        return pixels
+
+    def Stop(self):
+        """Stops the worker thread and discards any images not yet used.
+        """
+        self.stopEvent.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except Empty:
+            pass
+        self.thread.join()
+        self.ready = {}
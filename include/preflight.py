@@ -0,0 +1,266 @@
+"""Stimulus corpus integrity checks, run before a session so that a missing or
+corrupt image is found before the participant arrives rather than partway
+through a task. For each image set (images/<task>_images/Set_<n>) it checks
+that:
+
+    - every image fully decodes, and is of a sane size
+    - every MDTO image has its pair (e.g. 001a_2.jpg and 001b_2.jpg)
+    - the set holds enough images for the task's length: trialsPer lure pairs
+      of each lure bin plus 2 x trialsPer singles (MDTO), 4 x trialsPer
+      images (MDTS), or numBlocks x 32 images (MDTT), plus practice images
+    - the images match the checksums (sha1) of the set's baseline,
+      "checksums.json", if there is one
+
+Images are decoded across a process pool. Images that pass are recorded, by
+modification time and size, in the set's "preflight.json"; a fast check only
+decodes images changed since they last passed, and is what MainWindow.OnRunExp
+runs before a task.
+
+To check every set, and to record the current images as the baseline:
+    python preflight.py <images dir> [trialsPer] [numBlocks] [--fast]
+    python preflight.py <images dir> --baseline
+"""
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+
+from PIL import Image
+
+from stimindex import OpenIndex, TASK_DIRS
+from schedules import MDTT_NUM_STIM
+
+BASELINE_NAME = "checksums.json"
+PASSED_NAME = "preflight.json"
+MIN_SIDE = 64
+MAX_SIDE = 4096
+
+
+def CheckImage(imagePath):
+    """Decodes an image, and hashes its file (run in a worker process).
+
+    return: dict of name, mtime, size, sha1, width, height and error (None if
+            the image decoded)
+    """
+    stat = os.stat(imagePath)
+    result = {"name": os.path.basename(imagePath), "mtime": stat.st_mtime,
+              "size": stat.st_size, "sha1": None, "width": 0, "height": 0,
+              "error": None}
+    try:
+        with open(imagePath, 'rb') as f:
+            result["sha1"] = hashlib.sha1(f.read()).hexdigest()
+        im = Image.open(imagePath)
+        (result["width"], result["height"]) = im.size
+        im.load()
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    return result
+
+
+def ReadJson(path):
+    """Returns the dict stored in a JSON file, or an empty dict.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def WriteJson(path, data):
+    """Writes a dict to a JSON file. A read-only image directory is not an
+    error.
+    """
+    tmpPath = path + ".tmp"
+    try:
+        with open(tmpPath, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmpPath, path)
+    except (IOError, OSError):
+        pass
+
+
+def DecodeSets(imgDirs, fast=False, workers=None):
+    """Decodes the images of image sets across a process pool.
+
+    fast: only decode images changed since they last passed
+    return: dict, by set directory, of the CheckImage() result of each image
+    """
+    results = dict((imgDir, {}) for imgDir in imgDirs)
+    toCheck = []
+    for imgDir in imgDirs:
+        index = OpenIndex(imgDir)
+        passed = ReadJson(os.path.join(imgDir, PASSED_NAME)) if fast else {}
+        for name in index.Images() + index.Images(practice=True):
+            imagePath = os.path.join(imgDir, name)
+            entry = passed.get(name)
+            stat = os.stat(imagePath)
+            if ((entry is not None) and (entry["mtime"] == stat.st_mtime) and
+                (entry["size"] == stat.st_size)):
+                results[imgDir][name] = entry
+            else:
+                toCheck.append((imgDir, imagePath))
+
+    if (toCheck):
+        pool = multiprocessing.Pool(workers)
+        try:
+            checked = pool.map(CheckImage, [path for imgDir, path in toCheck],
+                               chunksize=16)
+        finally:
+            pool.close()
+            pool.join()
+        for (imgDir, imagePath), result in zip(toCheck, checked):
+            results[imgDir][result["name"]] = result
+
+    for imgDir in imgDirs:
+        WriteJson(os.path.join(imgDir, PASSED_NAME),
+                  dict((name, result) for name, result in
+                       results[imgDir].items() if result["error"] is None))
+    return results
+
+
+def CountProblems(index, lenVar, practice=True):
+    """Checks that a set holds enough images, and that MDTO pairs are whole.
+
+    index: the set's StimulusIndex
+    lenVar: trials per condition (MDTO/MDTS), or number of blocks (MDTT)
+    return: list of problem descriptions
+    """
+    problems = []
+    images = index.Images()
+    if (index.task == "MDTO"):
+        members = {}
+        for name in images:
+            entry = index.Get(name)
+            key = (entry["pair"], entry["lureBin"])
+            members.setdefault(key, []).append(entry["member"])
+        for (pair, lureBin), found in sorted(members.items(),
+                                             key=lambda item: str(item[0])):
+            if (sorted(found) != ["a", "b"]):
+                problems.append("pair %s_%s has members %s" %(pair, lureBin,
+                                ", ".join(sorted(str(m) for m in found))))
+        #Whole pairs per lure bin, and the singles left over (see SplitLures)
+        whole = [sum(1 for (pair, lureBin), found in members.items()
+                     if lureBin == b and sorted(found) == ["a", "b"])
+                 for b in (1, 2)]
+        singles = sum(1 + (i < whole[1]) for i in range(lenVar+1, whole[0]))
+        if (min(whole) < lenVar):
+            problems.append("%d and %d lure pairs, %d of each are needed"
+                            %(whole[0], whole[1], lenVar))
+        if (singles < 2 * lenVar):
+            problems.append("%d singles left over, %d are needed"
+                            %(singles, 2 * lenVar))
+    else:
+        needed = 4 * lenVar if index.task == "MDTS" else lenVar * MDTT_NUM_STIM
+        if (len(images) < needed):
+            problems.append("%d images, %d are needed" %(len(images), needed))
+    if (practice and not index.Images(practice=True)):
+        problems.append("no practice images")
+    return problems
+
+
+def BaselineProblems(imgDir, results):
+    """Compares the checksums of a set's images with its baseline.
+
+    return: list of problem descriptions (none if there is no baseline)
+    """
+    baseline = ReadJson(os.path.join(imgDir, BASELINE_NAME))
+    problems = []
+    for name in sorted(baseline):
+        if (name not in results):
+            problems.append("%s is missing" %(name))
+        elif (results[name]["sha1"] != baseline[name]):
+            problems.append("%s differs from the baseline" %(name))
+    if (baseline):
+        for name in sorted(set(results) - set(baseline)):
+            problems.append("%s is not in the baseline" %(name))
+    return problems
+
+
+def ImageProblems(results):
+    """Lists the images that failed to decode, or are of an odd size.
+    """
+    problems = []
+    for name in sorted(results):
+        result = results[name]
+        if (result["error"] is not None):
+            problems.append("%s is corrupt: %s" %(name, result["error"]))
+        elif ((result["size"] == 0) or
+              (min(result["width"], result["height"]) < MIN_SIDE) or
+              (max(result["width"], result["height"]) > MAX_SIDE)):
+            problems.append("%s is %dx%d" %(name, result["width"],
+                                            result["height"]))
+    return problems
+
+
+def CheckSets(imgDirs, lenVars, practice=True, fast=False, workers=None):
+    """Checks image sets.
+
+    imgDirs: the set directories
+    lenVars: dict of trials per condition (MDTO/MDTS) or number of blocks
+             (MDTT), by task
+    return: dict of each set's problem descriptions, by set directory
+    """
+    results = DecodeSets(imgDirs, fast, workers)
+    problems = {}
+    for imgDir in imgDirs:
+        index = OpenIndex(imgDir)
+        problems[imgDir] = (ImageProblems(results[imgDir]) +
+                            CountProblems(index, lenVars[index.task],
+                                          practice) +
+                            BaselineProblems(imgDir, results[imgDir]))
+    return problems
+
+
+def Preflight(imgDir, task, lenVar, practice=True, workers=None):
+    """Runs the fast check of the set a session is about to use.
+
+    return: list of problem descriptions, empty if the set is ready
+    """
+    OpenIndex(imgDir, task)
+    return CheckSets([imgDir], {task: lenVar}, practice, True,
+                     workers)[imgDir]
+
+
+def WriteBaseline(imgDir):
+    """Records the checksums of a set's images as its baseline.
+    """
+    results = DecodeSets([imgDir])[imgDir]
+    WriteJson(os.path.join(imgDir, BASELINE_NAME),
+              dict((name, result["sha1"]) for name, result in results.items()))
+
+
+def SetDirs(imageDir):
+    """Returns the set directories under the images directory.
+    """
+    return sorted(imgDir for imgDir in
+                  glob.glob(os.path.join(imageDir, "*_images", "Set_*"))
+                  if os.path.basename(os.path.dirname(imgDir)) in TASK_DIRS)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if (not args):
+        print("usage: python preflight.py <images dir> [trialsPer] "
+              "[numBlocks] [--fast] [--baseline]")
+        sys.exit(1)
+    imgDirs = SetDirs(args[0])
+    if ("--baseline" in sys.argv):
+        for imgDir in imgDirs:
+            WriteBaseline(imgDir)
+            print("Recorded the baseline of %s" %(imgDir))
+        sys.exit(0)
+
+    trialsPer = int(args[1]) if len(args) > 1 else 20
+    numBlocks = int(args[2]) if len(args) > 2 else 6
+    lenVars = {"MDTO": trialsPer, "MDTS": trialsPer, "MDTT": numBlocks}
+    problems = CheckSets(imgDirs, lenVars, fast=("--fast" in sys.argv))
+    for imgDir in imgDirs:
+        print("%s: %s" %(imgDir, "OK" if not problems[imgDir] else
+                         "%d problems" %(len(problems[imgDir]))))
+        for problem in problems[imgDir]:
+            print("    " + problem)
+    sys.exit(1 if any(problems.values()) else 0)
@@ -0,0 +1,195 @@
+"""Class ScheduleCache stores pre-generated task schedules (see schedules.py)
+for a range of subjects, so MDTSuite can load a subject's schedule rather than
+generate it at startup, and so the counterbalancing of a whole study can be
+checked before anyone is tested. Each subject's schedule is generated from the
+same seed MDTSuite uses (PairSeed() of the subject and set).
+
+There is one cache file per task and image set, <set dir>/schedules_<task>.bin:
+
+    SCHEDULE_MAGIC              8 bytes
+    index length                unsigned 64-bit little endian
+    index                       JSON: {"fingerprint": <sha1>,
+                                       "entries": {<key>: [offset, length]}}
+    schedules                   zlib compressed JSON, one per entry, at
+                                offset (from the end of the index)
+
+An entry's key is "<subject>:<trials or blocks>", and for MDTS also the window
+size its image positions were made for: "<subject>:<trials>:<W>x<H>", so a
+schedule made for another screen is not used. The fingerprint is the SHA1 of
+the set's sorted image names, so a cache made before images were added or
+removed is not used.
+
+To pre-generate schedules for subjects 1 to 200 of set 1, in parallel:
+    python schedcache.py <set dir> <task> 1 1 200 <trials or blocks> [WxH] [workers]
+WxH is the window size MDTS positions are generated for (1920x1080 default).
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import zlib
+
+from schedules import TASKS, ListImages, PairSeed, TaskSchedule
+
+SCHEDULE_MAGIC = b"MDTSCHD1"
+
+
+def Fingerprint(imgDir, task):
+    """Returns the SHA1 of the sorted names of the images a task draws from.
+    """
+    names = "\n".join(sorted(ListImages(imgDir, task)))
+    return hashlib.sha1(names.encode('utf-8')).hexdigest()
+
+
+def EntryKey(task, subject, lenVar, windowSize=(1920, 1080)):
+    """Returns the cache key of a subject's schedule.
+    """
+    if (task == "MDTS"):
+        return "%d:%d:%dx%d" %(int(subject), int(lenVar), windowSize[0],
+                               windowSize[1])
+    return "%d:%d" %(int(subject), int(lenVar))
+
+
+def GenerateEntry(args):
+    """Generates one subject's schedule, compressed for the cache (run in a
+    worker process).
+
+    args: (task, imgDir, subject, subset, lenVar, windowSize)
+    return: (key, compressed schedule)
+    """
+    (task, imgDir, subject, subset, lenVar, windowSize) = args
+    schedule = TaskSchedule(task, imgDir, lenVar, PairSeed(subject, subset),
+                            windowSize)
+    blob = zlib.compress(json.dumps(schedule).encode('utf-8'))
+    return (EntryKey(task, subject, lenVar, windowSize), blob)
+
+
+class ScheduleCache(object):
+
+    def __init__(self, imgDir, task):
+
+        self.imgDir = imgDir
+        self.task = task
+        self.path = os.path.join(imgDir, "schedules_%s.bin" %(task))
+
+    def ReadIndex(self, f):
+        """Reads the index of an open cache file.
+
+        return: (index, offset of the first schedule), or (None, 0) if the
+                file isn't a schedule cache
+        """
+        if (f.read(len(SCHEDULE_MAGIC)) != SCHEDULE_MAGIC):
+            return (None, 0)
+        (indexLen,) = struct.unpack('<Q', f.read(8))
+        index = json.loads(f.read(indexLen).decode('utf-8'))
+        return (index, len(SCHEDULE_MAGIC) + 8 + indexLen)
+
+    def ReadAll(self):
+        """Returns every compressed schedule in the cache, by key, if the
+        cache matches the set's current images (otherwise an empty dict).
+        """
+        blobs = {}
+        try:
+            with open(self.path, 'rb') as f:
+                (index, start) = self.ReadIndex(f)
+                if (index is None) or (index["fingerprint"] !=
+                                       Fingerprint(self.imgDir, self.task)):
+                    return blobs
+                for key, (offset, length) in index["entries"].items():
+                    f.seek(start + offset)
+                    blobs[key] = f.read(length)
+        except (IOError, OSError):
+            pass
+        return blobs
+
+    def Load(self, subject, lenVar, windowSize=(1920, 1080)):
+        """Returns a subject's cached schedule, or None if it isn't cached or
+        the cache is out of date.
+
+        windowSize: (width, height) of the window the schedule is for (MDTS)
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                (index, start) = self.ReadIndex(f)
+                if (index is None):
+                    return None
+                entry = index["entries"].get(EntryKey(self.task, subject,
+                                                      lenVar, windowSize))
+                if (entry is None) or (index["fingerprint"] !=
+                                       Fingerprint(self.imgDir, self.task)):
+                    return None
+                f.seek(start + entry[0])
+                blob = f.read(entry[1])
+        except (IOError, OSError):
+            return None
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def Write(self, blobs):
+        """Writes compressed schedules to the cache, keeping those already in
+        it (if it is up to date).
+
+        blobs: dict of compressed schedules by key, as made by GenerateEntry()
+        """
+        allBlobs = self.ReadAll()
+        allBlobs.update(blobs)
+        entries = {}
+        offset = 0
+        for key in sorted(allBlobs):
+            entries[key] = [offset, len(allBlobs[key])]
+            offset += len(allBlobs[key])
+        index = json.dumps({"fingerprint": Fingerprint(self.imgDir, self.task),
+                            "entries": entries}).encode('utf-8')
+
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, 'wb') as f:
+            f.write(SCHEDULE_MAGIC)
+            f.write(struct.pack('<Q', len(index)))
+            f.write(index)
+            for key in sorted(allBlobs):
+                f.write(allBlobs[key])
+        os.replace(tmpPath, self.path)
+
+    def Build(self, subset, subjects, lenVar, windowSize=(1920, 1080),
+              workers=None):
+        """Generates the schedules of a range of subjects in parallel, and adds
+        them to the cache.
+
+        subset: the image set number, part of each subject's seed
+        subjects: the subject IDs to generate schedules for
+        lenVar: trials per condition (MDTO/MDTS), or number of blocks (MDTT)
+        workers: number of worker processes (default: one per CPU)
+        """
+        jobs = [(self.task, self.imgDir, subject, subset, lenVar, windowSize)
+                for subject in subjects]
+        pool = multiprocessing.Pool(workers)
+        try:
+            blobs = dict(pool.map(GenerateEntry, jobs))
+        finally:
+            pool.close()
+            pool.join()
+        self.Write(blobs)
+        return len(blobs)
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 7) or (sys.argv[2] not in TASKS):
+        print("usage: python schedcache.py <set dir> <MDTO|MDTS|MDTT> <set> "
+              "<first subject> <last subject> <trials or blocks> [WxH] "
+              "[workers]")
+        sys.exit(1)
+    imgDir = sys.argv[1]
+    task = sys.argv[2]
+    subset = int(sys.argv[3])
+    subjects = range(int(sys.argv[4]), int(sys.argv[5]) + 1)
+    lenVar = int(sys.argv[6])
+    windowSize = (1920, 1080)
+    if (len(sys.argv) > 7):
+        windowSize = tuple(int(n) for n in sys.argv[7].split('x'))
+    workers = int(sys.argv[8]) if len(sys.argv) > 8 else None
+    count = ScheduleCache(imgDir, task).Build(subset, subjects, lenVar,
+                                              windowSize, workers)
+    print("Cached %d %s schedules in %s" %(count, task,
+          ScheduleCache(imgDir, task).path))
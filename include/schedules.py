@@ -0,0 +1,299 @@
+"""Functions generating the trial schedules of the three tasks (which images are
+shown, in which condition, and in what order) from the images of a set. They
+need no window, so schedules can be generated ahead of time (see
+schedcache.py) as well as by the tasks themselves. Each draws from the random
+number generator it is given (the random module by default).
+
+The parts of a schedule are made in a fixed order (see ScheduleParts) from a
+random number generator of their own, seeded with PairSeed() of the subject
+and set; the tasks' other random draws come from a second generator (see
+InTaskSeed). The tasks make their schedules with BuildSchedule(), as
+TaskSchedule() does, so a subject's schedule doesn't depend on whether it was
+generated by the task or loaded from a schedule cache.
+
+A task's full schedule is a dict of named parts, under the names the tasks
+journal them as (see journal.py):
+
+    MDTO: lures ([lures, singles]), studyList, testList
+    MDTS: imageList:<W>x<H> (image positions depend on the window size),
+          studyOrder, testOrder
+    MDTT: imageBlocks, pairs:<block> for each block
+"""
+
+from __future__ import division
+import random
+
+import numpy as np
+
+from pairsolver import SpacedPairs, DEFAULT_LAG_BINS
+from stimindex import OpenIndex, ParseName
+from possampler import PositionSampler
+
+TASKS = ("MDTO", "MDTS", "MDTT")
+MDTT_NUM_STIM = 32
+
+
+def PairSeed(subjectNum, subsetNum):
+    """Creates a unique seed for the random number generator based on the
+    subject number, and the subset number (the Cantor pairing function).
+    """
+    numSum = int(subjectNum) + int(subsetNum)
+    return ((numSum*(numSum+1))/2) + subsetNum
+
+
+def ListImages(imgDir, task):
+    """Returns the sorted (non practice) images of a set directory that a task
+    draws its trials from (see stimindex.py).
+    """
+    if (task not in TASKS):
+        raise ValueError("Unknown task: %s" %(task))
+    return OpenIndex(imgDir, task).Images()
+
+
+def SplitLures(allImgs, trialsPer, rng=random):
+    """Creates a list of MDTO image lures. Lures are taken from both the lure
+    high and lure low images, and an equal amount of each are put into the
+    list. Lure pairs left over give their A image to the singles.
+
+    return: (lures, leftOvers) - lures as a list of [imgA,imgB], and the list
+            of left over A images
+    """
+    lureLowImgs = []
+    lureHighImgs = []
+    for img in allImgs:
+        lureBin = ParseName(img)["lureBin"]
+        if (lureBin == 1):
+            lureHighImgs.append(img)
+        elif (lureBin == 2):
+            lureLowImgs.append(img)
+
+    #Sort images by name
+    lureHighImgs.sort()
+    lureLowImgs.sort()
+
+    #Return a list of lures as a list w/: [imgA,imgB]
+    def LureListGroup(imgList):
+        lureList = []
+        for i in range(0, int(len(imgList)/2)):
+            lureList.append([imgList[i*2], imgList[(i*2)+1]])
+        return lureList
+
+    #Create list of lures with embedded structure, then shuffle
+    lureHighList = LureListGroup(lureHighImgs)
+    lureLowList = LureListGroup(lureLowImgs)
+    rng.shuffle(lureHighList)
+    rng.shuffle(lureLowList)
+
+    #Put number (num of trials) of list items from both lists into list
+    selectedList = []
+    for i in range(0, trialsPer):
+        selectedList.append(lureHighList[i])
+        selectedList.append(lureLowList[i])
+
+    #Unused "leftover" A images will be used as singles
+    leftOvers = []
+    for i in range(trialsPer+1, len(lureHighList)):
+        try:
+            leftOvers.append(lureHighList[i][0])
+        except IndexError:
+            pass
+        try:
+            leftOvers.append(lureLowList[i][0])
+        except IndexError:
+            pass
+
+    rng.shuffle(selectedList)
+    return (selectedList, leftOvers)
+
+
+def SplitSingles(leftOvers, trialsPer, rng=random):
+    """Creates a list of MDTO image "singles", each an image followed by either
+    "sF" (single Foil) or "sR" (single repeat).
+
+    return: list composed of [imageFileName, type]
+    """
+    targetsFoils = []
+    for i in range(0, trialsPer*2):
+        if (i % 2 == 0):
+            targetsFoils.append([leftOvers[i],"sR"])
+        else:
+            targetsFoils.append([leftOvers[i],"sF"])
+
+    rng.shuffle(targetsFoils)
+    return targetsFoils
+
+
+def LureType(img):
+    """Returns the trial type of an MDTO lure image: its lure bin, as a string.
+    """
+    return str(ParseName(img)["lureBin"])
+
+
+def StudyList(lures, singles, rng=random):
+    """Creates the shuffled MDTO study list: "A" images of the lure pairs
+    (targets), and repeat singles, each as [image, type].
+    """
+    studyImgList = []
+    for pair in lures:
+        studyImgList.append([pair[0],LureType(pair[0])])
+    for img in singles:
+        if (img[1] == "sR"):
+            studyImgList.append(img)
+    rng.shuffle(studyImgList)
+    return studyImgList
+
+
+def TestList(lures, singles, rng=random):
+    """Creates the shuffled MDTO test list: "B" images of the lure pairs, and
+    all singles, each as [image, type].
+    """
+    testImgList = []
+    for pair in lures:
+        testImgList.append([pair[1],LureType(pair[1])])
+    for img in singles:
+        testImgList.append(img)
+    rng.shuffle(testImgList)
+    return testImgList
+
+
+def SegmentImages(allImgs, trialsPer, sampler, rng=random):
+    """Shuffles MDTS images into a list, and gives each image a study and test
+    position. The list is divided into 4 sections, one for each type of trial
+    (repeat, move small, move big, and opposite corners).
+
+    sampler: the PositionSampler of the window
+    return: list, each element as: [image,<study(x,y)>,<test(x,y)>]
+    """
+    imageListFull = list(allImgs)
+    rng.shuffle(imageListFull)
+    imageListSec = imageListFull[:trialsPer*4]
+
+    createdList = []
+    for moveType in range(0, 4):
+        #Positions of all trials of the move type are drawn in one batch
+        posPairs = sampler.Sample(moveType, trialsPer)
+        for i in range(0, trialsPer):
+            createdList.append([imageListSec[len(createdList)],
+                                posPairs[i][0], posPairs[i][1]])
+    return createdList
+
+
+def TrialOrder(numTrials, rng=random):
+    """Returns a shuffled list of trial indexes.
+    """
+    trialOrder = list(range(0, numTrials))
+    rng.shuffle(trialOrder)
+    return trialOrder
+
+
+def ImageBlocks(allImgs, numStim, numBlocks, rng=random):
+    """Shuffles the MDTT images and divides them into numBlocks blocks of
+    numStim images.
+    """
+    if (len(allImgs) < numStim * numBlocks):
+        raise ValueError("%d images are too few for %d blocks of %d"
+                         %(len(allImgs), numBlocks, numStim))
+    imageList = list(allImgs)
+    rng.shuffle(imageList)
+    return [imageList[i*numStim:(i+1)*numStim] for i in range(0, numBlocks)]
+
+
+def ImageListName(windowSize):
+    """Returns the schedule name of the MDTS image list for a window size.
+    """
+    return "imageList:%dx%d" %(windowSize[0], windowSize[1])
+
+
+def InTaskSeed(seed):
+    """Returns the seed of a task's in-task randomness (practice images, ITIs,
+    MDTT side orders), derived from its schedule seed. The two are separate
+    streams, so a subject's schedule is the same whether it was generated by
+    the task or ahead of time.
+    """
+    return "in-task:%r" %(seed,)
+
+
+def ScheduleParts(task, imgDir, lenVar, rng, windowSize=(1920, 1080),
+                  lagBins=DEFAULT_LAG_BINS, numStim=MDTT_NUM_STIM):
+    """Lists how each part of a task's schedule is made, in the order the parts
+    draw from rng.
+
+    return: list of (name, makeFunc) - makeFunc(schedule) makes the part from
+            rng and the parts made before it (schedule, a dict by name)
+    """
+    parts = []
+    if (task == "MDTO"):
+        def Lures(schedule):
+            allImgs = ListImages(imgDir, task)
+            (lures, leftOvers) = SplitLures(allImgs, lenVar, rng)
+            return [lures, SplitSingles(leftOvers, lenVar, rng)]
+        parts.append(("lures", Lures))
+        parts.append(("studyList",
+                      lambda schedule: StudyList(schedule["lures"][0],
+                                                 schedule["lures"][1], rng)))
+        parts.append(("testList",
+                      lambda schedule: TestList(schedule["lures"][0],
+                                                schedule["lures"][1], rng)))
+    elif (task == "MDTS"):
+        imageListName = ImageListName(windowSize)
+        def ImageList(schedule):
+            sampler = PositionSampler(windowSize, windowSize[1]/6,
+                np.random.default_rng(rng.getrandbits(32)))
+            return SegmentImages(ListImages(imgDir, task), lenVar, sampler,
+                                 rng)
+        parts.append((imageListName, ImageList))
+        for phase in ("study", "test"):
+            parts.append((phase + "Order",
+                          lambda schedule: TrialOrder(
+                              len(schedule[imageListName]), rng)))
+    elif (task == "MDTT"):
+        parts.append(("imageBlocks",
+                      lambda schedule: ImageBlocks(ListImages(imgDir, task),
+                                                   numStim, lenVar, rng)))
+        trialsPer = int((numStim / (len(lagBins) + 1)) / 2)
+        for block in range(1, lenVar+1):
+            parts.append(("pairs:%d" %(block),
+                          lambda schedule: SpacedPairs(numStim, trialsPer,
+                                                       lagBins, rng)))
+    else:
+        raise ValueError("Unknown task: %s" %(task))
+    return parts
+
+
+def BuildSchedule(task, imgDir, lenVar, rng, windowSize=(1920, 1080),
+                  lagBins=DEFAULT_LAG_BINS, numStim=MDTT_NUM_STIM,
+                  journal=None):
+    """Makes every part of a task's schedule, in order, from rng. This is how
+    the tasks make their schedules, and how TaskSchedule() makes them ahead of
+    time.
+
+    journal: SessionJournal the parts are journaled in; parts it already has
+             (preloaded, or those of a resumed session) are used as they are
+    return: dict of schedule parts, by name
+    """
+    schedule = {}
+    for (name, makeFunc) in ScheduleParts(task, imgDir, lenVar, rng,
+                                          windowSize, lagBins, numStim):
+        if (journal is not None):
+            schedule[name] = journal.Schedule(name,
+                                              lambda: makeFunc(schedule))
+        else:
+            schedule[name] = makeFunc(schedule)
+    return schedule
+
+
+def TaskSchedule(task, imgDir, lenVar, seed, windowSize=(1920, 1080),
+                 lagBins=DEFAULT_LAG_BINS):
+    """Generates the full schedule of a task for one subject.
+
+    task: MDTO, MDTS or MDTT
+    imgDir: the image set directory
+    lenVar: trials per condition (MDTO/MDTS), or number of blocks (MDTT)
+    seed: seed of the schedule's random number generator (see PairSeed)
+    windowSize: (width, height) of the window MDTS positions are made for
+    return: dict of schedule parts, by name
+    """
+    if (task not in TASKS):
+        raise ValueError("Unknown task: %s" %(task))
+    return BuildSchedule(task, imgDir, lenVar, random.Random(seed),
+                         windowSize, lagBins)
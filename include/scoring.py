@@ -0,0 +1,251 @@
+"""Scores the test trials of MDT sessions from their typed trial records (see
+trialdata.py), for any number of sessions at once: a live session's records
+when its scores are written to its logfile, or a cohort of trial files being
+re-scored. The same function scores both, so the two always agree.
+
+Trials are grouped by session (subject, set, task) and condition, and every
+group is scored in one vectorized pass over the NumPy structured array of
+trials. The conditions of each task, in scoreList order, are:
+
+    MDTO  sR (Repeat), 1 (Lure High), 2 (Lure Low), sF (Foil)
+    MDTS  Same, Small, Large, Crnr (Corners)
+    MDTT  1 (Adjacent), 2 (Eight), 3 (Sixteen), 4 (Primacy/Recency)
+
+Score() returns one row per session and condition (SCORE_DTYPE):
+
+    correct, incorrect, responses   the counts the tasks tally (scoreList);
+                                    trials without a response aren't counted
+    hitRate, faRate                 MDTO/MDTS: the rate of "old"/"same"
+                                    responses to repeats (hits) and to the
+                                    condition's images (false alarms).
+                                    MDTT: the rate of "left" responses when the
+                                    left image came first (hits), and when it
+                                    came second (false alarms)
+    dPrime, bias                    d' = z(H) - z(F) and c = -(z(H) + z(F))/2,
+                                    with d' divided by sqrt(2) for the two
+                                    alternative MDTT. Rates are corrected
+                                    (k + 0.5)/(n + 1) before taking z, so that
+                                    rates of 0 and 1 stay finite
+    ldi                             MDTO lures: the Lure Discrimination Index,
+                                    p(new | lure) - p(new | repeat)
+    rtMean, rtMedian, rtSD          of the trials with a response
+
+Rates and metrics with no trials to compute them from are NaN.
+
+To re-score trial files (.npz or .csv), and write the scores to a CSV file:
+    python scoring.py <trial files...> [--out scores.csv]
+"""
+
+import csv
+import sys
+from statistics import NormalDist
+
+import numpy as np
+
+from trialdata import LoadCohort
+
+CONDITIONS = {"MDTO": ("sR", "1", "2", "sF"),
+              "MDTS": ("Same", "Small", "Large", "Crnr"),
+              "MDTT": ("1", "2", "3", "4")}
+CONDITION_NAMES = {"MDTO": ("Repeat", "Lure High", "Lure Low", "Foil"),
+                   "MDTS": ("Repeat", "Small", "Large", "Corners"),
+                   "MDTT": ("Adjacent", "Eight", "Sixteen", "PR")}
+NUM_CONDITIONS = 4
+
+SCORE_DTYPE = [('subject', 'i4'), ('set', 'i4'), ('task', 'U4'),
+               ('trialType', 'U8'), ('condition', 'U10'), ('trials', 'i4'),
+               ('correct', 'i4'), ('incorrect', 'i4'), ('responses', 'i4'),
+               ('hitRate', 'f8'), ('faRate', 'f8'), ('dPrime', 'f8'),
+               ('bias', 'f8'), ('ldi', 'f8'), ('rtMean', 'f8'),
+               ('rtMedian', 'f8'), ('rtSD', 'f8')]
+SCORE_FIELDS = [field[0] for field in SCORE_DTYPE]
+
+#Inverse of the standard normal CDF, applied elementwise
+InverseNormal = np.frompyfunc(NormalDist().inv_cdf, 1, 1)
+
+
+def Tally(scoreList, task, trialType, response, correct):
+    """Adds a test trial to a task's running [correct, incorrect, responses]
+    tally of its condition, as Score() counts it. Trials without a response,
+    or of no scored condition, aren't counted.
+    """
+    conditions = CONDITIONS[task]
+    if (response) and (str(trialType) in conditions):
+        score = scoreList[conditions.index(str(trialType))]
+        score[2] += 1
+        if (response == correct):
+            score[0] += 1
+        else:
+            score[1] += 1
+
+
+def Ratio(count, total):
+    """Returns count / total elementwise, NaN where total is 0.
+    """
+    count = np.asarray(count, dtype=float)
+    total = np.asarray(total, dtype=float)
+    ratio = np.full(count.shape, np.nan)
+    np.divide(count, total, out=ratio, where=(total > 0))
+    return ratio
+
+
+def ZScore(count, total):
+    """Returns the z score of corrected rates (k + 0.5)/(n + 1), NaN where
+    total is 0.
+    """
+    z = InverseNormal((np.asarray(count) + 0.5) /
+                      (np.asarray(total) + 1.0)).astype(float)
+    return np.where(np.asarray(total) > 0, z, np.nan)
+
+
+def Score(trials):
+    """Scores the test trials of one or more sessions.
+
+    trials: NumPy structured array of TRIAL_DTYPE
+    return: NumPy structured array of SCORE_DTYPE, NUM_CONDITIONS rows per
+            session in condition order, sessions sorted by subject, set and
+            task
+    """
+    trials = trials[trials['phase'] == 'test']
+    cond = np.full(len(trials), -1)
+    for task, conditions in CONDITIONS.items():
+        isTask = (trials['task'] == task)
+        for c, trialType in enumerate(conditions):
+            cond[isTask & (trials['trialType'] == trialType)] = c
+    trials = trials[cond >= 0]
+    cond = cond[cond >= 0]
+
+    #One cell per session and condition
+    sessionKeys = np.empty(len(trials), dtype=SCORE_DTYPE[:3])
+    for name in ('subject', 'set', 'task'):
+        sessionKeys[name] = trials[name]
+    (sessions, sessionIdx) = np.unique(sessionKeys, return_inverse=True)
+    sessionIdx = sessionIdx.reshape(-1)
+    cell = sessionIdx * NUM_CONDITIONS + cond
+    numCells = len(sessions) * NUM_CONDITIONS
+
+    def Count(mask):
+        return np.bincount(cell, weights=mask,
+                           minlength=numCells).reshape(-1, NUM_CONDITIONS)
+
+    responded = (trials['response'] != '')
+    correct = responded & (trials['response'] == trials['correctKey'])
+    #Signal trials: repeats (MDTO/MDTS), or the left image first (MDTT)
+    isMDTT = (trials['task'] == 'MDTT')
+    signal = (cond == 0) & ~isMDTT
+    if (isMDTT.any()):
+        pos1 = np.where(isMDTT, trials['pos1'], '0').astype(int)
+        pos2 = np.where(isMDTT, trials['pos2'], '0').astype(int)
+        signal |= isMDTT & (pos1 < pos2)
+    saidSignal = responded & (correct == signal)
+
+    numTrials = Count(np.ones(len(trials)))
+    numCorrect = Count(correct)
+    numResponses = Count(responded)
+    hitK = Count(signal & saidSignal)
+    hitN = Count(signal & responded)
+    faK = Count(~signal & saidSignal)
+    faN = Count(~signal & responded)
+    #A yes/no session's hit rate is that of its repeats, for every condition
+    yesNo = (sessions['task'] != 'MDTT')
+    hitK[yesNo] = hitK[yesNo][:, :1]
+    hitN[yesNo] = hitN[yesNo][:, :1]
+
+    zHit = ZScore(hitK, hitN)
+    zFA = ZScore(faK, faN)
+    dPrime = zHit - zFA
+    dPrime[~yesNo] /= np.sqrt(2.0)
+    hitRate = Ratio(hitK, hitN)
+    faRate = Ratio(faK, faN)
+    ldi = np.full(hitRate.shape, np.nan)
+    isMDTO = (sessions['task'] == 'MDTO')
+    ldi[isMDTO, 1:3] = (hitRate - faRate)[isMDTO, 1:3]
+
+    #Reaction times of the trials with a response, sorted by cell
+    rtCell = cell[responded]
+    rt = trials['rt'][responded]
+    order = np.lexsort((rt, rtCell))
+    (rtCell, rt) = (rtCell[order], rt[order])
+    rtCount = np.bincount(rtCell, minlength=numCells)
+    rtMean = Ratio(np.bincount(rtCell, weights=rt, minlength=numCells),
+                   rtCount)
+    deviation = rt - rtMean[rtCell]
+    rtSD = np.sqrt(Ratio(np.bincount(rtCell, weights=deviation**2,
+                                     minlength=numCells), rtCount - 1))
+    starts = np.searchsorted(rtCell, np.arange(numCells))
+    lower = np.minimum(starts + (rtCount - 1) // 2, max(len(rt) - 1, 0))
+    upper = np.minimum(starts + rtCount // 2, max(len(rt) - 1, 0))
+    rtMedian = np.full(numCells, np.nan)
+    if (len(rt)):
+        rtMedian = np.where(rtCount > 0, (rt[lower] + rt[upper]) / 2.0,
+                            np.nan)
+
+    scores = np.empty(numCells, dtype=SCORE_DTYPE)
+    for name in ('subject', 'set', 'task'):
+        scores[name] = np.repeat(sessions[name], NUM_CONDITIONS)
+    condIdx = np.tile(np.arange(NUM_CONDITIONS), len(sessions))
+    for task in CONDITIONS:
+        isTask = (scores['task'] == task)
+        scores['trialType'][isTask] = np.array(CONDITIONS[task])[
+            condIdx[isTask]]
+        scores['condition'][isTask] = np.array(CONDITION_NAMES[task])[
+            condIdx[isTask]]
+    scores['trials'] = numTrials.reshape(-1)
+    scores['correct'] = numCorrect.reshape(-1)
+    scores['incorrect'] = (numResponses - numCorrect).reshape(-1)
+    scores['responses'] = numResponses.reshape(-1)
+    scores['hitRate'] = hitRate.reshape(-1)
+    scores['faRate'] = faRate.reshape(-1)
+    scores['dPrime'] = dPrime.reshape(-1)
+    scores['bias'] = (-(zHit + zFA) / 2.0).reshape(-1)
+    scores['ldi'] = ldi.reshape(-1)
+    scores['rtMean'] = rtMean
+    scores['rtMedian'] = rtMedian
+    scores['rtSD'] = rtSD
+    return scores
+
+
+def ScoreList(scores):
+    """Returns the [correct, incorrect, responses] tally of each condition of
+    one session's scores, as the tasks keep it.
+    """
+    return [[int(row['correct']), int(row['incorrect']), int(row['responses'])]
+            for row in scores]
+
+
+def WriteScoresCSV(path, scores):
+    """Writes scores to a CSV file, with a header row of field names.
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SCORE_FIELDS)
+        for row in scores:
+            writer.writerow(row.tolist())
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:]]
+    outPath = None
+    if ("--out" in args):
+        outPath = args[args.index("--out") + 1]
+        del args[args.index("--out"):args.index("--out") + 2]
+    if (not args):
+        print("usage: python scoring.py <trial files...> [--out scores.csv]")
+        sys.exit(1)
+    scores = Score(LoadCohort(args))
+    if (outPath is not None):
+        WriteScoresCSV(outPath, scores)
+        print("Wrote %d scores of %d sessions to %s"
+              %(len(scores), len(scores) // NUM_CONDITIONS, outPath))
+    else:
+        print("{:>8}{:>5}{:>6}{:>11}{:>5}{:>5}{:>5}{:>7}{:>7}{:>7}{:>7}{:>7}"
+              "{:>8}".format("subject", "set", "task", "condition", "cor",
+                             "inc", "resp", "H", "FA", "d'", "c", "LDI",
+                             "RT"))
+        for row in scores:
+            print("{:>8}{:>5}{:>6}{:>11}{:>5}{:>5}{:>5}{:>7.2f}{:>7.2f}"
+                  "{:>7.2f}{:>7.2f}{:>7.2f}{:>8.3f}".format(
+                  row['subject'], row['set'], row['task'], row['condition'],
+                  row['correct'], row['incorrect'], row['responses'],
+                  row['hitRate'], row['faRate'], row['dPrime'], row['bias'],
+                  row['ldi'], row['rtMean']))
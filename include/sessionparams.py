@@ -0,0 +1,86 @@
+"""Session parameter checks shared by the launchers: the wx GUI (mdtrun.py)
+and the command line runner (mdtcli.py). Neither module imports wx or
+psychopy, so a launcher can validate its parameters before either is loaded.
+
+CheckParams() applies the rules MainWindow.OnRunExp has always applied to its
+fields, and returns the same error messages. PreflightProblems() runs the fast
+image check (see preflight.py) of the set a task is about to use.
+"""
+
+import os
+
+VERSION = 2.0
+
+TASK_TYPES = ("Object", "Spatial", "Temporal")
+TASK_IMAGES = {"Object": ("MDTO", "mdto_images"),
+               "Spatial": ("MDTS", "mdts_images"),
+               "Temporal": ("MDTT", "mdtt_images")}
+
+#Error messages of invalid parameters
+ID_ERROR_TEXT = "- Subject ID must contain numbers only\n"
+SET_ERROR_TEXT = "- Set Choice must be a number 1-10\n"
+DUR_ERROR_TEXT1 = "- Trial duration must be an integer or decimal number\n"
+DUR_ERROR_TEXT2 = "- Trial duration must be greater than 0\n"
+ISI_ERROR_TEXT1 = "- ISI must be an integer or decimal number\n"
+ISI_ERROR_TEXT2 = "- ISI must be greater than 0\n"
+LOG_ERROR_TEXT = "- Logfile output directory does not exist\n"
+BUTTON_ERROR_TEXT = " - Buttons must be separated by comma, with only 2 buttons\n"
+PAUSE_BUTTON_ERROR_TEXT = " - Pause button must be 1 key"
+
+
+def CheckParams(subjectID, subset, trialDur, ISI, selfPaced, inputButtons,
+                pauseButton, logDir):
+    """Checks session parameters, as entered (strings).
+
+    inputButtons: the two response buttons, separated by a comma
+    return: (errorMsgs, inputButtons) - the error messages, an empty string if
+            the parameters are valid, and the list of the two buttons
+    """
+    errorMsgs = ""
+    if "," not in inputButtons or len(inputButtons.split(",")) != 2:
+        errorMsgs += BUTTON_ERROR_TEXT
+    else:
+        inputButtons = [str(inputButton.strip().lower()) for inputButton in inputButtons.split(",")]
+    if len(pauseButton) != 1:
+        errorMsgs += PAUSE_BUTTON_ERROR_TEXT
+    if (subjectID.isdigit() == False):
+        errorMsgs += ID_ERROR_TEXT
+    if not subset.isdigit():
+        errorMsgs += SET_ERROR_TEXT
+    elif int(subset) < 1 or int(subset) > 10:
+        errorMsgs += SET_ERROR_TEXT
+    if (not selfPaced):
+        try:
+            if (float(trialDur) <= 0):
+                errorMsgs += DUR_ERROR_TEXT2
+        except ValueError:
+            errorMsgs += DUR_ERROR_TEXT1
+    try:
+        if (float(ISI) <= 0):
+            errorMsgs += ISI_ERROR_TEXT2
+    except ValueError:
+        errorMsgs += ISI_ERROR_TEXT1
+    if (os.path.isdir(logDir) == False):
+        errorMsgs += LOG_ERROR_TEXT
+    return (errorMsgs, inputButtons)
+
+
+def ImageSetDir(curDir, expType, subset):
+    """Returns the directory of a task's image set.
+    """
+    return os.path.join(curDir, "images", TASK_IMAGES[expType][1],
+                        "Set_{}".format(subset))
+
+
+def PreflightProblems(curDir, expType, subset, expLenVar, practiceTrials):
+    """Checks the images of the task's set (see preflight.py).
+
+    return: (imgDir, problems) - the set's directory, and the list of problem
+            descriptions, empty if the set is ready to run
+    """
+    from preflight import Preflight
+    imgDir = ImageSetDir(curDir, expType, subset)
+    if (not os.path.isdir(imgDir)):
+        return (imgDir, ["{} does not exist".format(imgDir)])
+    return (imgDir, Preflight(imgDir, TASK_IMAGES[expType][0], expLenVar,
+                              practiceTrials))
@@ -0,0 +1,46 @@
+"""The window a session is run in. MDTSuite opens one window for the whole
+session (button diagnostic, practice and task) and hands it to the task, so the
+GL context is created, the monitor detected and the screen mode switched once,
+rather than each time a window is opened. Tasks given no window open their own
+with MakeWindow().
+
+WarmUp() draws each kind of stimulus the tasks use once, in the background
+color, so that shader compilation, texture setup and the font atlas happen
+before the first prompt rather than on its first flip. It also measures the
+window's refresh rate (see framesched.py), once for the session.
+"""
+
+import numpy as np
+from psychopy.visual import Window, TextStim, ImageStim, ShapeStim, Circle
+
+from framesched import FrameScheduler
+
+#Text heights the tasks use, laid out once so their glyphs are in the atlas
+WARM_UP_HEIGHTS = (40, 50)
+WARM_UP_TEXT = ("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+                "0123456789.,?!'()%/-")
+
+
+def MakeWindow(screenType):
+    """Opens a window for a screen type ('Windowed', 'Fullscreen' or
+    'Scanner'; all but 'Windowed' are full screen).
+    """
+    return Window(fullscr=(screenType != 'Windowed'), units='pix',
+                  color='White', allowGUI=False)
+
+
+def WarmUp(window):
+    """Draws text, an image and shapes once, invisibly, and measures the
+    refresh rate.
+    """
+    stims = [TextStim(window, text=WARM_UP_TEXT, color='White',
+                      height=height) for height in WARM_UP_HEIGHTS]
+    stims.append(TextStim(window, text=WARM_UP_TEXT, color='White'))
+    stims.append(ImageStim(window, image=np.ones((64, 64)), size=(64, 64)))
+    stims.append(ShapeStim(window, fillColor='White', lineColor='White',
+                           vertices=((0,0), (0,10), (10,10), (10,0))))
+    stims.append(Circle(window, 10, lineColor='White', fillColor='White'))
+    for stim in stims:
+        stim.draw(window)
+    window.flip()
+    FrameScheduler(window)
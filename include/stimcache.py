@@ -0,0 +1,49 @@
+"""Class StimulusCache decodes and uploads a set of images to the graphics card
+once, before the timed portion of a task begins. Each cached image is kept as
+its own ImageStim, with its texture already resident, so that a trial only has
+to bind and draw an existing stimulus rather than reading, decoding and
+uploading a JPEG between trial onsets.
+"""
+
+from psychopy.visual import ImageStim
+
+
+class StimulusCache(object):
+
+    def __init__(self, window, loadFunc):
+        """window: the window the stimuli are drawn in
+        loadFunc: function returning what to load for an image filename (a
+                  path or decoded image, as accepted by ImageStim.setImage)
+        """
+        self.window = window
+        self.loadFunc = loadFunc
+        self.stimuli = {}
+
+    def Preload(self, images, sizeFunc=None):
+        """Creates an ImageStim for each image not already in the cache, which
+        decodes the file and uploads its texture to the window.
+
+        images: list of image filenames to load
+        sizeFunc: optional function taking the image filename and returning
+                  the (width,height) the stimulus should be drawn at
+        """
+        for image in images:
+            if (image in self.stimuli):
+                continue
+            stim = ImageStim(self.window, image=self.loadFunc(image))
+            if (sizeFunc is not None):
+                stim.setSize(sizeFunc(image))
+            self.stimuli[image] = stim
+
+    def Get(self, image):
+        """Returns the preloaded ImageStim for an image, or None if the image
+        was never loaded into the cache.
+        """
+        return self.stimuli.get(image)
+
+    def Release(self):
+        """Frees the textures of every cached stimulus and empties the cache.
+        """
+        for stim in self.stimuli.values():
+            stim.clearTextures()
+        self.stimuli = {}
@@ -0,0 +1,237 @@
+"""Class StimulusIndex classifies every file of an image set once, so the tasks
+query the index rather than each listing the directory and parsing filenames.
+The naming rules of the stimuli live here, in ParseName():
+
+    MDTO images       001a_2.jpg               pair 001, member a, lure bin 2
+    MDTS/MDTT images  001.jpg                  image 001
+    practice images   PR_Set_1_low_134a.jpg    MDTO: practice block 1, type
+                                               low, pair 134, member a
+                      PR_033a.jpg              MDTS/MDTT: image 033, member a
+
+The index is stored as "index.json" within the set's image directory, with the
+directory's modification time. Adding, removing or renaming a file changes that
+time, and the index is then rebuilt (one directory scan) and saved again. The
+suite writes its own caches into set directories too (SUITE_FILES: the index,
+manifest, schedule cache and preflight baseline, and their temporary files);
+those aren't stimuli, so when only they have changed, the stored index is kept
+and just its modification time is brought up to date.
+Within a process, OpenIndex() returns the same index for a directory while its
+modification time is unchanged, so repeated queries cost one stat.
+
+Each file's entry is a dict of: task, set, practice (True/False),
+practiceBlock, practiceType, pair, member, lureBin and ext; fields that don't
+apply to a file are None.
+"""
+
+import os, re, json, fnmatch
+
+#Image extensions each task draws its images from
+TASK_EXTS = {"MDTO": ('.jpg', '.jpeg', '.JPG'),
+             "MDTS": ('.jpg', '.JPG'),
+             "MDTT": ('.jpg',)}
+TASK_DIRS = {"mdto_images": "MDTO", "mdts_images": "MDTS",
+             "mdtt_images": "MDTT"}
+
+MDTO_NAME = re.compile(r'^(\d+)([ab])_(\d)$')
+MDTO_PRACTICE_NAME = re.compile(r'^PR_Set_(\d+)_([a-z]+)_(\d+)([ab])$')
+PRACTICE_NAME = re.compile(r'^PR_(\d+)([ab])?$')
+IMAGE_NAME = re.compile(r'^(\d+)$')
+#Files the suite writes into a set directory itself, which aren't stimuli
+SUITE_FILES = ("index.json", "manifest.json", "schedules_*.bin",
+               "preflight.json", "checksums.json", "*.tmp")
+
+_indexes = {}
+
+
+def ParseName(name):
+    """Classifies an image set file by its name.
+
+    return: dict of practice, practiceBlock, practiceType, pair, member,
+            lureBin and ext
+    """
+    (stem, ext) = os.path.splitext(name)
+    entry = {"practice": stem.startswith("PR"), "practiceBlock": None,
+             "practiceType": None, "pair": None, "member": None,
+             "lureBin": None, "ext": ext}
+    match = MDTO_NAME.match(stem)
+    if (match):
+        entry["pair"] = match.group(1)
+        entry["member"] = match.group(2)
+        entry["lureBin"] = int(match.group(3))
+        return entry
+    match = MDTO_PRACTICE_NAME.match(stem)
+    if (match):
+        entry["practiceBlock"] = int(match.group(1))
+        entry["practiceType"] = match.group(2)
+        entry["pair"] = match.group(3)
+        entry["member"] = match.group(4)
+        return entry
+    match = PRACTICE_NAME.match(stem) or IMAGE_NAME.match(stem)
+    if (match):
+        entry["pair"] = match.group(1)
+        if (len(match.groups()) > 1):
+            entry["member"] = match.group(2)
+    return entry
+
+
+def SuiteFile(name):
+    """Returns whether a file of a set directory is one the suite writes
+    (dotfiles, such as the .derivatives cache, included).
+    """
+    return (name.startswith('.') or
+            any(fnmatch.fnmatch(name, pattern) for pattern in SUITE_FILES))
+
+
+def OpenIndex(imgDir, task=None):
+    """Returns the StimulusIndex of an image set directory, reusing the one
+    already opened in this process if the directory hasn't changed.
+    """
+    key = os.path.abspath(imgDir)
+    index = _indexes.get(key)
+    if ((index is None) or ((task is not None) and (index.task != task)) or
+        (not index.Unchanged())):
+        index = StimulusIndex(imgDir, task)
+        _indexes[key] = index
+    return index
+
+
+class StimulusIndex(object):
+
+    INDEX_NAME = "index.json"
+    INDEX_VERSION = 2
+
+    def __init__(self, imgDir, task=None):
+        """imgDir: the image set directory, e.g. images/mdto_images/Set_1
+        task: MDTO, MDTS or MDTT; by default, from the name of the directory
+              the set is in
+        """
+        self.imgDir = imgDir
+        self.path = os.path.join(imgDir, self.INDEX_NAME)
+        absDir = os.path.abspath(imgDir)
+        self.task = task or TASK_DIRS.get(os.path.basename(
+                                          os.path.dirname(absDir)))
+        setName = os.path.basename(absDir)
+        self.set = int(setName[4:]) if setName.startswith("Set_") and (
+                   setName[4:].isdigit()) else None
+        self.mtime = None
+        self.entries = {}
+        self.Load()
+
+    def Load(self):
+        """Reads the stored index if the directory hasn't changed since it was
+        made, otherwise scans the directory and saves a new index.
+        """
+        self.mtime = os.stat(self.imgDir).st_mtime
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if ((stored.get("version") == self.INDEX_VERSION) and
+                (stored.get("task") == self.task)):
+                self.entries = stored["files"]
+                if (stored.get("mtime") == self.mtime):
+                    return
+                #Only the suite's own files changed: keep the index
+                self.mtime = stored.get("mtime")
+                if (self.Unchanged()):
+                    return
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+        self.Scan()
+        self.Save()
+
+    def Unchanged(self):
+        """Checks that the directory's files are still those indexed. If the
+        directory's modification time has changed, but none of its stimuli
+        have (the suite wrote one of its own files), the new time is stored.
+
+        return: True if the index is up to date
+        """
+        mtime = os.stat(self.imgDir).st_mtime
+        if (mtime == self.mtime):
+            return True
+        names = set(name for name in os.listdir(self.imgDir)
+                    if not SuiteFile(name))
+        if (names != set(self.entries)):
+            return False
+        self.mtime = mtime
+        self.StoreMtime()
+        return True
+
+    def Scan(self):
+        """Classifies every file in the directory.
+        """
+        self.entries = {}
+        for name in os.listdir(self.imgDir):
+            if (SuiteFile(name)):
+                continue
+            entry = ParseName(name)
+            entry["task"] = self.task
+            entry["set"] = self.set
+            self.entries[name] = entry
+
+    def Save(self):
+        """Writes the index to disk. Saving the index changes the directory's
+        modification time, so the time after saving is stored. A read-only
+        image directory is not an error; the directory is then simply scanned
+        on each load. Each process writes its own temporary file, as pool
+        workers may save the same index at once.
+        """
+        tmpPath = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmpPath, 'w') as f:
+                json.dump({"version": self.INDEX_VERSION, "task": self.task,
+                           "mtime": 0, "files": self.entries}, f,
+                          sort_keys=True)
+            os.replace(tmpPath, self.path)
+        except (IOError, OSError):
+            if (os.path.exists(tmpPath)):
+                os.remove(tmpPath)
+            return
+        self.mtime = os.stat(self.imgDir).st_mtime
+        self.StoreMtime()
+
+    def StoreMtime(self):
+        """Rewrites the modification time of the stored index in place, which
+        leaves the directory's own modification time unchanged.
+        """
+        try:
+            with open(self.path, 'r+') as f:
+                stored = json.load(f)
+                stored["mtime"] = self.mtime
+                f.seek(0)
+                json.dump(stored, f, sort_keys=True)
+                f.truncate()
+        except (IOError, OSError, ValueError):
+            pass
+
+    def Get(self, name):
+        """Returns the entry (dict) of a filename, or None.
+        """
+        return self.entries.get(name)
+
+    def Names(self, exts=None):
+        """Returns the sorted names of all files with one of the extensions
+        (any file, if exts is None).
+        """
+        return sorted(name for name, entry in self.entries.items()
+                      if (exts is None) or (entry["ext"] in exts))
+
+    def Images(self, practice=False):
+        """Returns the sorted names of the task's images: those trials are
+        drawn from, or the practice images.
+        """
+        exts = TASK_EXTS.get(self.task, ('.jpg',))
+        return [name for name in self.Names(exts)
+                if self.entries[name]["practice"] == practice]
+
+    def PracticeImages(self, block):
+        """Returns the sorted names of the MDTO practice images of a block.
+        """
+        return [name for name in self.Images(practice=True)
+                if self.entries[name]["practiceBlock"] == block]
+
+    def LureBin(self, name):
+        """Returns the lure bin of an MDTO image, or None.
+        """
+        entry = self.entries.get(name)
+        return entry["lureBin"] if entry is not None else None
@@ -0,0 +1,150 @@
+"""Class StimulusPack reads a "pack" of a set's stimulus images: a single file
+holding every image of the set as raw RGBA pixels, already resized for a given
+display size, along with an index of where each image lies in the file. The
+pack is memory mapped, and images are handed out as views onto the mapping,
+so loading an image during a session involves no JPEG decoding or copying.
+
+Pack layout (all integers little endian):
+    8 bytes     magic, b"MDTPACK1"
+    8 bytes     length of the index, in bytes
+    <length>    JSON index: {"boxSize": int, "images": {name: [offset,
+                width, height, sha1], ...}}, offsets relative to the data
+    ...         image data, each image's rows of RGBA bytes, 16 byte aligned
+
+Packs live alongside the set's derivatives, one per display size. Running this
+file packs a set for a task and window height (see derivcache.py):
+    python include/stimpack.py <imgDir> <task: MDTO|MDTS|MDTT> <windowHeight>
+"""
+
+import os, sys, mmap, json, struct
+import numpy as np
+from PIL import Image
+from derivcache import DerivativeCache, TASK_IMAGE_SCALE
+
+PACK_MAGIC = b"MDTPACK1"
+PACK_ALIGN = 16
+
+
+def PackPath(derivCache):
+    """Returns the path of the pack matching a set's derivative cache.
+    """
+    return os.path.join(derivCache.cacheDir,
+                        "pack_{}.bin".format(derivCache.boxSize))
+
+
+def BuildPack(derivCache):
+    """Writes the pack of every image in a set, at the derivative cache's size.
+
+    derivCache: the set's DerivativeCache
+    return: path of the written pack
+    """
+    images = sorted(derivCache.manifest.entries.keys())
+    paths = derivCache.Build(images)
+
+    index = {}
+    offset = 0
+    for image, path in zip(images, paths):
+        width, height = Image.open(path).size
+        sha1 = derivCache.manifest.Get(image)["sha1"]
+        index[image] = [offset, width, height, sha1]
+        offset += width * height * 4
+        offset += (-offset) % PACK_ALIGN
+
+    header = json.dumps({"boxSize": derivCache.boxSize,
+                         "images": index}).encode('utf-8')
+    dataStart = len(PACK_MAGIC) + 8 + len(header)
+    padding = (-dataStart) % PACK_ALIGN
+    header += b" " * padding
+
+    packPath = PackPath(derivCache)
+    tmpPath = "{}.{}.tmp".format(packPath, os.getpid())
+    with open(tmpPath, 'wb') as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        dataStart = f.tell()
+        for image, path in zip(images, paths):
+            f.seek(dataStart + index[image][0])
+            f.write(Image.open(path).convert('RGBA').tobytes())
+        f.truncate(dataStart + offset)
+    os.replace(tmpPath, packPath)
+    return packPath
+
+
+def OpenPack(derivCache):
+    """Opens the pack matching a set's derivative cache, if it exists and every
+    image in it still matches the set's manifest.
+
+    return: a StimulusPack, or None if there is no usable pack
+    """
+    packPath = PackPath(derivCache)
+    if (not os.path.isfile(packPath)):
+        return None
+    try:
+        pack = StimulusPack(packPath)
+    except (IOError, OSError, ValueError):
+        return None
+    for image, entry in derivCache.manifest.entries.items():
+        if ((image not in pack) or (pack.index[image][3] != entry["sha1"])):
+            pack.Close()
+            return None
+    return pack
+
+
+class StimulusPack(object):
+
+    def __init__(self, packPath):
+
+        self.packPath = packPath
+        self.file = open(packPath, 'rb')
+        try:
+            if (self.file.read(len(PACK_MAGIC)) != PACK_MAGIC):
+                raise ValueError("Not a stimulus pack: %s" %(packPath))
+            (headerLen,) = struct.unpack('<Q', self.file.read(8))
+            header = json.loads(self.file.read(headerLen).decode('utf-8'))
+            self.dataStart = len(PACK_MAGIC) + 8 + headerLen
+            self.boxSize = header["boxSize"]
+            self.index = header["images"]
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+
+    def __contains__(self, image):
+        return image in self.index
+
+    def GetArray(self, image):
+        """Returns a (height,width,4) uint8 view of an image's RGBA pixels,
+        mapped directly from the pack file (no copy).
+        """
+        offset, width, height, sha1 = self.index[image]
+        return np.frombuffer(self.map, dtype=np.uint8, count=width*height*4,
+                             offset=self.dataStart + offset).reshape(
+                             (height, width, 4))
+
+    def GetImage(self, image):
+        """Returns an image as an RGBA PIL image sharing the pack's memory,
+        which ImageStim uploads as 8 bit texture data. (ImageStim reads numpy
+        arrays as -1 to 1 floats, so the uint8 view cannot be given directly.)
+        """
+        pixels = self.GetArray(image)
+        return Image.frombuffer('RGBA', (pixels.shape[1], pixels.shape[0]),
+                                pixels, 'raw', 'RGBA', 0, 1)
+
+    def Close(self):
+        """Unmaps and closes the pack file.
+        """
+        self.map.close()
+        self.file.close()
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) != 4 or sys.argv[2] not in TASK_IMAGE_SCALE):
+        print(__doc__)
+        sys.exit(1)
+    boxSize = int(sys.argv[3]) / TASK_IMAGE_SCALE[sys.argv[2]]
+    packPath = BuildPack(DerivativeCache(sys.argv[1], boxSize))
+    pack = StimulusPack(packPath)
+    print("{}: {} images at {}px".format(packPath, len(pack.index),
+                                         pack.boxSize))
+    pack.Close()
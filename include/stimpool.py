@@ -0,0 +1,64 @@
+"""Class StimulusPool holds one ImageStim per screen "slot" (e.g. the center of
+the screen, or the left/right image of a pair), shared by all of the tasks run
+by MDTSuite. Trials acquire the stimulus of the slot they draw in and set a new
+image on it, rather than constructing a new ImageStim each trial, so the number
+of stimulus objects and GL textures stays fixed over a session. Textures are
+freed explicitly by Release(), before the window they belong to is closed.
+"""
+
+from psychopy.visual import ImageStim
+
+
+class StimulusPool(object):
+
+    CENTER = "center"
+    LEFT = "left"
+    RIGHT = "right"
+
+    def __init__(self, window=None):
+
+        self.window = window
+        self.slots = {}
+
+    def SetWindow(self, window):
+        """Binds the pool to the window stimuli are drawn in. Stimuli created
+        for a previous window are released first.
+        """
+        if (window is not self.window):
+            self.Release()
+            self.window = window
+
+    def Preallocate(self, slots):
+        """Creates the stimulus of each given slot ahead of the first trial.
+        """
+        for slot in slots:
+            self.Acquire(slot)
+
+    def Acquire(self, slot, size=None, pos=None):
+        """Returns the stimulus of a slot, creating it on first use.
+
+        slot: name of the screen slot, e.g. StimulusPool.CENTER
+        size: optional (width,height) to set on the stimulus
+        pos: optional (x,y) position to set on the stimulus
+        return: the slot's ImageStim
+        """
+        stim = self.slots.get(slot)
+        if (stim is None):
+            stim = ImageStim(self.window)
+            self.slots[slot] = stim
+        if (size is not None):
+            stim.setSize(size)
+        if (pos is not None):
+            stim.setPos(pos)
+        return stim
+
+    def Release(self, slot=None):
+        """Frees the texture(s) of one slot, or of every slot if none is given,
+        and removes them from the pool.
+        """
+        if (slot is None):
+            slots = list(self.slots.keys())
+        else:
+            slots = [slot] if slot in self.slots else []
+        for name in slots:
+            self.slots.pop(name).clearTextures()
@@ -0,0 +1,37 @@
+"""Class TextCache keeps the TextStims of a window's prompts, so that each
+prompt's text is laid out and rasterized once, rather than every time it is
+shown. Tasks preload their fixed prompts (pause screen, phase prompts, exit
+message, ...) when they start; any other text is laid out on first use and
+reused from then on.
+"""
+
+from psychopy.visual import TextStim
+
+
+class TextCache(object):
+
+    def __init__(self, window):
+
+        self.window = window
+        self.stimuli = {}
+
+    def Get(self, text, **kwargs):
+        """Returns the TextStim showing a text with the given TextStim options
+        (color, height, pos, ...), creating it if this is its first use.
+        Options must be hashable, e.g. positions given as tuples.
+        """
+        key = (text, tuple(sorted(kwargs.items())))
+        stim = self.stimuli.get(key)
+        if (stim is None):
+            stim = TextStim(self.window, text=text, **kwargs)
+            self.stimuli[key] = stim
+        return stim
+
+    def Preload(self, prompts):
+        """Lays out each prompt ahead of its first use.
+
+        prompts: list of (text, options) tuples, options being a dict of
+                 TextStim keyword arguments
+        """
+        for text, options in prompts:
+            self.Get(text, **options)
@@ -0,0 +1,118 @@
+"""Class TrialData collects one typed record per trial run by a task, alongside
+the text logfile, so sessions can be analysed without parsing the logfile.
+MDTSuite writes the records of a session to <sub>_<task>_trials.csv, and can
+also write them to <sub>_<task>_trials.npz, a columnar NumPy archive holding
+one array per field, which loads without any parsing.
+
+Schema (one row per trial, fields in this order):
+
+    subject     i4   subject ID
+    set         i4   stimulus set
+    task        U4   MDTO, MDTS or MDTT
+    phase       U8   study or test
+    block       i4   block (MDTT session) number, 1 for MDTO/MDTS
+    trial       i4   trial number within the phase/block, from 1
+    image       U48  image shown (the left image of an MDTT test pair)
+    image2      U48  right image of an MDTT test pair, empty otherwise
+    trialType   U8   MDTO image type (sR, sF, 1-5, ...), MDTS Same/Small/
+                     Large/Crnr, MDTT study: empty, test: pair type 1-4
+    pos1        U16  MDTS start position, MDTT left image index
+    pos2        U16  MDTS end position, MDTT right image index
+    correctKey  U16  correct response key, empty if there is none
+    response    U16  key pressed, empty if no response
+    rt          f8   reaction time (seconds), 0 if no response
+
+LoadTrials(path) reads a .npz (or .csv) file back as a NumPy structured array,
+and LoadCohort(paths) concatenates the trials of several sessions.
+"""
+
+import csv
+
+import numpy as np
+
+TRIAL_DTYPE = [('subject', 'i4'), ('set', 'i4'), ('task', 'U4'),
+               ('phase', 'U8'), ('block', 'i4'), ('trial', 'i4'),
+               ('image', 'U48'), ('image2', 'U48'), ('trialType', 'U8'),
+               ('pos1', 'U16'), ('pos2', 'U16'), ('correctKey', 'U16'),
+               ('response', 'U16'), ('rt', 'f8')]
+TRIAL_FIELDS = [field[0] for field in TRIAL_DTYPE]
+
+FORMATS = ('csv', 'npz')
+
+
+def LoadTrials(path):
+    """Reads the trials of a session from a .npz file written by WriteNpz(),
+    or a .csv file written by WriteCSV().
+
+    return: NumPy structured array of TRIAL_DTYPE
+    """
+    if (path.lower().endswith('.csv')):
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.reader(f))[1:]
+        return np.array([tuple(row) for row in rows], dtype=TRIAL_DTYPE)
+    with np.load(path) as columns:
+        trials = np.empty(len(columns['trial']), dtype=TRIAL_DTYPE)
+        for name in TRIAL_FIELDS:
+            trials[name] = columns[name]
+    return trials
+
+
+def LoadCohort(paths):
+    """Reads the trials of several sessions (.npz files) into one array.
+    """
+    return np.concatenate([LoadTrials(path) for path in paths])
+
+
+class TrialData(object):
+
+    def __init__(self, subject, subset, task, journal=None):
+        """journal: optional SessionJournal each record is also passed to
+        """
+        self.subject = int(subject)
+        self.subset = int(subset)
+        self.task = task
+        self.journal = journal
+        self.records = []
+
+    def Add(self, phase, block, trial, image, image2='', trialType='',
+            pos1='', pos2='', correctKey='', response='', rt=0.0):
+        """Adds the record of one trial (see the schema above). Positions and
+        indices are stored as text, e.g. an MDTS position tuple.
+        """
+        record = (self.subject, self.subset, self.task, phase, int(block),
+                  int(trial), str(image), str(image2), str(trialType),
+                  str(pos1), str(pos2), str(correctKey), str(response),
+                  float(rt))
+        self.records.append(record)
+        if (self.journal is not None):
+            self.journal.Record(record)
+
+    def Array(self):
+        """Returns all records as a NumPy structured array (TRIAL_DTYPE).
+        """
+        return np.array(self.records, dtype=TRIAL_DTYPE)
+
+    def WriteCSV(self, path):
+        """Writes the records to a CSV file, with a header row of field names.
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRIAL_FIELDS)
+            for record in self.records:
+                writer.writerow(record[:-1] + ("{:.6f}".format(record[-1]),))
+
+    def WriteNpz(self, path):
+        """Writes the records to a .npz archive with one array per field.
+        """
+        trials = self.Array()
+        np.savez(path, **dict((name, trials[name]) for name in TRIAL_FIELDS))
+
+    def Write(self, path, fmt='csv'):
+        """Writes the records to a file in one of FORMATS.
+        """
+        if (fmt == 'csv'):
+            self.WriteCSV(path)
+        elif (fmt == 'npz'):
+            self.WriteNpz(path)
+        else:
+            raise ValueError("Unknown trial data format: %s" %(fmt))
@@ -0,0 +1,105 @@
+"""Class TrialTiming records how each trial was actually presented, measured from
+the timestamps returned by window.flip(). FrameScheduler adds one record for
+every stimulus it presents (a stimulus and the blank ISI that follows it):
+
+    trial           running number of the presented stimulus
+    label           what was presented (image name(s) or prompt), if given
+    intendedOnset   when the stimulus was due: the end of the previous ISI,
+                    if the stimulus followed straight on from it, otherwise
+                    its actual onset (first trial of a phase, after a pause)
+    onset           time of the flip that first showed the stimulus
+    intendedOffset  onset + the stimulus duration in frames (NaN if self paced)
+    offset          time of the flip that removed the stimulus
+    intendedISI     ISI, in seconds, rounded to whole frames
+    actualISI       time from the offset flip until the frame after the last
+                    blank flip, i.e. the earliest the next stimulus could show
+    droppedFrames   number of refreshes missed between the onset flip and
+                    the end of the ISI
+    prepTime        time spent preparing the stimulus (decode, setImage, draw)
+                    before its onset flip was requested
+
+All times are in seconds, on the clock window.flip() timestamps are taken from.
+The records are kept in memory (Array() returns them as a NumPy structured
+array), and can be written to a tab separated sidecar file with a summary.
+"""
+
+import numpy as np
+
+TIMING_DTYPE = [('trial', 'i4'), ('label', 'U64'),
+                ('intendedOnset', 'f8'), ('onset', 'f8'),
+                ('intendedOffset', 'f8'), ('offset', 'f8'),
+                ('intendedISI', 'f8'), ('actualISI', 'f8'),
+                ('droppedFrames', 'i4'), ('prepTime', 'f8')]
+
+
+class TrialTiming(object):
+
+    def __init__(self, frameDuration):
+
+        self.frameDuration = frameDuration
+        self.records = []
+
+    def DroppedFrames(self, flipTimes):
+        """Counts the refreshes missed between successive flip timestamps.
+        """
+        dropped = 0
+        for i in range(1, len(flipTimes)):
+            interval = flipTimes[i] - flipTimes[i-1]
+            if (interval > 1.5 * self.frameDuration):
+                dropped += int(round(interval / self.frameDuration)) - 1
+        return dropped
+
+    def Add(self, label, intendedOnset, onset, intendedOffset, offset,
+            intendedISI, actualISI, flipTimes, prepTime):
+        """Adds the record of one presented stimulus.
+
+        flipTimes: timestamps of every flip from onset to the end of the ISI
+        """
+        self.records.append((len(self.records)+1, label[:64], intendedOnset,
+                             onset, intendedOffset, offset, intendedISI,
+                             actualISI, self.DroppedFrames(flipTimes),
+                             prepTime))
+
+    def Array(self):
+        """Returns all records as a NumPy structured array (TIMING_DTYPE).
+        """
+        return np.array(self.records, dtype=TIMING_DTYPE)
+
+    def Summary(self):
+        """Returns a dict summarizing timing across all records: the number of
+        trials, onset/duration/ISI jitter (max and mean of the absolute error,
+        in seconds), total dropped frames, and prep time (max and mean).
+        """
+        arr = self.Array()
+        summary = {"trials": len(arr)}
+        if (len(arr) == 0):
+            return summary
+        onsetErr = np.abs(arr['onset'] - arr['intendedOnset'])
+        durErr = np.abs(arr['offset'] - arr['intendedOffset'])
+        durErr = durErr[~np.isnan(durErr)]
+        isiErr = np.abs(arr['actualISI'] - arr['intendedISI'])
+        isiErr = isiErr[~np.isnan(isiErr)]
+        for name, err in [("onsetJitter", onsetErr), ("durationJitter", durErr),
+                          ("isiJitter", isiErr), ("prepTime", arr['prepTime'])]:
+            summary[name + "Max"] = float(err.max()) if len(err) else 0.0
+            summary[name + "Mean"] = float(err.mean()) if len(err) else 0.0
+        summary["droppedFrames"] = int(arr['droppedFrames'].sum())
+        return summary
+
+    def WriteSidecar(self, path):
+        """Writes every record, followed by the summary, to a tab separated
+        text file.
+        """
+        names = [field[0] for field in TIMING_DTYPE]
+        with open(path, 'w') as f:
+            f.write("Frame duration: {:.6f}\n".format(self.frameDuration))
+            f.write("\t".join(names) + "\n")
+            for record in self.records:
+                f.write("\t".join(
+                    "{:.6f}".format(value) if isinstance(value, float)
+                    else str(value) for value in record) + "\n")
+            f.write("\nSummary:\n")
+            for key, value in sorted(self.Summary().items()):
+                if isinstance(value, float):
+                    value = "{:.6f}".format(value)
+                f.write("{:<22}{}\n".format(key, value))
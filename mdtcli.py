@@ -0,0 +1,317 @@
+#!/usr/bin/python
+
+"""Runs the MDT Suite from the command line, without the GUI: for batch runs,
+scripts and benchmarks. Session parameters come from a config file, from
+flags, or both (flags override the config), and are checked with the same
+rules as the GUI's (see include/sessionparams.py) before anything is run.
+wx is never imported, and psychopy only once the parameters are valid.
+
+A config file is JSON (.json), TOML (.toml, read with tomllib, or tomli on
+older Pythons) or YAML (.yaml/.yml, if PyYAML is installed). Its keys are
+those of DEFAULTS, plus "subjects", a queue of subjects run one after another.
+A queue entry is a subject ID, or a dict of parameters for that subject:
+
+    {"task": "Object", "set": 2, "trials": 40, "logDir": "logs",
+     "subjects": [101, 102, {"subject": 103, "set": 3}]}
+
+"task" is one of Object, Spatial and Temporal, or "All Tasks" (or a list of
+tasks) to run a session of several tasks back to back (see
+MDTSuite.RunSession). Object and Spatial run "trials" trials per condition,
+Temporal runs "blocks" blocks.
+
+Usage, from the MDT-Suite directory:
+    python mdtcli.py --config session.json
+    python mdtcli.py --task Spatial --subject 101 --subject 102 --set 2
+    python mdtcli.py --config session.toml --check
+
+Exits with status 1 if any parameters are invalid, or any image set fails its
+preflight check.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+#Store present dir info before importing files that import psychopy
+currentDir = os.path.dirname(os.path.abspath(__file__))
+includePath = os.path.join(currentDir, "include")
+sys.path.append(includePath)
+from sessionparams import (VERSION, TASK_TYPES, CheckParams,
+                           PreflightProblems)
+from trialdata import FORMATS
+
+#Parameters of a run, and their defaults (those of the GUI)
+DEFAULTS = {"task": "Object",
+            "subject": "999",
+            "set": 1,
+            "trialDur": 2.0,
+            "ISI": 0.5,
+            "trials": 40,
+            "blocks": 10,
+            "selfPaced": False,
+            "practiceTrials": True,
+            "buttonDiagnostic": True,
+            "inputButtons": "f,j",
+            "pauseButton": "p",
+            "inputBackend": "event",
+            "screenType": "Fullscreen",
+            "expVariant": "Normal",
+            "logDir": "logs",
+            "resume": False,
+            "preflight": True,
+            "counterbalance": True,
+            "timingFile": True,
+            "trialFormats": ["csv"]}
+
+SCREEN_TYPES = ("Fullscreen", "Windowed", "Scanner")
+EXP_VARIANTS = ("Normal", "ECog")
+INPUT_BACKENDS = ("event", "keyboard")
+ALL_TASKS = "All Tasks"
+
+
+def LoadConfig(path):
+    """Reads a config file (JSON, TOML or YAML, by its extension).
+
+    return: dict of parameters
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if (ext == ".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("reading %s needs tomllib (Python 3.11+) "
+                                 "or tomli" %(path))
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    elif (ext in (".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("reading %s needs PyYAML" %(path))
+        with open(path, 'r') as f:
+            config = yaml.safe_load(f)
+    else:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    if (not isinstance(config, dict)):
+        raise ValueError("%s does not hold a table of parameters" %(path))
+    unknown = sorted(set(config) - set(DEFAULTS) - set(["subjects"]))
+    if (unknown):
+        raise ValueError("unknown parameters in %s: %s" %(path,
+                                                          ", ".join(unknown)))
+    return config
+
+
+def ParseArgs(argv):
+    """Parses the command line.
+
+    return: (config path or None, dict of the parameters given as flags,
+             check only)
+    """
+    parser = argparse.ArgumentParser(
+        description="Runs the MDT Suite without the GUI.",
+        argument_default=argparse.SUPPRESS)
+    parser.add_argument("--config", default=None,
+                        help="JSON, TOML or YAML file of parameters")
+    parser.add_argument("--check", action="store_true", default=False,
+                        help="check the parameters and images, and exit")
+    parser.add_argument("--task", help="Object, Spatial, Temporal or "
+                        "'All Tasks'")
+    parser.add_argument("--subject", dest="subjects", action="append",
+                        help="subject ID; repeat to queue several subjects")
+    parser.add_argument("--set", help="image set (1-10)")
+    parser.add_argument("--trial-dur", dest="trialDur")
+    parser.add_argument("--isi", dest="ISI")
+    parser.add_argument("--trials", type=int,
+                        help="trials per condition (Object, Spatial)")
+    parser.add_argument("--blocks", type=int, help="blocks (Temporal)")
+    parser.add_argument("--self-paced", dest="selfPaced",
+                        action="store_true")
+    parser.add_argument("--no-practice", dest="practiceTrials",
+                        action="store_false")
+    parser.add_argument("--no-diagnostic", dest="buttonDiagnostic",
+                        action="store_false")
+    parser.add_argument("--buttons", dest="inputButtons",
+                        help="the two response buttons, e.g. f,j")
+    parser.add_argument("--pause-button", dest="pauseButton")
+    parser.add_argument("--keyboard", dest="inputBackend",
+                        action="store_const", const="keyboard",
+                        help="use the low latency keyboard backend")
+    parser.add_argument("--screen", dest="screenType", choices=SCREEN_TYPES)
+    parser.add_argument("--variant", dest="expVariant", choices=EXP_VARIANTS)
+    parser.add_argument("--log-dir", dest="logDir")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--no-preflight", dest="preflight",
+                        action="store_false")
+    parser.add_argument("--fixed-order", dest="counterbalance",
+                        action="store_false",
+                        help="run a session's tasks in the order given")
+    args = vars(parser.parse_args(argv))
+    return (args.pop("config"), args, args.pop("check"))
+
+
+def SubjectQueue(params):
+    """Expands the subject queue of a run into the parameters of each subject.
+
+    return: list of parameter dicts, one per subject, in queue order
+    """
+    queue = params.get("subjects")
+    if (not queue):
+        queue = [params["subject"]]
+    runs = []
+    for entry in queue:
+        run = dict((key, value) for key, value in params.items()
+                   if key != "subjects")
+        if (isinstance(entry, dict)):
+            run.update(entry)
+        else:
+            run["subject"] = entry
+        runs.append(run)
+    return runs
+
+
+def Tasks(run):
+    """Returns the list of tasks a run is of.
+    """
+    task = run["task"]
+    if (task == ALL_TASKS):
+        return list(TASK_TYPES)
+    if (isinstance(task, (list, tuple))):
+        return list(task)
+    return [task]
+
+
+def LenVar(run, expType):
+    """Returns the trials per condition, or blocks, a task of a run is run
+    for.
+    """
+    return int(run["blocks"] if expType == "Temporal" else run["trials"])
+
+
+def CheckRun(run):
+    """Checks the parameters of one subject's run, with the GUI's rules and
+    those of the choices the GUI offers.
+
+    return: (errorMsgs, inputButtons), as CheckParams() returns them
+    """
+    logDir = os.path.abspath(str(run["logDir"]))
+    (errorMsgs, inputButtons) = CheckParams(
+        str(run["subject"]), str(run["set"]), str(run["trialDur"]),
+        str(run["ISI"]), bool(run["selfPaced"]), str(run["inputButtons"]),
+        str(run["pauseButton"]), logDir)
+    tasks = Tasks(run)
+    if (not tasks) or any(task not in TASK_TYPES for task in tasks):
+        errorMsgs += "- Task must be one of %s or %s\n" %(
+            ", ".join(TASK_TYPES), ALL_TASKS)
+    for key in ("trials", "blocks"):
+        try:
+            if (int(run[key]) <= 0):
+                errorMsgs += "- %s must be greater than 0\n" %(key)
+        except (TypeError, ValueError):
+            errorMsgs += "- %s must be an integer\n" %(key)
+    for key, choices in (("screenType", SCREEN_TYPES),
+                         ("expVariant", EXP_VARIANTS),
+                         ("inputBackend", INPUT_BACKENDS)):
+        if (run[key] not in choices):
+            errorMsgs += "- %s must be one of %s\n" %(key, ", ".join(choices))
+    if (not isinstance(run["trialFormats"], (str, list, tuple))) or any(
+        fmt not in FORMATS for fmt in TrialFormats(run)):
+        errorMsgs += "- trialFormats must be a list of %s\n" %(
+            ", ".join(FORMATS))
+    return (errorMsgs, inputButtons)
+
+
+def TrialFormats(run):
+    """Returns the list of trial data formats of a run, given as a list or a
+    comma separated string.
+    """
+    formats = run["trialFormats"]
+    if (isinstance(formats, str)):
+        formats = formats.split(",")
+    return [str(fmt).strip().lower() for fmt in formats if str(fmt).strip()]
+
+
+def RunSubject(run, inputButtons):
+    """Runs one subject's task, or session of tasks.
+    """
+    #Imported only now, as it imports psychopy and the tasks
+    import mdtsuite
+    tasks = Tasks(run)
+    lenVars = dict((expType, LenVar(run, expType)) for expType in tasks)
+    expMDT = mdtsuite.MDTSuite(tasks[0], str(run["subject"]), int(run["set"]),
+                float(run["trialDur"]), float(run["ISI"]),
+                lenVars[tasks[0]], bool(run["selfPaced"]), currentDir,
+                os.path.abspath(str(run["logDir"])), run["expVariant"],
+                run["screenType"], bool(run["practiceTrials"]),
+                bool(run["buttonDiagnostic"]), inputButtons,
+                str(run["pauseButton"]), run["inputBackend"],
+                timingFile=bool(run["timingFile"]),
+                trialFormats=tuple(TrialFormats(run)),
+                resume=bool(run["resume"]))
+    if (run["task"] == ALL_TASKS) or (len(tasks) > 1):
+        expMDT.RunSession(VERSION, tasks, lenVars,
+                          bool(run["counterbalance"]))
+    else:
+        expMDT.RunSuite(VERSION)
+
+
+def Main(argv):
+    """Checks every run of the queue, then runs them in turn.
+
+    return: exit status
+    """
+    (configPath, flags, checkOnly) = ParseArgs(argv)
+    params = dict(DEFAULTS)
+    try:
+        if (configPath is not None):
+            params.update(LoadConfig(configPath))
+    except (IOError, OSError, ValueError) as e:
+        print("Error: %s" %(e))
+        return 1
+    params.update(flags)
+
+    #Check the whole queue before running anyone
+    runs = SubjectQueue(params)
+    checked = []
+    failed = False
+    for run in runs:
+        (errorMsgs, inputButtons) = CheckRun(run)
+        if errorMsgs:
+            print("Subject %s:\n%s" %(run["subject"], errorMsgs.rstrip()))
+            failed = True
+        checked.append((run, inputButtons))
+    if failed:
+        return 1
+
+    if any(run["preflight"] for run in runs):
+        sets = sorted(set((expType, int(run["set"]), LenVar(run, expType),
+                           bool(run["practiceTrials"]))
+                          for run in runs if run["preflight"]
+                          for expType in Tasks(run)))
+        for (expType, subset, expLenVar, practiceTrials) in sets:
+            (imgDir, problems) = PreflightProblems(currentDir, expType, subset,
+                                                   expLenVar, practiceTrials)
+            if problems:
+                print("Problems found with the images in %s:" %(imgDir))
+                for problem in problems:
+                    print("    - " + problem)
+                failed = True
+        if failed:
+            return 1
+
+    if checkOnly:
+        print("%d runs checked, OK" %(len(runs)))
+        return 0
+    for (run, inputButtons) in checked:
+        print("Running subject %s: %s" %(run["subject"],
+                                         ", ".join(Tasks(run))))
+        RunSubject(run, inputButtons)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main(sys.argv[1:]))
@@ -3,8 +3,6 @@
 #TODO   Implement ECog functionality for all 3 tasks
 #       Implement Scanner functionality for all 3 tasks    
 
-VERSION=2.0
-
 """Creates the GUI for the MDT Suite. MDT, or Mnemonic Discrimination 
 Task, is a type of experimental task that tests various aspects of a
 subject's memory. The MDT Suite is a collection of these tasks
@@ -22,6 +20,7 @@ import wx
 import os 
 import sys
 import re
+import importlib
 from functools import partial
 
 #Store present dir info before importing files that import psychopy
@@ -29,8 +28,21 @@ from functools import partial
 currentDir = os.getcwd()
 includePath = os.path.join(currentDir, "include")
 sys.path.append(includePath)
+from sessionparams import VERSION, CheckParams, PreflightProblems
+
+#mdtsuite imports psychopy and the tasks, which takes seconds, so it is
+#imported when a task is first run (see LoadSuite), not here
+
 
-import mdtsuite
+def LoadSuite():
+    """Imports mdtsuite, and with it psychopy and the tasks. This is left
+    until a task is run, so the form can be filled in meanwhile, and is done
+    on the main thread, as pyglet (and the OpenGL context psychopy makes) must
+    be set up on the thread that draws.
+
+    return: the mdtsuite module
+    """
+    return importlib.import_module("mdtsuite")
 
 
 class InstrWindow(wx.Frame):
@@ -136,7 +148,7 @@ class MainWindow(wx.Frame):
         self.SetMenuBar(menuBar)
 
         #Create elements to put within the frame
-        self.expRadioList = ['Object', 'Spatial', 'Temporal']
+        self.expRadioList = ['Object', 'Spatial', 'Temporal', 'All Tasks']
         self.expRB = wx.RadioBox(self.panel, label='Choose Experiment Type',
                                  choices=self.expRadioList, majorDimension=1)
         self.screenSelList = ['Fullscreen', 'Windowed', 'Scanner']
@@ -159,6 +171,10 @@ class MainWindow(wx.Frame):
         self.chkPracticeTrials.SetValue(True)
         self.chkButtonDiagnostic = wx.CheckBox(self.panel, wx.ID_ANY, 'Button Diagnostic')
         self.chkButtonDiagnostic.SetValue(True)
+        self.chkKeyboard = wx.CheckBox(self.panel, wx.ID_ANY, 'Low Latency Keyboard')
+        self.chkResume = wx.CheckBox(self.panel, wx.ID_ANY, 'Resume Session')
+        self.chkPreflight = wx.CheckBox(self.panel, wx.ID_ANY, 'Check Images')
+        self.chkPreflight.SetValue(True)
         self.inputISIText = wx.StaticText(self.panel, wx.ID_ANY, 'ISI')
         self.inputISIEntry = wx.TextCtrl(self.panel, wx.ID_ANY, '0.5')
         self.inputButtonsText = wx.StaticText(self.panel, wx.ID_ANY, 'Input Buttons (separate with comma)')
@@ -216,6 +232,9 @@ class MainWindow(wx.Frame):
         checkSizer         = wx.BoxSizer(wx.HORIZONTAL)
         practiceTrialSizer = wx.BoxSizer(wx.HORIZONTAL)
         buttonDiagnosticSizer = wx.BoxSizer(wx.HORIZONTAL)
+        keyboardSizer      = wx.BoxSizer(wx.HORIZONTAL)
+        resumeSizer        = wx.BoxSizer(wx.HORIZONTAL)
+        preflightSizer     = wx.BoxSizer(wx.HORIZONTAL)
         logDirSizer        = wx.BoxSizer(wx.HORIZONTAL)
         runQuitSizer       = wx.BoxSizer(wx.HORIZONTAL)
 
@@ -266,6 +285,12 @@ class MainWindow(wx.Frame):
         practiceTrialSizer.AddStretchSpacer(1)
         buttonDiagnosticSizer.Add(self.chkButtonDiagnostic, 0, lft, 5)
         buttonDiagnosticSizer.AddStretchSpacer(1) 
+        keyboardSizer.Add(self.chkKeyboard, 0, lft, 5)
+        keyboardSizer.AddStretchSpacer(1)
+        resumeSizer.Add(self.chkResume, 0, lft, 5)
+        resumeSizer.AddStretchSpacer(1)
+        preflightSizer.Add(self.chkPreflight, 0, lft, 5)
+        preflightSizer.AddStretchSpacer(1)
         
         
         logDirSizer.Add(self.btnLogOutput, 0, wx.ALL, 5)
@@ -286,6 +311,9 @@ class MainWindow(wx.Frame):
         mainSizer.Add(checkSizer, 0, lft | top | bot | exp, 5)
         mainSizer.Add(practiceTrialSizer, 0, lft | top | bot | exp, 5)
         mainSizer.Add(buttonDiagnosticSizer, 0, lft | top | bot | exp, 5)
+        mainSizer.Add(keyboardSizer, 0, lft | top | bot | exp, 5)
+        mainSizer.Add(resumeSizer, 0, lft | top | bot | exp, 5)
+        mainSizer.Add(preflightSizer, 0, lft | top | bot | exp, 5)
         mainSizer.Add(logDirSizer, 0, lft | bot | exp, 5)
         mainSizer.Add(runQuitSizer, 0, lft | bot | exp, 5)
 
@@ -313,6 +341,12 @@ class MainWindow(wx.Frame):
             txt="Temporal only: # of (Study/Test) blocks to run in task"))
         self.chkSelfPaced.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter,
             txt="If checked, trial runs until user gives input"))
+        self.chkKeyboard.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter,
+            txt="Time responses from OS key events (psychtoolbox keyboard)"))
+        self.chkResume.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter,
+            txt="Resume this subject's interrupted session, if there is one"))
+        self.chkPreflight.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter,
+            txt="Check the task's images decode, and that there are enough"))
         self.btnLogOutput.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter,
             txt="Select directory for logfile output"))
         self.runButton.Bind(wx.EVT_ENTER_WINDOW, partial(self.OnMouseEnter, 
@@ -328,6 +362,9 @@ class MainWindow(wx.Frame):
         self.blockRB.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
         self.chkSelfPaced.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
         self.chkSelfPaced.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
+        self.chkKeyboard.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
+        self.chkResume.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
+        self.chkPreflight.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
         self.btnLogOutput.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
         self.runButton.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
         self.quitButton.Bind(wx.EVT_LEAVE_WINDOW, self.OnMouseLeave)
@@ -336,6 +373,24 @@ class MainWindow(wx.Frame):
         mainSizer.Fit(self)
         self.Show(True)
 
+        #Used by tests/test_startup.py to time the launcher's startup
+        if (os.environ.get("MDT_STARTUP_PROBE")):
+            wx.CallAfter(self.OnStartupProbe)
+
+    def OnStartupProbe(self):
+        """Reports that the window has been drawn, then that the suite is
+        usable (mdtsuite imported, as running the first task does), and
+        closes the window.
+        """
+        sys.stdout.write("MDT first paint\n")
+        sys.stdout.flush()
+        try:
+            LoadSuite()
+            sys.stdout.write("MDT suite ready\n")
+            sys.stdout.flush()
+        finally:
+            self.Close()
+
     def OnMouseEnter(self,e,txt):
         """Sets the status bar text when mouse is hovered over a
         particular window element. 
@@ -393,10 +448,16 @@ class MainWindow(wx.Frame):
         """Enables or disables parameter entry sections depending on which
         type of task was chosen. If temporal was chosen, it will enable the
         "block" parameter entry, and if any other task was chosen, it will
-        enable the "number of trials" parameter entry.
+        enable the "number of trials" parameter entry. A session of all tasks
+        enables both.
         """
         expType = self.expRB.GetString(self.expRB.GetSelection())
-        if (expType == "Temporal"):
+        if (expType == "All Tasks"):
+            self.trialText.Enable()
+            self.trialRB.Enable()
+            self.blockText.Enable()
+            self.blockRB.Enable()
+        elif (expType == "Temporal"):
             self.trialText.Disable()
             self.trialRB.Disable()
             self.blockText.Enable()
@@ -446,61 +507,65 @@ class MainWindow(wx.Frame):
             expLenVar = self.blockRB.GetStringSelection()
         else:
             expLenVar = self.trialRB.GetStringSelection()
+        #A session runs every task, each with its own length
+        lenVars = {"Object": int(self.trialRB.GetStringSelection()),
+                   "Spatial": int(self.trialRB.GetStringSelection()),
+                   "Temporal": int(self.blockRB.GetStringSelection())}
+        expTypes = list(lenVars) if expType == "All Tasks" else [expType]
         selfPaced = self.chkSelfPaced.IsChecked()
         practiceTrials = self.chkPracticeTrials.IsChecked()
         buttonDiagnostic = self.chkButtonDiagnostic.IsChecked()
+        inputBackend = 'keyboard' if self.chkKeyboard.IsChecked() else 'event'
+        resume = self.chkResume.IsChecked()
         logDir = self.dispLogOutput.GetLineText(0) 
-        #List of error messages
-        errorMsgs = ""
-        idErrorText = "- Subject ID must contain numbers only\n"
-        setErrorText = "- Set Choice must be a number 1-10\n"
-        durErrorText1 = "- Trial duration must be an integer or decimal number\n"
-        durErrorText2 = "- Trial duration must be greater than 0\n"
-        ISIErrorText1 = "- ISI must be an integer or decimal number\n"
-        ISIErrorText2 = "- ISI must be greater than 0\n"
-        logErrorText = "- Logfile output directory does not exist\n"
-        buttonErrorText = " - Buttons must be separated by comma, with only 2 buttons\n"
-        pauseButtonErrorText = " - Pause button must be 1 key"
-    
         #Add errors to error message if they occur
-        if "," not in inputButtons or len(inputButtons.split(",")) != 2:
-            errorMsgs += buttonErrorText
-        else:
-            inputButtons = [str(inputButton.strip().lower()) for inputButton in inputButtons.split(",")]
-        if len(pauseButton) != 1:
-            errorMsgs += pauseButtonErrorText
-        if (subjectID.isdigit() == False):
-            errorMsgs += idErrorText
-        if not subset.isdigit():
-            errorMsgs += setErrorText
-        elif int(subset) < 1 or int(subset) > 10:
-            errorMsgs += setErrorText
-        if (not selfPaced):
-            try:
-                if (float(trialDur) <= 0):
-                    errorMsgs += durErrorText2
-            except ValueError:
-                errorMsgs += durErrorText1        
-        try:
-            if (float(ISI) <= 0):
-                errorMsgs += ISIErrorText2
-        except ValueError:
-            errorMsgs += ISIErrorText1    
-        if (os.path.isdir(logDir) == False):
-            errorMsgs += logErrorText
+        (errorMsgs, inputButtons) = CheckParams(subjectID, subset, trialDur,
+                                                ISI, selfPaced, inputButtons,
+                                                pauseButton, logDir)
         if errorMsgs:
             errorDlg = wx.MessageDialog(self, errorMsgs, "Error", wx.OK)
             errorDlg.ShowModal()
             errorDlg.Destroy()
-        #Run the experiment if no errors in parameter entry    
-        else:
-            expMDT = mdtsuite.MDTSuite(expType, subjectID, int(subset),
+        #Run the experiment if no errors in parameter entry, and the task's
+        #images pass the preflight check
+        elif (not self.chkPreflight.IsChecked() or
+              all(self.RunPreflight(eType, int(subset), lenVars[eType],
+                                    practiceTrials) for eType in expTypes)):
+            #Importing the tasks takes a few seconds the first time
+            self.StatusBar.SetStatusText("Loading the tasks...")
+            with wx.BusyCursor():
+                mdtsuite = LoadSuite()
+            self.StatusBar.SetStatusText("")
+            expMDT = mdtsuite.MDTSuite(expTypes[0], subjectID, int(subset),
                         float(trialDur), float(ISI), int(expLenVar), 
                         selfPaced, currentDir, logDir, expVariant, 
                         screenType, practiceTrials, buttonDiagnostic, 
-                        inputButtons, pauseButton)
-            expMDT.RunSuite(VERSION)
+                        inputButtons, pauseButton, inputBackend,
+                        resume=resume)
+            if (expType == "All Tasks"):
+                expMDT.RunSession(VERSION, expTypes, lenVars)
+            else:
+                expMDT.RunSuite(VERSION)
+
 
+    def RunPreflight(self, expType, subset, expLenVar, practiceTrials):
+        """Checks the images of the task's set (see preflight.py), and reports
+        any problems found in a message dialog box.
+
+        return: True if the set is ready to run
+        """
+        (imgDir, problems) = PreflightProblems(currentDir, expType, subset,
+                                               expLenVar, practiceTrials)
+        if problems:
+            errorMsgs = "Problems found with the images in {}:\n\n".format(
+                imgDir)
+            errorMsgs += "".join("- {}\n".format(p) for p in problems[:15])
+            if (len(problems) > 15):
+                errorMsgs += "- ...and {} more\n".format(len(problems) - 15)
+            errorDlg = wx.MessageDialog(self, errorMsgs, "Error", wx.OK)
+            errorDlg.ShowModal()
+            errorDlg.Destroy()
+        return not problems
 
     def OnExit(self,e):
         """Closes the application
@@ -0,0 +1,111 @@
+"""A resumed session must restore its log text, records and scores exactly as
+they were at its last completed step, however often it was interrupted.
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from journal import SessionJournal
+from scoring import Tally, Score, ScoreList
+from trialdata import TrialData
+
+INFO = {"subject": "101", "set": 1, "task": "MDTT"}
+#Test pairs of a block: (trialType, correct key, response)
+PAIRS = [("1", "f", "f"), ("2", "j", "f"), ("3", "j", "j"), ("4", "f", "f")]
+
+
+def Interrupt(journal):
+    """Ends a run of a session as a crash would, without finishing it.
+    """
+    journal.Close(finished=False)
+
+
+def RunBlock(journal, trialData, scoreList, block, escapeAt=None):
+    """Runs an MDTT block as MDTT.RunExp does: a block quit with escape has
+    its tallies and records dropped, and isn't marked done.
+
+    return: the scoreList after the block
+    """
+    blockScores = [list(score) for score in scoreList]
+    blockRecords = len(trialData.records)
+    journal.Log("Begin Study %d\n" %(block))
+    trialData.Add("study", block, 1, "001.jpg", response="f", rt=0.5)
+    for (trial, (trialType, correct, response)) in enumerate(PAIRS):
+        if (trial == escapeAt):
+            journal.Log("Test block terminated early\n")
+            scoreList[:] = blockScores
+            del trialData.records[blockRecords:]
+            journal.Discard()
+            return scoreList
+        journal.Log("%d %s\n" %(trial+1, trialType))
+        trialData.Add("test", block, trial+1, "001.jpg", image2="002.jpg",
+                      trialType=trialType, pos1=1, pos2=2,
+                      correctKey=correct, response=response, rt=0.5)
+        Tally(scoreList, "MDTT", trialType, response, correct)
+    journal.Mark("block:%d" %(block), {"scores": scoreList})
+    return scoreList
+
+
+def Resume(path):
+    journal = SessionJournal.Resume(path, INFO)
+    trialData = TrialData(101, 1, "MDTT", journal)
+    trialData.records = list(journal.records)
+    scoreList = journal.State("scores", [[0, 0, 0] for i in range(4)])
+    return (journal, trialData, scoreList)
+
+
+def test_replay_drops_unmarked_steps_of_each_run(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = SessionJournal(path, INFO)
+    journal.Log("a")
+    journal.Mark("step:1")
+    journal.Log("partial 1")
+    journal.Record(("partial", 1))
+    Interrupt(journal)
+
+    journal = SessionJournal.Resume(path, INFO)
+    assert journal.logText == "a"
+    journal.Log("partial 2")
+    journal.Record(("partial", 2))
+    Interrupt(journal)
+
+    journal = SessionJournal.Resume(path, INFO)
+    assert journal.logText == "a"
+    assert journal.records == []
+    journal.Log("b")
+    journal.Record(("step", 2))
+    journal.Mark("step:2")
+    Interrupt(journal)
+
+    journal = SessionJournal.Resume(path, INFO)
+    assert journal.logText == "ab"
+    assert journal.records == [("step", 2)]
+    assert journal.Done("step:1") and journal.Done("step:2")
+    Interrupt(journal)
+
+
+def test_escaped_block_is_counted_once(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = SessionJournal(path, INFO)
+    trialData = TrialData(101, 1, "MDTT", journal)
+    scoreList = [[0, 0, 0] for i in range(4)]
+    RunBlock(journal, trialData, scoreList, 1)
+    RunBlock(journal, trialData, scoreList, 2, escapeAt=2)
+    RunBlock(journal, trialData, scoreList, 3)
+    Interrupt(journal)
+
+    (journal, trialData, scoreList) = Resume(path)
+    assert not journal.Done("block:2")
+    RunBlock(journal, trialData, scoreList, 2)
+    Interrupt(journal)
+
+    (journal, trialData, scoreList) = Resume(path)
+    Interrupt(journal)
+    #Each pair type once per block, 3 blocks; type 2 is answered wrong
+    assert scoreList == [[3, 0, 3], [0, 3, 3], [3, 0, 3], [3, 0, 3]]
+    assert len(trialData.records) == 3 * (1 + len(PAIRS))
+    assert sorted(set(record[4] for record in trialData.records)) == [1, 2, 3]
+    assert ScoreList(Score(trialData.Array())) == scoreList
@@ -0,0 +1,71 @@
+"""A LogWriter must write exactly what a plain file would, and raise an error
+its background thread hit on the caller's thread.
+"""
+
+import atexit
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from logwriter import LogWriter
+
+TEXTS = (["Begin Study\n\n", "Trial  Image"] +
+         ["{:<7}{:<17s}{:<10s}{:<6s}{:<4.3f}\n".format(i, "%03da_2.jpg" %(i),
+                                                      "sR", "f", 0.5 + i)
+          for i in range(0, 300)] +
+         ["\nBegin Test\n", "é unicode ✓\n", ""])
+
+
+def test_output_matches_plain_file(tmp_path):
+    plainPath = str(tmp_path / "plain.txt")
+    with open(plainPath, 'w') as f:
+        for (i, text) in enumerate(TEXTS):
+            f.write(text)
+            if (i % 50 == 0):
+                f.flush()
+    logPath = str(tmp_path / "log.txt")
+    log = LogWriter(logPath, batchSize=8)
+    for (i, text) in enumerate(TEXTS):
+        log.write(text)
+        if (i % 50 == 0):
+            log.flush()
+        elif (i % 7 == 0):
+            log.Sync()
+    log.close()
+    with open(plainPath, 'rb') as f:
+        plain = f.read()
+    with open(logPath, 'rb') as f:
+        assert f.read() == plain
+
+
+def test_write_error_raised_on_flush_and_close(tmp_path):
+    log = LogWriter(str(tmp_path / "log.txt"))
+    log.write("text\n")
+    log.write(5)
+    with pytest.raises(TypeError):
+        log.flush()
+    with pytest.raises(TypeError):
+        log.write("more\n")
+    with pytest.raises(TypeError):
+        log.close()
+    assert not log.thread.is_alive()
+
+
+def test_disk_error_raised_on_close(tmp_path):
+    log = LogWriter(str(tmp_path / "log.txt"))
+    log.file.close()
+    log.write("text\n")
+    with pytest.raises(ValueError):
+        log.close()
+
+
+def test_close_releases_exit_handler(tmp_path, monkeypatch):
+    unregistered = []
+    monkeypatch.setattr(atexit, "unregister", unregistered.append)
+    log = LogWriter(str(tmp_path / "log.txt"))
+    log.close()
+    assert unregistered == [log.close]
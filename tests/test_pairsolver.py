@@ -0,0 +1,60 @@
+"""The MDTT pair solver must cover every index of a block once, with the
+asked for number of pairs in each lag bin, reproducibly for a seed, and fail
+rather than loop when no cover can be found.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from pairsolver import DEFAULT_LAG_BINS, SpacedPairs
+
+
+def CheckPairs(pairs, numStim, trialsPer, lagBins):
+    indexes = [index for (a, b, trialType) in pairs for index in (a, b)]
+    assert sorted(indexes) == list(range(0, numStim))
+    for trialType in range(1, len(lagBins) + 2):
+        assert sum(1 for pair in pairs if pair[2] == trialType) == trialsPer
+    for (a, b, trialType) in pairs:
+        if (trialType <= len(lagBins)):
+            (low, high) = lagBins[trialType - 1]
+            assert low <= b - a <= high
+        else:
+            assert a < trialsPer and b >= numStim - trialsPer
+
+
+@pytest.mark.parametrize("numStim", [32, 64, 128])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_pairs_cover_block(numStim, seed):
+    trialsPer = numStim // 8
+    pairs = SpacedPairs(numStim, trialsPer, rng=random.Random(seed))
+    CheckPairs(pairs, numStim, trialsPer, DEFAULT_LAG_BINS)
+
+
+def test_other_lag_bins():
+    lagBins = ((1, 2), (4, 6))
+    pairs = SpacedPairs(24, 4, lagBins, rng=random.Random(5))
+    CheckPairs(pairs, 24, 4, lagBins)
+
+
+def test_same_seed_same_pairs():
+    assert SpacedPairs(32, 4, rng=random.Random(7)) == \
+        SpacedPairs(32, 4, rng=random.Random(7))
+    assert SpacedPairs(32, 4, rng=random.Random(7)) != \
+        SpacedPairs(32, 4, rng=random.Random(8))
+
+
+def test_size_mismatch_raises():
+    with pytest.raises(ValueError):
+        SpacedPairs(30, 4)
+
+
+def test_impossible_cover_raises():
+    #Lags of 15-17 don't fit within the 8 middle indexes of a 16 image block
+    with pytest.raises(ValueError):
+        SpacedPairs(16, 2, rng=random.Random(0), maxAttempts=5)
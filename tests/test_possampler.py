@@ -0,0 +1,80 @@
+"""MDTS positions must keep to the window, away from its corners, with moves
+of the type's length; a window too small for that must raise ValueError
+within MAX_ROUNDS batches rather than sample forever.
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from possampler import PositionSampler
+
+WINDOW = (1920, 1080)
+
+
+class CountingRng(object):
+    """NumPy Generator that counts its integers() calls.
+    """
+    def __init__(self, seed):
+        self.rng = np.random.default_rng(seed)
+        self.calls = 0
+
+    def integers(self, *args):
+        self.calls += 1
+        return self.rng.integers(*args)
+
+
+def Sampler(windowSize=WINDOW, seed=0):
+    return PositionSampler(windowSize, windowSize[1] / 6,
+                           np.random.default_rng(seed))
+
+
+@pytest.mark.parametrize("moveType", [0, 1, 2])
+def test_positions_keep_bounds_and_distance(moveType):
+    sampler = Sampler()
+    pairs = sampler.Sample(moveType, 200)
+    assert len(pairs) == 200
+    (xA, yA, xB, yB) = [np.array(coords) for coords in zip(
+        *[(a[0], a[1], b[0], b[1]) for (a, b) in pairs])]
+    #Back to bottom left oriented coordinates
+    (xA, xB) = (xA + WINDOW[0] // 2, xB + WINDOW[0] // 2)
+    (yA, yB) = (yA + WINDOW[1] // 2, yB + WINDOW[1] // 2)
+    for (x, y) in ((xA, yA), (xB, yB)):
+        assert (x >= sampler.x1).all() and (x <= sampler.x2).all()
+        assert (y >= sampler.y1).all() and (y <= sampler.y2).all()
+        assert not sampler.IsNearCorner(x, y).any()
+    distance = np.hypot(xB - xA, yB - yA)
+    #Moves are truncated to whole pixels
+    assert (np.abs(distance - sampler.radii[moveType]) <= 2).all()
+
+
+def test_corner_moves():
+    sampler = Sampler()
+    for (a, b) in sampler.Sample(3, 50):
+        assert (a, b) in sampler.cornerPairs
+        assert math.hypot(b[0] - a[0], b[1] - a[1]) > WINDOW[1]
+
+
+def test_same_seed_same_positions():
+    assert Sampler(seed=4).Sample(1, 20) == Sampler(seed=4).Sample(1, 20)
+
+
+def test_images_wider_than_window_raise():
+    with pytest.raises(ValueError):
+        PositionSampler((100, 100), 200, np.random.default_rng(0))
+
+
+def test_window_without_room_raises_within_max_rounds():
+    #Every point of a 300x300 window is within an image's width of a corner
+    rng = CountingRng(0)
+    sampler = PositionSampler((300, 300), 100, rng)
+    with pytest.raises(ValueError):
+        sampler.Sample(1, 10)
+    #Three draws (start x, start y, direction) per round
+    assert rng.calls == 3 * PositionSampler.MAX_ROUNDS
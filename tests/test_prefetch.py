@@ -0,0 +1,68 @@
+"""The prefetcher must hand back images in order from its bounded queue, and
+never decode the rest of a phase inside one trial: not for an image that
+failed to decode, nor for one requested out of order.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from prefetch import ImagePrefetcher
+
+PATHS = ["img%02d.jpg" %(i) for i in range(20)]
+
+
+class Loader(object):
+    """Decodes a path into its name, failing for the paths in bad, and keeps
+    the paths it was called for.
+    """
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, path):
+        with self.lock:
+            self.calls.append(path)
+        if (path in self.bad):
+            raise IOError("cannot decode %s" %(path))
+        return "pixels:" + path
+
+
+def test_images_in_order():
+    loader = Loader()
+    prefetcher = ImagePrefetcher(PATHS, depth=4, loadFunc=loader)
+    assert [prefetcher.Get(path) for path in PATHS] == \
+        ["pixels:" + path for path in PATHS]
+    prefetcher.Stop()
+    assert sorted(loader.calls) == PATHS
+
+
+def test_failed_image_is_raised_without_draining():
+    loader = Loader(bad=[PATHS[3]])
+    prefetcher = ImagePrefetcher(PATHS, depth=4, loadFunc=loader)
+    for path in PATHS[:3]:
+        prefetcher.Get(path)
+    with pytest.raises(IOError):
+        prefetcher.Get(PATHS[3])
+    assert prefetcher.next == 4
+    assert prefetcher.ready == {}
+    assert prefetcher.Get(PATHS[4]) == "pixels:" + PATHS[4]
+    prefetcher.Stop()
+
+
+def test_far_out_of_order_image_is_decoded_synchronously():
+    loader = Loader()
+    prefetcher = ImagePrefetcher(PATHS, depth=4, loadFunc=loader)
+    assert prefetcher.Get(PATHS[-1]) == "pixels:" + PATHS[-1]
+    assert prefetcher.next == 0
+    #One a few images ahead is taken from the queue, keeping those before it
+    assert prefetcher.Get(PATHS[2]) == "pixels:" + PATHS[2]
+    assert sorted(prefetcher.ready) == PATHS[:2]
+    assert prefetcher.Get(PATHS[0]) == "pixels:" + PATHS[0]
+    prefetcher.Stop()
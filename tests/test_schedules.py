@@ -0,0 +1,73 @@
+"""A subject's schedule must be the same whether the task makes it or it is
+generated ahead of time (TaskSchedule, the schedule cache and the
+counterbalancing audit).
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from journal import SessionJournal
+from schedules import (BuildSchedule, TaskSchedule, PairSeed, InTaskSeed,
+                       ImageListName)
+from schedcache import ScheduleCache
+
+SETS = {"MDTO": ("mdto_images", 20), "MDTS": ("mdts_images", 20),
+        "MDTT": ("mdtt_images", 4)}
+
+
+def SetDir(task, subset=1):
+    return os.path.join(ROOT_DIR, "images", SETS[task][0],
+                        "Set_%d" %(subset))
+
+
+def TaskBuilt(task, seed, windowSize=(1920, 1080), journal=None):
+    """Makes a schedule the way a task run by MDTSuite does: from the
+    schedule generator, journaled, with the task's other random draws taken
+    from its in-task generator in between.
+    """
+    scheduleRng = random.Random(seed)
+    rng = random.Random(InTaskSeed(seed))
+    rng.shuffle(list(range(100)))
+    return BuildSchedule(task, SetDir(task), SETS[task][1], scheduleRng,
+                         windowSize,
+                         journal=journal if journal is not None
+                         else SessionJournal())
+
+
+@pytest.mark.parametrize("task", sorted(SETS))
+@pytest.mark.parametrize("subject", [1, 2, 57])
+def test_task_schedule_matches_task(task, subject):
+    seed = PairSeed(subject, 1)
+    expected = TaskSchedule(task, SetDir(task), SETS[task][1], seed)
+    assert TaskBuilt(task, seed) == expected
+
+
+@pytest.mark.parametrize("task", sorted(SETS))
+def test_preloaded_schedule_is_used(task):
+    seed = PairSeed(3, 1)
+    journal = SessionJournal()
+    journal.Preload(TaskSchedule(task, SetDir(task), SETS[task][1], seed))
+    assert TaskBuilt(task, PairSeed(4, 1), journal=journal) == \
+        TaskSchedule(task, SetDir(task), SETS[task][1], seed)
+
+
+def test_mdts_cache_is_keyed_by_window_size(tmp_path):
+    imgDir = tmp_path / "mdts_images" / "Set_1"
+    imgDir.mkdir(parents=True)
+    for name in os.listdir(SetDir("MDTS")):
+        if (name.endswith(".jpg")):
+            (imgDir / name).touch()
+    cache = ScheduleCache(str(imgDir), "MDTS")
+    cache.Build(1, [5], 20, (1920, 1080), workers=1)
+
+    schedule = cache.Load(5, 20, (1920, 1080))
+    expected = TaskSchedule("MDTS", str(imgDir), 20, PairSeed(5, 1))
+    assert schedule == json.loads(json.dumps(expected))
+    assert cache.Load(5, 20, (1280, 720)) is None
@@ -0,0 +1,131 @@
+"""Re-scoring a session from its trial records (scoring.Score) must give the
+same counts as the tasks' running tally (scoring.Tally), and the signal
+detection metrics documented in scoring.py.
+"""
+
+import math
+import os
+import random
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+from scoring import CONDITIONS, NUM_CONDITIONS, Tally, Score, ScoreList
+from trialdata import TrialData
+
+LEFT = "f"
+RIGHT = "j"
+
+
+def Z(count, total):
+    """z score of the corrected rate (k + 0.5)/(n + 1).
+    """
+    return NormalDist().inv_cdf((count + 0.5) / (total + 1.0))
+
+
+def Session(task, trials, subject=101):
+    """Makes a session's trial records, and tallies its test trials as the
+    task does.
+
+    trials: list of (trialType, correctKey, response, pos1, pos2)
+    return: (TrialData, scoreList)
+    """
+    trialData = TrialData(subject, 1, task)
+    scoreList = [[0, 0, 0] for i in range(NUM_CONDITIONS)]
+    trialData.Add("study", 1, 1, "000.jpg", response=LEFT, rt=0.4)
+    for (i, (trialType, correct, response, pos1, pos2)) in enumerate(trials):
+        trialData.Add("test", 1, i+1, "%03d.jpg" %(i+1), trialType=trialType,
+                      pos1=pos1, pos2=pos2, correctKey=correct,
+                      response=response, rt=0.5 + 0.01 * i if response else 0)
+        Tally(scoreList, task, trialType, response, correct)
+    return (trialData, scoreList)
+
+
+def RandomTrials(task, rng, count=80):
+    trials = []
+    for i in range(0, count):
+        trialType = rng.choice(CONDITIONS[task] + ("3",))
+        (pos1, pos2) = ('', '')
+        if (task == "MDTT"):
+            (pos1, pos2) = rng.sample(range(1, 33), 2)
+            correct = LEFT if pos1 < pos2 else RIGHT
+        else:
+            correct = LEFT if trialType == CONDITIONS[task][0] else RIGHT
+        response = rng.choice([LEFT, RIGHT, ''])
+        trials.append((trialType, correct, response, pos1, pos2))
+    return trials
+
+
+@pytest.mark.parametrize("task", sorted(CONDITIONS))
+def test_score_matches_tally(task):
+    rng = random.Random(task)
+    (trialData, scoreList) = Session(task, RandomTrials(task, rng))
+    scores = Score(trialData.Array())
+    assert len(scores) == NUM_CONDITIONS
+    assert ScoreList(scores) == scoreList
+    assert list(scores['trialType']) == list(CONDITIONS[task])
+
+
+def test_cohort_scores_each_session():
+    rng = random.Random(1)
+    arrays = []
+    tallies = []
+    for subject in (103, 101, 102):
+        (trialData, scoreList) = Session("MDTS", RandomTrials("MDTS", rng),
+                                         subject)
+        arrays.append(trialData.Array())
+        tallies.append((subject, scoreList))
+    scores = Score(np.concatenate(arrays))
+    for (n, (subject, scoreList)) in enumerate(sorted(tallies)):
+        rows = scores[n * NUM_CONDITIONS:(n + 1) * NUM_CONDITIONS]
+        assert set(rows['subject']) == set([subject])
+        assert ScoreList(rows) == scoreList
+
+
+def test_mdto_metrics():
+    #Repeats: 3 of 4 responses "old"; lure high: 1 of 4 "old"; lure low: 2 of
+    #3 "old", and one trial without a response; foils: none "old"
+    trials = ([("sR", LEFT, r, '', '') for r in (LEFT, LEFT, LEFT, RIGHT)] +
+              [("1", RIGHT, r, '', '') for r in (RIGHT, RIGHT, LEFT, RIGHT)] +
+              [("2", RIGHT, r, '', '') for r in (RIGHT, LEFT, LEFT, '')] +
+              [("sF", RIGHT, r, '', '') for r in (RIGHT, RIGHT)])
+    (trialData, scoreList) = Session("MDTO", trials)
+    scores = Score(trialData.Array())
+    assert ScoreList(scores) == scoreList
+    (repeat, high, low, foil) = scores
+    #Repeats have no false alarms of their own
+    assert repeat['hitRate'] == pytest.approx(3 / 4.0)
+    assert math.isnan(repeat['faRate']) and math.isnan(repeat['dPrime'])
+    for (row, faK, faN) in ((high, 1, 4), (low, 2, 3), (foil, 0, 2)):
+        assert row['hitRate'] == pytest.approx(3 / 4.0)
+        assert row['faRate'] == pytest.approx(faK / float(faN))
+        assert row['dPrime'] == pytest.approx(Z(3, 4) - Z(faK, faN))
+        assert row['bias'] == pytest.approx(-(Z(3, 4) + Z(faK, faN)) / 2)
+    assert high['ldi'] == pytest.approx(3 / 4.0 - 1 / 4.0)
+    assert low['ldi'] == pytest.approx(3 / 4.0 - 2 / 3.0)
+    assert math.isnan(repeat['ldi']) and math.isnan(foil['ldi'])
+    assert low['trials'] == 4 and low['responses'] == 3
+
+
+def test_mdtt_metrics():
+    #Adjacent pairs: left first 3 times (2 answered "left"), right first twice
+    #(1 answered "left")
+    trials = [("1", LEFT, LEFT, 1, 2), ("1", LEFT, LEFT, 3, 4),
+              ("1", LEFT, RIGHT, 5, 6), ("1", RIGHT, LEFT, 8, 7),
+              ("1", RIGHT, RIGHT, 10, 9)]
+    (trialData, scoreList) = Session("MDTT", trials)
+    scores = Score(trialData.Array())
+    assert ScoreList(scores) == scoreList
+    adjacent = scores[0]
+    assert adjacent['hitRate'] == pytest.approx(2 / 3.0)
+    assert adjacent['faRate'] == pytest.approx(1 / 2.0)
+    assert adjacent['dPrime'] == pytest.approx(
+        (Z(2, 3) - Z(1, 2)) / math.sqrt(2.0))
+    assert math.isnan(adjacent['ldi'])
+    #Conditions without trials have no rates
+    assert math.isnan(scores[1]['hitRate']) and scores[1]['trials'] == 0
@@ -0,0 +1,82 @@
+"""Startup time budget of the mdtrun.py launcher: its main window must be drawn,
+and the suite be usable (mdtsuite imported, as running the first task does),
+within budget, timed from starting the process. The median of several runs is
+taken. Budgets, in seconds, can be set with MDT_PAINT_BUDGET and
+MDT_READY_BUDGET.
+
+Needs wx, psychopy and a display; skipped otherwise.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from queue import Queue, Empty
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAINT_BUDGET = float(os.environ.get("MDT_PAINT_BUDGET", 1.5))
+READY_BUDGET = float(os.environ.get("MDT_READY_BUDGET", 6.0))
+RUNS = 3
+TIMEOUT = 60
+
+pytest.importorskip("wx")
+pytest.importorskip("psychopy")
+if (sys.platform.startswith("linux") and not os.environ.get("DISPLAY")):
+    pytest.skip("no display to open the launcher on", allow_module_level=True)
+
+
+def ReadLines(stream, lines):
+    """Queues each line of a stream, then None once it ends.
+    """
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+def TimeStartup():
+    """Runs the launcher once, until it reports the suite ready.
+
+    return: dict of the seconds from starting the process to each line it
+            reported ("MDT first paint", "MDT suite ready")
+    """
+    env = dict(os.environ, MDT_STARTUP_PROBE="1")
+    start = time.time()
+    proc = subprocess.Popen([sys.executable, "mdtrun.py"], cwd=ROOT_DIR,
+                            env=env, stdout=subprocess.PIPE,
+                            universal_newlines=True)
+    #Lines are read on their own thread, so a launcher that hangs without
+    #writing anything still times out
+    lines = Queue()
+    reader = threading.Thread(target=ReadLines, args=(proc.stdout, lines))
+    reader.daemon = True
+    reader.start()
+    times = {}
+    try:
+        while ("MDT suite ready" not in times):
+            try:
+                line = lines.get(timeout=max(start + TIMEOUT - time.time(), 0))
+            except Empty:
+                break
+            if (line is None):
+                break
+            if (line.startswith("MDT ")):
+                times[line.strip()] = time.time() - start
+    finally:
+        proc.kill()
+        proc.wait()
+    return times
+
+
+def test_startup_within_budget():
+    runs = [TimeStartup() for run in range(0, RUNS)]
+    for name, budget in (("MDT first paint", PAINT_BUDGET),
+                         ("MDT suite ready", READY_BUDGET)):
+        assert all(name in times for times in runs), \
+            "mdtrun.py exited or timed out before reporting %r" %(name)
+        median = sorted(times[name] for times in runs)[RUNS // 2]
+        assert median <= budget, "%s: median %.2fs, over the %.2fs budget" %(
+            name, median, budget)
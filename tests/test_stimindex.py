@@ -0,0 +1,56 @@
+"""The stimulus index must survive the suite writing its own files into a set
+directory, and be rebuilt when the stimuli change.
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "include"))
+
+import stimindex
+from stimindex import StimulusIndex
+
+
+def MakeSet(tmp_path, names):
+    imgDir = tmp_path / "mdts_images" / "Set_1"
+    imgDir.mkdir(parents=True)
+    for name in names:
+        (imgDir / name).touch()
+    return str(imgDir)
+
+
+def Bump(imgDir, name):
+    """Adds a file to a directory, making sure its modification time
+    changes.
+    """
+    path = os.path.join(imgDir, name)
+    open(path, 'w').close()
+    mtime = os.stat(imgDir).st_mtime + 1
+    os.utime(imgDir, (mtime, mtime))
+
+
+def test_suite_files_keep_index(tmp_path, monkeypatch):
+    imgDir = MakeSet(tmp_path, ["001.jpg", "002.jpg", "PR_003a.jpg"])
+    index = StimulusIndex(imgDir)
+    assert index.Images() == ["001.jpg", "002.jpg"]
+    for name in ("manifest.json", "schedules_MDTS.bin", "preflight.json",
+                 "index.json.123.tmp", ".derivatives"):
+        Bump(imgDir, name)
+    scans = []
+    monkeypatch.setattr(StimulusIndex, "Scan",
+                        lambda self: scans.append(self))
+    assert index.Unchanged()
+    assert StimulusIndex(imgDir).Images() == ["001.jpg", "002.jpg"]
+    assert scans == []
+
+
+def test_new_stimulus_rebuilds_index(tmp_path):
+    imgDir = MakeSet(tmp_path, ["001.jpg", "002.jpg"])
+    stimindex._indexes.clear()
+    index = stimindex.OpenIndex(imgDir)
+    Bump(imgDir, "004.jpg")
+    assert not index.Unchanged()
+    assert stimindex.OpenIndex(imgDir).Images() == ["001.jpg", "002.jpg",
+                                                    "004.jpg"]
+    assert not [name for name in os.listdir(imgDir) if name.endswith(".tmp")]